@@ -0,0 +1,152 @@
+"""
+The columnar generator records the same data as the csv generator, but into numpy .npz files.
+The rounds are collected in a preallocated buffer and written column by column in chunks of ROUND_CHUNK rounds
+by a background thread, so the simulation does not wait for the disk. rounds.npz holds one .npy member
+per column and chunk, load_columns reads them back into whole columns. aggregate_rounds.csv is written
+from the running statistics like with the csv generator, so multiple.py can collect it.
+
+Use it with csv_generator = columnar_generator in config.ini
+"""
+
+import queue
+import threading
+import zipfile
+
+import numpy as np
+
+from components.generators.csv import csv_generator
+from components.generators.csv.csv_generator import AGENT_COLUMNS, AGENT_HEADER, ROUND_HEADER, CsvAgentData
+
+# rounds per chunk of the round buffer
+ROUND_CHUNK = 4096
+# the first columns of rounds.csv (index, scenario, solution) are the same in every row, they are stored once
+CONSTANT_COLUMNS = 3
+
+
+class ColumnWriter:
+    """
+    Writes numpy arrays as members of a .npz file in a background thread
+    """
+
+    def __init__(self, file_name, header, constants=(), max_pending=64):
+        """
+        Initializing the writer
+        :param file_name: path of the .npz file
+        :param header: names of all columns
+        :param constants: values of the first columns, which are the same in every row
+        :param max_pending: amount of arrays that can wait for writing before write blocks
+        """
+        self.file_name = file_name
+        self.header = list(header)
+        self.chunks = 0
+        self.npz_file = zipfile.ZipFile(file_name, 'w', zipfile.ZIP_STORED)
+        self.pending = queue.Queue(max_pending)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name="column writer", daemon=True)
+        self.thread.start()
+        self._put("header", np.array(self.header))
+        self._put("constants", np.array([str(c) for c in constants]))
+
+    def _run(self):
+        while True:
+            member = self.pending.get()
+            if member is None:
+                return
+            name, array = member
+            try:
+                with self.npz_file.open(name + ".npy", 'w', force_zip64=True) as member_file:
+                    np.lib.format.write_array(member_file, array, allow_pickle=False)
+            except Exception as e:
+                self.error = e
+
+    def _put(self, name, array):
+        if self.error is not None:
+            raise self.error
+        self.pending.put((name, array))
+
+    def write_chunk(self, rows):
+        """
+        queues a chunk of rows for writing, each column becomes its own member
+        :param rows: 2d array with the values of the columns after the constant columns
+        :return: None
+        """
+        offset = len(self.header) - rows.shape[1]
+        for column in range(rows.shape[1]):
+            self._put("c%03d_%06d" % (offset + column, self.chunks), np.ascontiguousarray(rows[:, column]))
+        self.chunks += 1
+
+    def close(self):
+        self.pending.put(None)
+        self.thread.join()
+        self.npz_file.close()
+        if self.error is not None:
+            raise self.error
+
+
+def load_columns(file_name):
+    """
+    reads a .npz file of the columnar generator
+    :param file_name: path of rounds.npz or agent.npz
+    :return: dictionary from the column names to numpy arrays, in the order of the columns
+    """
+    with np.load(file_name) as npz_file:
+        header = npz_file["header"].tolist()
+        constants = npz_file["constants"].tolist()
+        members = sorted(name for name in npz_file.files if name.startswith("c") and name != "constants")
+        parts = {}
+        for name in members:
+            parts.setdefault(int(name[1:4]), []).append(npz_file[name])
+    columns = {}
+    length = None
+    for index in range(len(constants), len(header)):
+        column = parts.get(index)
+        columns[header[index]] = np.concatenate(column) if column else np.zeros(0, dtype=np.int64)
+        length = len(columns[header[index]])
+    result = {}
+    for index, name in enumerate(header):
+        if index < len(constants):
+            result[name] = np.full(length or 0, constants[index])
+        else:
+            result[name] = columns[name]
+    return result
+
+
+class CsvAgentFile:
+    def __init__(self, directory):
+        self.file_name = directory + '/agent.npz'
+        self.rows = []
+
+    def write_agent(self, agent):
+        counters = agent.csv_agent_writer.get_counters()
+        self.rows.append([agent.csv_agent_writer.id, agent.csv_agent_writer.number]
+                         + counters[AGENT_COLUMNS].tolist())
+
+    def close(self):
+        writer = ColumnWriter(self.file_name, AGENT_HEADER)
+        writer.write_chunk(np.array(self.rows, dtype=np.int64).reshape(-1, len(AGENT_HEADER)))
+        writer.close()
+
+
+class CsvRoundData(csv_generator.CsvRoundData):
+    def _open_rounds(self):
+        self.file_name = self.directory + '/rounds.npz'
+        self.buffer = np.zeros((ROUND_CHUNK, len(ROUND_HEADER) - CONSTANT_COLUMNS), dtype=np.int64)
+        self.buffered = 0
+        self.writer = ColumnWriter(self.file_name, ROUND_HEADER, ('', self.scenario, self.solution))
+
+    def _write_round(self, row):
+        self.buffer[self.buffered] = row[CONSTANT_COLUMNS:]
+        self.buffered += 1
+        if self.buffered == ROUND_CHUNK:
+            self._flush()
+
+    def _flush(self):
+        if self.buffered > 0:
+            # the writer keeps the chunk, the next rounds go into a new buffer
+            self.writer.write_chunk(self.buffer[:self.buffered])
+            self.buffer = np.zeros_like(self.buffer)
+            self.buffered = 0
+
+    def _close_rounds(self):
+        self._flush()
+        self.writer.close()
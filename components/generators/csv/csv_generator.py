@@ -9,180 +9,159 @@ TODO:
 """
 
 import csv
-import pandas as pd
-import logging
 import os
 
+import numpy as np
+
+from core.metrics import *
+
+# metric ids in the order of the columns of agent.csv
+AGENT_COLUMNS = np.array([LOCATION_CREATED, LOCATION_DELETED, LOCATION_READ, LOCATION_WRITE,
+                          MEMORY_READ, MEMORY_WRITE, AGENTS_CREATED, AGENTS_DROPPED, AGENTS_DELETED, AGENT_READ,
+                          STEPS, AGENTS_TAKEN, AGENT_WRITE, ITEMS_CREATED, ITEMS_DELETED, ITEMS_DROPPED,
+                          ITEM_READ, ITEMS_TAKEN, ITEM_WRITE, SUCCESS])
+
+# columns of rounds.csv after the success columns: the counters of the world
+# or the metric ids, which are written as round value and sum
+AGENT_NUM = "agent_num"
+LOCATIONS_NUM = "locations_num"
+ITEM_NUM = "item_num"
+ROUND_COLUMNS = (AGENT_NUM, AGENTS_CREATED, AGENTS_DELETED, AGENTS_DROPPED, AGENT_READ, STEPS, AGENTS_TAKEN,
+                 AGENT_WRITE, MEMORY_READ, MEMORY_WRITE,
+                 LOCATIONS_NUM, LOCATION_CREATED, LOCATION_DELETED, LOCATION_READ, LOCATION_WRITE,
+                 ITEM_NUM, ITEMS_CREATED, ITEMS_DELETED, ITEMS_DROPPED, ITEM_READ, ITEMS_TAKEN, ITEM_WRITE)
+
+
+AGENT_HEADER = ['Agent ID', 'Agent Number',
+                'Locations Created', 'Locations Deleted',
+                'Location Read', 'Location Write',
+                'Memory Read', 'Memory Write',
+                'Agents Created', 'Agents Deleted',
+                'Agents Dropped',
+                'Agent Read', 'Agent Steps',
+                'Agents Taken', 'Agent Write',
+                'Items Created', 'Items Deleted',
+                'Items Dropped',
+                'Item Read', 'Items Taken',
+                'Item Write', 'Success'
+                ]
+
+ROUND_HEADER = ['',
+                'scenario', 'solution', 'Seed', 'Round Number',
+                'Success Counter', 'Success Round',
+                'Agent Counter',
+                'Agents Created', 'Agents Created Sum',
+                'Agents Deleted', 'Agents Deleted Sum',
+                'Agents Dropped', 'Agents Dropped Sum',
+                'Agent Read', 'Agent Read Sum',
+                'Agent Steps', 'Agent Steps Sum',
+                'Agents Taken', 'Agents Taken Sum',
+                'Agent Write', 'Agent Write Sum',
+                'Memory Read', 'Memory Read Sum',
+                'Memory Write', 'Memory Write Sum',
+                'Location Counter',
+                'Location Created', 'Location Created Sum',
+                'Location Deleted', 'Location Deleted Sum',
+                'Location Read', 'Location Read Sum',
+                'Location Write', 'Location Write Sum',
+                'Item Counter',
+                'Items Created', 'Items Created Sum',
+                'Items Deleted', 'Items Deleted Sum',
+                'Items Dropped', 'Items Dropped Sum',
+                'Item Read', 'Item Read Sum',
+                'Items Taken', 'Items Taken Sum',
+                'Item Write', 'Item Write Sum',
+                ]
+
 
 class CsvAgentFile:
     def __init__(self, directory):
         self.file_name = directory + '/agent.csv'
+        self.csv_file = None
         file_exists = os.path.isfile(self.file_name)
         if not file_exists:
             self.csv_file = open(self.file_name, 'w', newline='')
             self.writer = csv.writer(self.csv_file)
-            self.writer.writerow(['Agent ID', 'Agent Number',
-                                  'Locations Created', 'Locations Deleted',
-                                  'Location Read', 'Location Write',
-                                  'Memory Read', 'Memory Write',
-                                  'Agents Created', 'Agents Deleted',
-                                  'Agents Dropped',
-                                  'Agent Read', 'Agent Steps',
-                                  'Agents Taken', 'Agent Write',
-                                  'Items Created', 'Items Deleted',
-                                  'Items Dropped',
-                                  'Item Read', 'Items Taken',
-                                  'Item Write', 'Success'
-                                  ])
+            self.writer.writerow(AGENT_HEADER)
 
     def write_agent(self, agent):
-        csv_iterator = [agent.csv_agent_writer.id, agent.csv_agent_writer.number,
-                        agent.csv_agent_writer.location_created, agent.csv_agent_writer.location_deleted,
-                        agent.csv_agent_writer.location_read, agent.csv_agent_writer.location_write,
-                        agent.csv_agent_writer.memory_read, agent.csv_agent_writer.memory_write,
-                        agent.csv_agent_writer.agents_created, agent.csv_agent_writer.agents_dropped,
-                        agent.csv_agent_writer.agents_deleted, agent.csv_agent_writer.agent_read,
-                        agent.csv_agent_writer.steps, agent.csv_agent_writer.agents_taken,
-                        agent.csv_agent_writer.agent_write,
-                        agent.csv_agent_writer.items_created, agent.csv_agent_writer.items_deleted,
-                        agent.csv_agent_writer.items_dropped,
-                        agent.csv_agent_writer.item_read, agent.csv_agent_writer.items_taken,
-                        agent.csv_agent_writer.item_write, agent.csv_agent_writer.success]
+        counters = agent.csv_agent_writer.get_counters()
+        csv_iterator = [agent.csv_agent_writer.id, agent.csv_agent_writer.number]
+        csv_iterator.extend(counters[AGENT_COLUMNS].tolist())
         self.writer.writerow(csv_iterator)
 
+    def close(self):
+        if self.csv_file is not None:
+            self.csv_file.close()
+
 
 class CsvAgentData:
-    def __init__(self, agent_id, agent_number):
+    def __init__(self, agent_id, agent_number, metrics=None, row=None):
+        """
+        Initializing the counters of an agent
+        :param agent_id: the id of the agent
+        :param agent_number: the number of the agent
+        :param metrics: the MetricsRegistry of the world, the agent gets its own if not given
+        :param row: the counter row of the agent in metrics, a new row is reserved if not given
+        """
         self.id = agent_id
         self.number = agent_number
-        self.steps = 0
-        self.agents_created = 0
-        self.agents_deleted = 0
-        self.agents_dropped = 0
-        self.agent_read = 0
-        self.agents_taken = 0
-        self.agent_write = 0
-        self.items_created = 0
-        self.items_deleted = 0
-        self.item_read = 0
-        self.item_write = 0
-        self.location_read = 0
-        self.location_write = 0
-        self.location_created = 0
-        self.location_deleted = 0
-        self.memory_read = 0
-        self.memory_write = 0
-        self.items_taken = 0
-        self.items_dropped = 0
-        self.success = 0
-
-    def write_agent(self, steps=0, agent_read=0, agents_created=0, agents_deleted=0, agents_dropped=0,
-                    agents_taken=0,
-                    agent_write=0, items_created=0, items_deleted=0, item_read=0, item_write=0, location_read=0,
-                    location_write=0, location_created=0, location_deleted=0, memory_read=0, memory_write=0,
-                    items_taken=0, items_dropped=0, success=0):
-        self.steps = self.steps + steps
-        self.agents_created = self.agents_created + agents_created
-        self.agents_deleted = self.agents_deleted + agents_deleted
-        self.agents_dropped = self.agents_dropped + agents_dropped
-        self.agents_taken = self.agents_taken + agents_taken
-        self.agent_read = self.agent_read + agent_read
-        self.agent_write = self.agent_write + agent_write
-        self.items_created = self.items_created + items_created
-        self.items_deleted = self.items_deleted + items_deleted
-        self.item_read = self.item_read + item_read
-        self.item_write = self.item_write + item_write
-        self.location_read = self.location_read + location_read
-        self.location_write = self.location_write + location_write
-        self.location_created = self.location_created + location_created
-        self.location_deleted = self.location_deleted + location_deleted
-        self.memory_read = self.memory_read + memory_read
-        self.memory_write = self.memory_write + memory_write
-        self.items_taken = self.items_taken + items_taken
-        self.items_dropped = self.items_dropped + items_dropped
-        self.success = self.success + success
+        self.metrics = MetricsRegistry(agent_capacity=1) if metrics is None else metrics
+        self.row = self.metrics.add_agent() if row is None else row
+
+    def count(self, metric, amount=1):
+        """
+        counts an event of the agent
+        :param metric: the metric id, see core.metrics
+        :param amount: the amount of events
+        :return: None
+        """
+        self.metrics.agent_counters[self.row, metric] += amount
+
+    def get_counters(self):
+        return self.metrics.get_agent(self.row)
+
+    def write_agent(self, **counts):
+        for name, amount in counts.items():
+            self.count(get_metric_id(name), amount)
 
 
 class CsvRoundData:
-    def __init__(self, task=0, scenario=0, solution=0, seed=20, directory="outputs/"):
+    def __init__(self, task=0, scenario=0, solution=0, seed=20, directory="outputs/", metrics=None):
         self.task = task
         self.scenario = scenario
         self.solution = solution
         self.actual_round = 1
         self.seed = seed
-        self.steps = 0
-        self.steps_sum = 0
-        self.agents_created = 0
-        self.agents_deleted = 0
+        self.metrics = MetricsRegistry() if metrics is None else metrics
         self.agent_num = 0
-        self.agent_read = 0
-        self.agent_write = 0
-        self.items_created = 0
-        self.items_deleted = 0
         self.item_num = 0
-        self.item_read = 0
-        self.item_write = 0
         self.locations_num = 0
-        self.location_read = 0
-        self.location_write = 0
-        self.location_created = 0
-        self.location_deleted = 0
-        self.memory_read = 0
-        self.memory_write = 0
-        self.agents_created_sum = 0
-        self.agents_deleted_sum = 0
-        self.agent_read_sum = 0
-        self.agent_write_sum = 0
-        self.agents_taken = 0
-        self.agents_dropped = 0
-        self.agents_taken_sum = 0
-        self.agents_dropped_sum = 0
-        self.items_created_sum = 0
-        self.items_deleted_sum = 0
-        self.item_read_sum = 0
-        self.item_write_sum = 0
-        self.location_read_sum = 0
-        self.location_write_sum = 0
-        self.location_created_sum = 0
-        self.location_deleted_sum = 0
-        self.memory_read_sum = 0
-        self.memory_write_sum = 0
         self.success_round = 0
-        self.success_counter = 0
-        self.items_taken = 0
-        self.items_dropped = 0
-        self.items_taken_sum = 0
-        self.items_dropped_sum = 0
         self.directory = directory
         self.file_name = directory + '/rounds.csv'
+        # statistics of the numeric columns of all rounds, for aggregate_rounds.csv
+        self.stats = RunningStats(ROUND_HEADER[3:])
+        self._open_rounds()
+
+    def _open_rounds(self):
         self.csv_file = open(self.file_name, 'w', newline='')
         self.writer_round = csv.writer(self.csv_file)
-        self.writer_round.writerow(['',
-                                    'scenario', 'solution', 'Seed', 'Round Number',
-                                    'Success Counter', 'Success Round',
-                                    'Agent Counter',
-                                    'Agents Created', 'Agents Created Sum',
-                                    'Agents Deleted', 'Agents Deleted Sum',
-                                    'Agents Dropped', 'Agents Dropped Sum',
-                                    'Agent Read', 'Agent Read Sum',
-                                    'Agent Steps', 'Agent Steps Sum',
-                                    'Agents Taken', 'Agents Taken Sum',
-                                    'Agent Write', 'Agent Write Sum',
-                                    'Memory Read', 'Memory Read Sum',
-                                    'Memory Write', 'Memory Write Sum',
-                                    'Location Counter',
-                                    'Location Created', 'Location Created Sum',
-                                    'Location Deleted', 'Location Deleted Sum',
-                                    'Location Read', 'Location Read Sum',
-                                    'Location Write', 'Location Write Sum',
-                                    'Item Counter',
-                                    'Items Created', 'Items Created Sum',
-                                    'Items Deleted', 'Items Deleted Sum',
-                                    'Items Dropped', 'Items Dropped Sum',
-                                    'Item Read', 'Item Read Sum',
-                                    'Items Taken', 'Items Taken Sum',
-                                    'Item Write', 'Item Write Sum',
-                                    ])
+        self.writer_round.writerow(ROUND_HEADER)
+
+    def _write_round(self, row):
+        self.writer_round.writerow(row)
+
+    def _close_rounds(self):
+        self.csv_file.close()
+
+    def get_aggregates(self):
+        """
+        returns the statistics of the rounds up to now, also during the simulation
+        :return: dictionary from the column names of rounds.csv to dictionaries
+                 with count, sum, mean, variance, min and max
+        """
+        return self.stats.as_dict()
 
     def update_agent_num(self, agent):
         self.agent_num = agent
@@ -194,102 +173,36 @@ class CsvRoundData:
         self.locations_num = act_locations_num
 
     def success(self):
-        self.success_counter = self.success_counter + 1
-
-    def update_metrics(self, steps=0,
-                       agent_read=0, item_read=0, location_read=0, memory_read=0,
-                       agent_write=0, item_write=0, location_write=0, memory_write=0,
-                       agents_created=0, items_created=0, location_created=0,
-                       agents_deleted=0, items_deleted=0, location_deleted=0, items_taken=0, items_dropped=0,
-                       agents_taken=0, agents_dropped=0):
-        logging.debug("CSV: Starting writing_rounds")
-        self.location_created_sum = self.location_created_sum + location_created
-        self.location_deleted_sum = self.location_deleted_sum + location_deleted
-        self.location_read_sum = self.location_read_sum + location_read
-        self.location_write_sum = self.location_write_sum + location_write
-        self.agents_created_sum = self.agents_created_sum + agents_created
-        self.agents_deleted_sum = self.agents_deleted_sum + agents_deleted
-        self.agent_read_sum = self.agent_read_sum + agent_read
-        self.steps_sum = self.steps_sum + steps
-        self.agent_write_sum = self.agent_write_sum + agent_write
-        self.memory_write_sum = self.memory_write_sum + memory_write
-        self.memory_read_sum = self.memory_read_sum + memory_read
-        self.items_created_sum = self.items_created_sum + items_created
-        self.items_deleted_sum = self.items_deleted_sum + items_deleted
-        self.items_dropped_sum = self.items_dropped_sum + items_dropped
-        self.item_read_sum = self.item_read_sum + item_read
-        self.items_taken_sum = self.items_taken_sum + items_taken
-        self.item_write_sum = self.item_write_sum + item_write
-        self.agents_taken_sum = self.agents_taken_sum + agents_taken
-        self.agents_dropped_sum = self.agents_dropped_sum + agents_dropped
-
-        self.steps = self.steps + steps
-        self.agent_read = self.agent_read + agent_read
-        self.item_read = self.item_read + item_read
-        self.location_read = self.location_read + location_read
-        self.memory_read = self.memory_read + memory_read
-        self.agent_write = self.agent_write + agent_write
-        self.item_write = self.item_write + item_write
-        self.location_write = self.location_write + location_write
-        self.memory_write = self.memory_write + memory_write
-        self.agents_created = self.agents_created + agents_created
-        self.items_created = self.items_created + items_created
-        self.location_created = self.location_created + location_created
-        self.agents_deleted = self.agents_deleted + agents_deleted
-        self.items_deleted = self.items_deleted + items_deleted
-        self.location_deleted = self.location_deleted + location_deleted
-        self.items_dropped = self.items_dropped + items_dropped
-        self.items_taken = self.items_taken + items_taken
-        self.agents_taken = self.agents_taken + agents_taken
-        self.agents_dropped = self.agents_dropped + agents_dropped
-        logging.debug("CSV: Ending writing_rounds")
+        self.metrics.count(SUCCESS)
+
+    def update_metrics(self, **counts):
+        for name, amount in counts.items():
+            self.metrics.count(get_metric_id(name), amount)
 
     def next_line(self, sim_round):
+        round_counts = self.metrics.get_round()
+        total_counts = self.metrics.totals
         csv_iterator = ['', self.scenario, self.solution, self.seed, sim_round,
-                        self.success_counter, self.success_round,
-                        self.agent_num, self.agents_created, self.agents_created_sum,
-                        self.agents_deleted, self.agents_deleted_sum,
-                        self.agents_dropped, self.agents_dropped_sum,
-                        self.agent_read, self.agent_read_sum,
-                        self.steps, self.steps_sum,
-                        self.agents_taken, self.agents_taken_sum,
-                        self.agent_write, self.agent_write_sum,
-                        self.memory_read, self.memory_read_sum, self.memory_write, self.memory_write_sum,
-                        self.locations_num, self.location_created, self.location_created_sum,
-                        self.location_deleted, self.location_deleted_sum,
-                        self.location_read, self.location_read_sum,
-                        self.location_write, self.location_write_sum,
-                        self.item_num, self.items_created, self.items_created_sum,
-                        self.items_deleted, self.items_deleted_sum, self.items_dropped, self.items_dropped_sum,
-                        self.item_read, self.item_read_sum, self.items_taken, self.items_taken_sum,
-                        self.item_write, self.item_write_sum]
-        self.writer_round.writerow(csv_iterator)
+                        int(round_counts[SUCCESS]), self.success_round]
+        for column in ROUND_COLUMNS:
+            if column == AGENT_NUM:
+                csv_iterator.append(self.agent_num)
+            elif column == LOCATIONS_NUM:
+                csv_iterator.append(self.locations_num)
+            elif column == ITEM_NUM:
+                csv_iterator.append(self.item_num)
+            else:
+                csv_iterator.append(int(round_counts[column]))
+                csv_iterator.append(int(total_counts[column]))
+        self._write_round(csv_iterator)
+        self.stats.add(csv_iterator[3:])
         self.actual_round = sim_round
-        self.steps = 0
-        self.agent_read = 0
-        self.item_read = 0
-        self.location_read = 0
-        self.memory_read = 0
-        self.agent_write = 0
-        self.item_write = 0
-        self.location_write = 0
-        self.memory_write = 0
-        self.agents_created = 0
-        self.items_created = 0
-        self.location_created = 0
-        self.agents_deleted = 0
-        self.items_deleted = 0
-        self.location_deleted = 0
-        self.items_dropped = 0
-        self.items_taken = 0
         self.success_round = 0
-        self.success_counter = 0
-        self.agents_taken = 0
-        self.agents_dropped = 0
+        self.metrics.next_round()
 
     def aggregate_metrics(self):
-        self.csv_file.close()
-        data = pd.read_csv(self.file_name)
+        self._close_rounds()
+        data = self.stats
         file_name = self.directory + "/aggregate_rounds.csv"
         csv_file = open(file_name, 'w', newline='')
         writer_round = csv.writer(csv_file)
@@ -403,8 +316,8 @@ class CsvRoundData:
         csv_file.close()
 
     def all_aggregate_metrics(self):
-        self.csv_file.close()
-        data = pd.read_csv(self.file_name)
+        self._close_rounds()
+        data = self.stats
         file_name = self.directory + "/aggregate_rounds.csv"
         csv_file = open(file_name, 'w', newline='')
         writer_round = csv.writer(csv_file)
@@ -1,51 +1,123 @@
-import matplotlib.pyplot as plt
+"""
+The plot generator draws one line plot per column of rounds.csv and agent.csv (or their .npz counterparts
+of the columnar generator). Each file is read once into columns, the figures are rendered with the Agg backend
+in a pool of worker processes. Columns with more than max_points rows can be decimated: the rows are split into
+buckets and only the minimum and the maximum of every bucket are drawn, so peaks stay visible.
+"""
 import csv
-import numpy as np
-import pandas as pn
+import multiprocessing
 import os as os
 
-# def plot_generator(file,directory, start, x_index, name, plot_type="line"):
-#     with open(directory+"/"+file, 'r') as data:
-#         plotter(data, directory, start, x_index, name, plot_type)
-def plot_generator(directory, plot_dir, multiple=0):
-    with open(directory+"/"+"rounds.csv", 'r') as data:
-        plotter(data, "rounds", 4, 5, plot_dir+"/rounds")
-    with open(directory + "/" + "agent.csv", 'r') as data:
-        plotter(data, "agents", 1, 2, plot_dir+"/agents")
+import numpy as np
+
+from components.generators.csv.columnar_generator import load_columns
+
+
+def plot_generator(directory, plot_dir, multiple=0, workers=0, max_points=0):
+    """
+    plots the rounds and agent data of a simulation
+    :param directory: directory of the csv or npz files
+    :param plot_dir: directory of the plots
+    :param multiple: unused
+    :param workers: amount of worker processes, 0 for the amount of cpus, 1 renders in this process
+    :param max_points: maximal amount of points of a plot, 0 draws all rows
+    :return: None
+    """
+    jobs = plot_jobs(read_columns(directory, "rounds"), "rounds", 4, 5, plot_dir + "/rounds", max_points)
+    jobs += plot_jobs(read_columns(directory, "agent"), "agents", 1, 2, plot_dir + "/agents", max_points)
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+    if workers <= 1:
+        for job in jobs:
+            render(job)
+    else:
+        with multiprocessing.get_context("spawn").Pool(workers) as pool:
+            pool.map(render, jobs, chunksize=max(1, len(jobs) // (workers * 4)))
+
 
+def read_columns(directory, name):
+    """
+    reads <name>.npz of the columnar generator or <name>.csv in one pass
+    :param directory: the directory of the file
+    :param name: rounds or agent
+    :return: dictionary from the column names to numpy arrays, in the order of the columns
+    """
+    if os.path.isfile(directory + "/" + name + ".npz"):
+        return load_columns(directory + "/" + name + ".npz")
+    with open(directory + "/" + name + ".csv", 'r') as data:
+        csv_object = csv.reader(data, delimiter=',')
+        header = next(csv_object)
+        rows = list(csv_object)
+    columns = {}
+    for col, column in enumerate(header):
+        values = [row[col] for row in rows]
+        try:
+            columns[column] = np.array(values, dtype=np.float64)
+        except ValueError:
+            columns[column] = np.array(values)
+    return columns
 
-def plotter(data, name, x_index, y_start, plot_dir):
+
+def decimate(x, y, max_points):
+    """
+    reduces a line to at most max_points points, keeping the minimum and the maximum of every bucket of rows
+    :param x: the x values
+    :param y: the y values
+    :param max_points: maximal amount of points, 0 keeps all points
+    :return: the decimated x and y values
+    """
+    buckets = max_points // 2
+    if max_points == 0 or len(y) <= max_points or buckets == 0:
+        return x, y
+    size = -(-len(y) // buckets)
+    padded = np.pad(y, (0, buckets * size - len(y)), mode='edge').reshape(buckets, size)
+    starts = np.arange(buckets) * size
+    indices = np.unique(np.minimum(np.concatenate((starts + np.argmin(padded, axis=1),
+                                                   starts + np.argmax(padded, axis=1))), len(y) - 1))
+    return x[indices], y[indices]
+
+
+def plot_jobs(columns, name, x_index, y_start, plot_dir, max_points=0):
+    """
+    creates the render jobs of the plots of one file
+    :param columns: dictionary from the column names to numpy arrays
+    :param name: prefix of the plot files
+    :param x_index: index of the column of the x axis
+    :param y_start: index of the first column that is plotted
+    :param plot_dir: directory of the plots
+    :param max_points: maximal amount of points of a plot, 0 draws all rows
+    :return: list of jobs for render
+    """
     if not os.path.exists(plot_dir):
         os.makedirs(plot_dir)
-    csv_object = csv.reader(data, delimiter=',')
-    a = next(csv_object)
-    plot_type = "line"
-    x = []
-    y = []
+    header = list(columns)
+    x = columns[header[x_index]].astype(np.int64)
+    jobs = []
+    for col in range(y_start, len(header)):
+        # like int(float(value)) for every value that is not nan
+        y = columns[header[col]].astype(np.float64)
+        y = np.where(np.isnan(y), np.nan, np.trunc(y))
+        plot_x, plot_y = decimate(x, y, max_points)
+        jobs.append((plot_x, plot_y, header[x_index], header[col],
+                     plot_dir + '/' + name + '_' + header[col] + '.png'))
+    return jobs
+
+
+def render(job):
+    """
+    renders one line plot into a png file
+    :param job: tuple of x values, y values, x label, y label and file name
+    :return: None
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    x, y, x_label, y_label, file_name = job
     plt.figure(figsize=(20, 12))
-    for col in range(y_start, len(a)):
-        x.clear()
-        y.clear()
-        for row in csv_object:
-            if plot_type == "line":
-                x.append(int(row[x_index]))
-            elif plot_type == "bar":
-                x.append(str(row[x_index]))
-            if row[col] != "nan":
-                y.append(int(float(row[col])))
-            else:
-                y.append(np.nan)
-        if plot_type == "line":
-            plt.plot(x, y)
-        elif plot_type == "bar":
-            plt.bar(x, y, align='edge', width=0.5)
-        plt.xlabel(a[x_index])
-        plt.xticks(rotation=45)
-        plt.ylabel(a[col])
-        plt.savefig(plot_dir + '/' + name + '_' + a[col] + '.png')
-        plt.clf()
-        data.seek(0)
-        plot = csv.reader(data, delimiter=',')
-        next(plot)
-
-#plot_generator("all_aggregates.csv", "../outputs/multiple/working_multi_layer_2020-02-29_14:34:1_leader_coating", 4,0, "Multi_Layer: 60 Particles", "bar")
\ No newline at end of file
+    plt.plot(x, y)
+    plt.xlabel(x_label)
+    plt.xticks(rotation=45)
+    plt.ylabel(y_label)
+    plt.savefig(file_name)
+    plt.close()
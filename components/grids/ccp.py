@@ -1,5 +1,22 @@
+from types import MappingProxyType
+
+import numpy as np
+
 from components.grids.grid import Grid
 
+_DIRECTIONS = MappingProxyType({"LEFT_UP": (-1.0, 1.0, 0.0),
+                                "FORWARD_UP": (0.0, 1.0, 1.0),
+                                "RIGHT_UP": (1.0, 1.0, 0.0),
+                                "BACK_UP": (0.0, 1.0, -1.0),
+                                "LEFT_FORWARD": (-1.0, 0.0, 1.0),
+                                "RIGHT_FORWARD": (1.0, 0.0, 1.0),
+                                "RIGHT_BACK": (1.0, 0.0, -1.0),
+                                "LEFT_BACK": (-1.0, 0.0, -1.0),
+                                "LEFT_DOWN": (-1.0, -1.0, 0.0),
+                                "FORWARD_DOWN": (0.0, -1.0, 1.0),
+                                "RIGHT_DOWN": (1.0, -1.0, 0.0),
+                                "BACK_DOWN": (0.0, -1.0, -1.0)})
+
 
 class CCPGrid(Grid):
 
@@ -13,18 +30,7 @@ class CCPGrid(Grid):
 
     @property
     def directions(self):
-        return {"LEFT_UP": (-1.0, 1.0, 0.0),
-                "FORWARD_UP": (0.0, 1.0, 1.0),
-                "RIGHT_UP": (1.0, 1.0, 0.0),
-                "BACK_UP": (0.0, 1.0, -1.0),
-                "LEFT_FORWARD": (-1.0, 0.0, 1.0),
-                "RIGHT_FORWARD": (1.0, 0.0, 1.0),
-                "RIGHT_BACK": (1.0, 0.0, -1.0),
-                "LEFT_BACK": (-1.0, 0.0, -1.0),
-                "LEFT_DOWN": (-1.0, -1.0, 0.0),
-                "FORWARD_DOWN": (0.0, -1.0, 1.0),
-                "RIGHT_DOWN": (1.0, -1.0, 0.0),
-                "BACK_DOWN": (0.0, -1.0, -1.0)}
+        return _DIRECTIONS
 
     def get_box(self, width):
         locations = []
@@ -63,6 +69,40 @@ class CCPGrid(Grid):
 
         return x, y, z
 
+    def valid_mask(self, coordinates):
+        coordinates = np.asarray(coordinates, dtype=np.float64)
+        x = coordinates[..., 0] % 2.0
+        y = coordinates[..., 1] % 2.0
+        z = coordinates[..., 2] % 2.0
+        same = (x == z) & ((x == 0) | (x == 1))
+        different = ((x == 1) & (z == 0)) | ((x == 0) & (z == 1))
+        return np.where(y == 0, same, different)
+
+    def snap(self, coordinates):
+        result = np.round(np.asarray(coordinates, dtype=np.float64))
+        even_row = result[..., 1] % 2.0 == 0
+        same_parity = result[..., 0] % 2.0 == result[..., 2] % 2.0
+        result[..., 2] += np.where(even_row != same_parity, 1.0, 0.0)
+        return result
+
+    def to_lattice(self, coordinates):
+        # valid coordinates always have an even coordinate sum. expressing them in the basis
+        # (1, 1, 0), (0, 1, 1), (1, 0, 1) folds that parity away and leaves a dense integer lattice
+        x = round(coordinates[0])
+        y = round(coordinates[1])
+        z = round(coordinates[2])
+        return (x + y - z) // 2, (y + z - x) // 2, (x + z - y) // 2
+
+    def from_lattice(self, lattice):
+        return lattice[0] + lattice[2], lattice[0] + lattice[1], lattice[1] + lattice[2]
+
+    def to_lattice_array(self, coordinates):
+        c = np.rint(np.asarray(coordinates, dtype=np.float64)).astype(np.int64)
+        x = c[..., 0]
+        y = c[..., 1]
+        z = c[..., 2]
+        return np.stack(((x + y - z) // 2, (y + z - x) // 2, (x + z - y) // 2), axis=-1)
+
     def get_dimension_count(self):
         return 3
 
@@ -78,5 +118,32 @@ class CCPGrid(Grid):
             return dz
         return (dx + dy + dz) / 2.0
 
+    def distance(self, start, end):
+        d = np.abs(np.asarray(start, dtype=np.float64) - np.asarray(end, dtype=np.float64))
+        return np.maximum(d.max(axis=-1), d.sum(axis=-1) / 2.0)
+
+    def _ring_offsets(self, radius):
+        # the distance is max(|x|, |y|, |z|, (|x| + |y| + |z|) / 2), so for fixed x and y
+        # only a few values of z are on the shell
+        if radius == 0:
+            yield 0, 0, 0
+            return
+        for x in range(-radius, radius + 1):
+            for y in range(-radius, radius + 1):
+                s = abs(x) + abs(y)
+                if s > 2 * radius:
+                    continue
+                if max(abs(x), abs(y)) == radius:
+                    z_max = min(radius, 2 * radius - s)
+                    for z in range(-z_max, z_max + 1):
+                        if (s + z) % 2 == 0:
+                            yield x, y, z
+                else:
+                    z = radius if s <= radius else 2 * radius - s
+                    if (s + z) % 2 == 0:
+                        yield x, y, z
+                        if z != 0:
+                            yield x, y, -z
+
     def get_center(self):
         return 0, 0, 0
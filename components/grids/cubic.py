@@ -1,5 +1,16 @@
+from types import MappingProxyType
+
+import numpy as np
+
 from components.grids.grid import Grid
 
+_DIRECTIONS = MappingProxyType({"LEFT": (-1, 0, 0),
+                                "RIGHT": (1, 0, 0),
+                                "UP": (0, 1, 0),
+                                "DOWN": (0, -1, 0),
+                                "FORWARD": (0, 0, 1),
+                                "BACK": (0, 0, -1)})
+
 
 class CubicGrid(Grid):
 
@@ -13,12 +24,7 @@ class CubicGrid(Grid):
 
     @property
     def directions(self):
-        return {"LEFT": (-1, 0, 0),
-                "RIGHT": (1, 0, 0),
-                "UP": (0, 1, 0),
-                "DOWN": (0, -1, 0),
-                "FORWARD": (0, 0, 1),
-                "BACK": (0, 0, -1)}
+        return _DIRECTIONS
 
     def get_box(self, width):
         locations = []
@@ -39,11 +45,30 @@ class CubicGrid(Grid):
                 round(coordinates[1]),
                 round(coordinates[2]))
 
+    def valid_mask(self, coordinates):
+        return np.all(np.asarray(coordinates, dtype=np.float64) % 1 == 0, axis=-1)
+
+    def snap(self, coordinates):
+        return np.round(np.asarray(coordinates, dtype=np.float64))
+
     def get_dimension_count(self):
         return 3
 
     def get_distance(self, start, end):
         return abs(start[0] - end[0]) + abs(start[1] - end[1]) + abs(start[2] - end[2])
 
+    def distance(self, start, end):
+        return np.abs(np.asarray(start, dtype=np.float64) - np.asarray(end, dtype=np.float64)).sum(axis=-1)
+
+    def _ring_offsets(self, radius):
+        # octahedral shell of the L1 metric: the z component is fixed up to its sign by x and y
+        for x in range(-radius, radius + 1):
+            rest = radius - abs(x)
+            for y in range(-rest, rest + 1):
+                z = rest - abs(y)
+                yield x, y, z
+                if z != 0:
+                    yield x, y, -z
+
     def get_center(self):
         return 0, 0, 0
@@ -1,9 +1,200 @@
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+import heapq
+from types import MappingProxyType
 import numpy as np
 
+# every cell of a grid is mapped to an integer lattice point (a, b, c). the three components are packed into
+# one int64 key with KEY_BITS bits per component, biased so that each field is non negative.
+# the packing is linear: key(p + d) == key(p) + get_key_offset(d), as long as no component leaves its field.
+KEY_BITS = 21
+KEY_BIAS = 1 << (KEY_BITS - 1)
+KEY_MASK = (1 << KEY_BITS) - 1
+KEY_PACKED_BIAS = (KEY_BIAS << (2 * KEY_BITS)) + (KEY_BIAS << KEY_BITS) + KEY_BIAS
+
+# upper bound for the total amount of key offsets that a grid keeps in its n-sphere cache.
+# the least recently used tables are evicted first, a single table larger than the bound is not cached at all.
+N_SPHERE_CACHE_SIZE = 1 << 20
+
+# amount of paths kept by a PathCache and the maximal amount of cells that find_path expands before it gives up
+PATH_CACHE_SIZE = 1024
+PATH_SEARCH_LIMIT = 100000
+
+
+class CoordinateMap(dict):
+    """
+    dictionary keyed by the packed integer keys of a grid.
+    item access, deletion and membership tests also accept coordinate tuples, which are converted with
+    grid.get_exact_key. coordinates that are not on the lattice of the grid are never in the map
+    """
+    __slots__ = ("grid",)
+
+    def __init__(self, grid):
+        super().__init__()
+        self.grid = grid
+
+    def _key(self, coordinates):
+        if type(coordinates) is int:
+            return coordinates
+        return self.grid.get_exact_key(coordinates)
+
+    def _existing_key(self, coordinates):
+        key = self._key(coordinates)
+        if key is None:
+            raise KeyError(coordinates)
+        return key
+
+    def _missing(self, coordinates):
+        # the KeyError names the coordinates, also if the caller passed a packed key
+        if type(coordinates) is int:
+            coordinates = self.grid.get_coordinates_from_key(coordinates)
+        return KeyError(coordinates)
+
+    def __getitem__(self, coordinates):
+        key = self._existing_key(coordinates)
+        try:
+            return dict.__getitem__(self, key)
+        except KeyError:
+            raise self._missing(coordinates) from None
+
+    def __setitem__(self, coordinates, value):
+        key = self._key(coordinates)
+        if key is None:
+            raise ValueError("%s are not coordinates of the grid" % str(coordinates))
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, coordinates):
+        key = self._existing_key(coordinates)
+        try:
+            dict.__delitem__(self, key)
+        except KeyError:
+            raise self._missing(coordinates) from None
+
+    def __contains__(self, coordinates):
+        return dict.__contains__(self, self._key(coordinates))
+
+    def get(self, coordinates, default=None):
+        return dict.get(self, self._key(coordinates), default)
+
+    def pop(self, coordinates, *default):
+        key = self._key(coordinates)
+        if key is None:
+            if default:
+                return default[0]
+            raise KeyError(coordinates)
+        if default:
+            return dict.pop(self, key, default[0])
+        try:
+            return dict.pop(self, key)
+        except KeyError:
+            raise self._missing(coordinates) from None
+
+    def setdefault(self, coordinates, default=None):
+        key = self._key(coordinates)
+        if key is None:
+            raise ValueError("%s are not coordinates of the grid" % str(coordinates))
+        return dict.setdefault(self, key, default)
+
+    def coordinates(self):
+        """
+        returns the coordinates of all keys in this map
+        :return: list of 3d tuples - '(float, float, float)'
+        """
+        return [self.grid.get_coordinates_from_key(key) for key in self.keys()]
+
+
+class PathCache:
+    """
+    LRU cache for paths found with Grid.find_path.
+    A path is dropped as soon as a blocking matter is put on one of its cells
+    """
+
+    def __init__(self, size=PATH_CACHE_SIZE):
+        self.size = size
+        self._paths = OrderedDict()
+        self._paths_on_key = {}
+
+    def get(self, cache_key):
+        """
+        returns a cached path
+        :param cache_key: (start key, end key, blocking matter types)
+        :return: the path or None, if it is not cached
+        """
+        path = self._paths.get(cache_key)
+        if path is not None:
+            self._paths.move_to_end(cache_key)
+            return path[0]
+        return None
+
+    def put(self, cache_key, path, path_keys):
+        """
+        caches a path
+        :param cache_key: (start key, end key, blocking matter types)
+        :param path: the path
+        :param path_keys: the keys of all cells the path enters
+        :return: None
+        """
+        self.remove(cache_key)
+        self._paths[cache_key] = (path, path_keys)
+        for key in path_keys:
+            self._paths_on_key.setdefault(key, set()).add(cache_key)
+        while len(self._paths) > self.size:
+            self.remove(next(iter(self._paths)))
+
+    def remove(self, cache_key):
+        entry = self._paths.pop(cache_key, None)
+        if entry is None:
+            return
+        for key in entry[1]:
+            on_key = self._paths_on_key[key]
+            on_key.discard(cache_key)
+            if not on_key:
+                del self._paths_on_key[key]
+
+    def invalidate(self, key, matter_type):
+        """
+        drops all paths through the given cell, that are blocked by the given matter type
+        :param key: grid key of the changed cell
+        :param matter_type: type of the matter that was put on the cell
+        :return: None
+        """
+        on_key = self._paths_on_key.get(key)
+        if on_key is None:
+            return
+        for cache_key in [c for c in on_key if matter_type in c[2]]:
+            self.remove(cache_key)
+
+    def clear(self):
+        self._paths.clear()
+        self._paths_on_key.clear()
+
+    def __len__(self):
+        return len(self._paths)
+
 
 class Grid(ABC):
 
+    def __init__(self):
+        self._direction_vectors = None
+        self._direction_names = None
+        self._direction_dictionary = None
+        self._direction_indices = None
+        self._opposite_direction_indices = None
+        self._direction_matrix = None
+        self._scaled_directions = None
+        self._key_offsets = {}
+        self._adjacent_key_offsets = None
+        self._n_sphere_cache = OrderedDict()
+        self._n_sphere_cache_entries = 0
+
+    def __getstate__(self):
+        # the direction tables and caches are rebuilt on demand, read only mappings can not be pickled
+        state = self.__dict__.copy()
+        empty = object.__new__(type(self))
+        Grid.__init__(empty)
+        state.update(empty.__dict__)
+        return state
+
     @property
     @abstractmethod
     def size(self):
@@ -32,27 +223,88 @@ class Grid(ABC):
         """
         pass
 
+    def _build_direction_tables(self):
+        directions = self.directions
+        self._direction_names = tuple(directions.keys())
+        self._direction_vectors = tuple(tuple(d) for d in directions.values())
+        self._direction_dictionary = MappingProxyType(dict(zip(self._direction_names, self._direction_vectors)))
+        indices = {}
+        for i, (name, d) in enumerate(zip(self._direction_names, self._direction_vectors)):
+            indices[name] = i
+            indices[d] = i
+        self._direction_indices = MappingProxyType(indices)
+        self._opposite_direction_indices = tuple(indices.get((-d[0], -d[1], -d[2]))
+                                                 for d in self._direction_vectors)
+        self._direction_matrix = np.array(self._direction_vectors, dtype=np.float64).reshape(-1, 3)
+        self._direction_matrix.setflags(write=False)
+
     def get_directions_dictionary(self):
         """
         returns a dictionary of the directions, with direction names (string) as keys
         and the direction vectors (3d tuple) as values
-        :return: dictionary with  - 'string: (float, float,float)'
+        :return: read only dictionary with  - 'string: (float, float,float)'
         """
-        return self.directions
+        if self._direction_dictionary is None:
+            self._build_direction_tables()
+        return self._direction_dictionary
 
     def get_directions_list(self):
         """
-        returns a list of the direction vectors
-        :return: list of 3d tuples - '(float, float, float)'
+        returns the direction vectors
+        :return: tuple of 3d tuples - '(float, float, float)'
         """
-        return list(self.directions.values())
+        if self._direction_vectors is None:
+            self._build_direction_tables()
+        return self._direction_vectors
 
     def get_directions_names(self):
         """
-        returns a list of direction names
-        :return: list of strings
+        returns the direction names
+        :return: tuple of strings
+        """
+        if self._direction_names is None:
+            self._build_direction_tables()
+        return self._direction_names
+
+    def get_direction_index(self, direction):
+        """
+        returns the index of a direction in get_directions_list()
+        :param direction: direction name (string) or direction vector (3d tuple)
+        :return: integer index
         """
-        return list(self.directions.keys())
+        if self._direction_indices is None:
+            self._build_direction_tables()
+        return self._direction_indices[direction]
+
+    def get_opposite_direction_index(self, index):
+        """
+        returns the index of the opposite direction
+        :param index: index in get_directions_list()
+        :return: integer index or None, if the grid has no opposite direction
+        """
+        if self._opposite_direction_indices is None:
+            self._build_direction_tables()
+        return self._opposite_direction_indices[index]
+
+    def get_opposite_direction(self, direction):
+        """
+        returns the opposite of the given direction
+        :param direction: direction vector (3d tuple)
+        :return: direction vector (3d tuple) or None, if the grid has no opposite direction
+        """
+        opposite = self.get_opposite_direction_index(self.get_direction_index(direction))
+        if opposite is None:
+            return None
+        return self._direction_vectors[opposite]
+
+    def get_directions_matrix(self):
+        """
+        returns the direction vectors as one read only numpy matrix, the rows are in the order of get_directions_list()
+        :return: numpy array of shape (amount of directions, 3)
+        """
+        if self._direction_matrix is None:
+            self._build_direction_tables()
+        return self._direction_matrix
 
     def get_lines(self):
         """
@@ -95,6 +347,165 @@ class Grid(ABC):
         """
         pass
 
+    def valid_mask(self, coordinates):
+        """
+        vectorized are_valid_coordinates
+        :param coordinates: array like of shape (..., 3)
+        :return: numpy bool array of shape (...)
+        """
+        coordinates = np.asarray(coordinates, dtype=np.float64)
+        flat = coordinates.reshape(-1, 3)
+        mask = np.fromiter((self.are_valid_coordinates(tuple(c)) for c in flat), dtype=np.bool_, count=len(flat))
+        return mask.reshape(coordinates.shape[:-1])
+
+    def distance(self, start, end):
+        """
+        vectorized get_distance
+        :param start: array like of shape (..., 3), broadcastable against end
+        :param end: array like of shape (..., 3)
+        :return: numpy array of the distances
+        """
+        start, end = np.broadcast_arrays(np.asarray(start, dtype=np.float64), np.asarray(end, dtype=np.float64))
+        flat_start = start.reshape(-1, 3)
+        flat_end = end.reshape(-1, 3)
+        result = np.fromiter((self.get_distance(tuple(s), tuple(e)) for s, e in zip(flat_start, flat_end)),
+                             dtype=np.float64, count=len(flat_start))
+        return result.reshape(start.shape[:-1])
+
+    def step(self, coordinates, direction_index):
+        """
+        vectorized get_coordinates_in_direction
+        :param coordinates: array like of shape (..., 3)
+        :param direction_index: index into get_directions_list(), an integer or an integer array of shape (...)
+        :return: numpy array of shape (..., 3)
+        """
+        return np.asarray(coordinates, dtype=np.float64) + self.get_directions_matrix()[direction_index]
+
+    def snap(self, coordinates):
+        """
+        vectorized get_nearest_valid_coordinates
+        :param coordinates: array like of shape (..., 3)
+        :return: numpy array of shape (..., 3)
+        """
+        coordinates = np.asarray(coordinates, dtype=np.float64)
+        flat = coordinates.reshape(-1, 3)
+        result = np.array([self.get_nearest_valid_coordinates(tuple(c)) for c in flat], dtype=np.float64)
+        return result.reshape(coordinates.shape)
+
+    def to_lattice(self, coordinates):
+        """
+        maps valid coordinates of this grid to integer lattice coordinates.
+        the mapping has to be linear, so that directions map to constant lattice offsets.
+        other coordinates are rounded to a lattice point, use get_exact_key to reject them
+        :param coordinates: (float, float, float)
+        :return: (int, int, int)
+        """
+        return round(coordinates[0]), round(coordinates[1]), round(coordinates[2])
+
+    def from_lattice(self, lattice):
+        """
+        inverse of to_lattice, integral components are returned as int
+        :param lattice: (int, int, int)
+        :return: coordinates, (float, float, float) tuple
+        """
+        return lattice[0], lattice[1], lattice[2]
+
+    def get_key(self, coordinates):
+        """
+        packs the coordinates into a single integer key.
+        only valid coordinates of this grid have a unique key
+        :param coordinates: (float, float, float)
+        :return: integer key
+        """
+        a, b, c = self.to_lattice(coordinates)
+        return (a << (2 * KEY_BITS)) + (b << KEY_BITS) + c + KEY_PACKED_BIAS
+
+    def get_exact_key(self, coordinates):
+        """
+        like get_key, but for coordinates that are not exactly on the lattice of this grid
+        (e.g. (0.3, 0, 0)) there is no key
+        :param coordinates: (float, float, float)
+        :return: integer key or None
+        """
+        lattice = self.to_lattice(coordinates)
+        if self.from_lattice(lattice) != tuple(coordinates):
+            return None
+        a, b, c = lattice
+        return (a << (2 * KEY_BITS)) + (b << KEY_BITS) + c + KEY_PACKED_BIAS
+
+    def to_lattice_array(self, coordinates):
+        """
+        vectorized to_lattice
+        :param coordinates: array like of shape (..., 3)
+        :return: numpy int64 array of shape (..., 3)
+        """
+        return np.rint(np.asarray(coordinates, dtype=np.float64)).astype(np.int64)
+
+    def get_keys(self, coordinates):
+        """
+        vectorized get_key
+        :param coordinates: array like of shape (..., 3)
+        :return: numpy int64 array of shape (...)
+        """
+        lattice = self.to_lattice_array(coordinates)
+        return (lattice[..., 0] << (2 * KEY_BITS)) + (lattice[..., 1] << KEY_BITS) + lattice[..., 2] \
+            + KEY_PACKED_BIAS
+
+    def get_coordinates_from_key(self, key):
+        """
+        unpacks a key created with get_key
+        :param key: integer key
+        :return: coordinates, (float, float, float) tuple
+        """
+        return self.from_lattice((((key >> (2 * KEY_BITS)) & KEY_MASK) - KEY_BIAS,
+                                  ((key >> KEY_BITS) & KEY_MASK) - KEY_BIAS,
+                                  (key & KEY_MASK) - KEY_BIAS))
+
+    def get_key_offset(self, direction):
+        """
+        returns the value that has to be added to a key to go one step in the given direction
+        :param direction: direction vector, (float, float, float) tuple
+        :return: integer key offset
+        """
+        offset = self._key_offsets.get(direction)
+        if offset is None:
+            offset = self._pack_offset(direction)
+            self._key_offsets[direction] = offset
+        return offset
+
+    def _pack_offset(self, vector):
+        a, b, c = self.to_lattice(vector)
+        return (a << (2 * KEY_BITS)) + (b << KEY_BITS) + c
+
+    def _unpack_offset(self, offset):
+        return self.get_coordinates_from_key(offset + KEY_PACKED_BIAS)
+
+    def get_key_offsets(self):
+        """
+        returns the key offsets of all directions
+        :return: tuple of integer key offsets, in the order of get_directions_list()
+        """
+        if self._adjacent_key_offsets is None:
+            self._adjacent_key_offsets = tuple(self.get_key_offset(d) for d in self.get_directions_list())
+        return self._adjacent_key_offsets
+
+    def get_key_in_direction(self, key, direction):
+        """
+        same as get_coordinates_in_direction, but for keys
+        :param key: integer key of the current position
+        :param direction: direction vector, (float, float, float) tuple
+        :return: integer key of the new position
+        """
+        return key + self.get_key_offset(direction)
+
+    def get_adjacent_keys(self, key):
+        """
+        calculates the keys of all adjacent cells
+        :param key: integer key
+        :return: list of integer keys
+        """
+        return [key + offset for offset in self.get_key_offsets()]
+
     @staticmethod
     def get_coordinates_in_direction(position, direction):
         """
@@ -128,24 +539,8 @@ class Grid(ABC):
         :param coordinates: the coordinates of which the neighboring coordinates should be calculated
         :return: a set of coordinates
         """
-        n = set()
-        for d in self.get_directions_list():
-            n.add(self.get_coordinates_in_direction(coordinates, d))
-        return n
-
-    def _get_adjacent_coordinates_not_in_set(self, coordinates, not_in_set):
-        """
-        the same as 'get_neighboring_coordinates', but doesn't return coordinates which are in the given 'not_in_set'.
-        :param coordinates: the coordinates of which the neighboring coordinates should be calculated
-        :param not_in_set: set of coordinates, which should not be included in the result
-        :return: a set of coordinates
-        """
-        result = set()
-        for d in self.get_directions_list():
-            n = self.get_coordinates_in_direction(coordinates, d)
-            if n not in not_in_set:
-                result.add(n)
-        return result
+        x, y, z = coordinates
+        return {(x + d[0], y + d[1], z + d[2]) for d in self.get_directions_list()}
 
     def get_n_sphere(self, coordinates, radius):
         """
@@ -154,20 +549,35 @@ class Grid(ABC):
         :param radius: radius of the circle/sphere
         :return: set of coordinates
         """
-        result = set()
-        ns = self.get_adjacent_coordinates(coordinates)
-        current_ns = ns
-        result.update(ns)
+        key = self.get_key(coordinates)
+        return {self.get_coordinates_from_key(key + offset) for offset in self.get_n_sphere_offsets(radius)}
 
-        for _ in range(radius):
-            tmp = set()
-            for n in current_ns:
-                ns = self._get_adjacent_coordinates_not_in_set(n, result)
-                tmp.update(ns)
-                result.update(ns)
-            current_ns = tmp
+    def get_n_sphere_keys(self, key, radius):
+        """
+        same as get_n_sphere, but for keys
+        :param key: key of the center of the circle/sphere
+        :param radius: radius of the circle/sphere
+        :return: set of integer keys
+        """
+        return {key + o for o in self.get_n_sphere_offsets(radius)}
 
-        return result
+    def get_n_sphere_offsets(self, radius):
+        """
+        returns the key offsets of the n-sphere with the given radius, relative to its center.
+        the offsets are ordered by their distance to the center
+        :param radius: radius of the circle/sphere
+        :return: tuple of integer key offsets
+        """
+        offsets = self._get_cached_offsets(("sphere", radius))
+        if offsets is None:
+            if radius == 0:
+                offsets = self.get_n_sphere_border_offsets(1)
+            else:
+                offsets = ()
+                for r in range(radius + 2):
+                    offsets += self.get_n_sphere_border_offsets(r)
+            self._cache_offsets(("sphere", radius), offsets)
+        return offsets
 
     def get_n_sphere_border(self, coordinates, radius):
         """
@@ -181,21 +591,98 @@ class Grid(ABC):
             r.add(coordinates)
             return r
 
-        seen = set()
-        ns = self.get_adjacent_coordinates(coordinates)
-        current_ns = ns
-        seen.update(ns)
-        seen.add(coordinates)
+        key = self.get_key(coordinates)
+        return {self.get_coordinates_from_key(key + offset) for offset in self.get_n_sphere_border_offsets(radius)}
+
+    def get_n_sphere_border_keys(self, key, radius):
+        """
+        same as get_n_sphere_border, but for keys
+        :param key: key of the center of the ring
+        :param radius: radius of the ring
+        :return: set of integer keys
+        """
+        return {key + o for o in self.get_n_sphere_border_offsets(radius)}
+
+    def get_n_sphere_border_offsets(self, radius):
+        """
+        returns the key offsets of the border of the n-sphere with the given radius, relative to its center.
+        all grids are translation invariant in lattice space, so one table per radius is enough.
+        the offsets are in the order of a breadth first search, which expands the cells of the inner ring in
+        their order and the directions in the order of get_directions_list. the order is the same for every
+        center, so the scans return their hits in this order
+        :param radius: radius of the ring
+        :return: tuple of integer key offsets
+        """
+        if radius == 0:
+            return 0,
+        offsets = self._get_cached_offsets(("border", radius))
+        if offsets is not None:
+            return offsets
+        # grow the rings outwards, starting at the largest pair of cached rings.
+        # a ring only touches the two rings inside of it
+        previous, current, start = (), (0,), 1
+        for r in range(radius - 1, 0, -1):
+            inner = self._n_sphere_cache.get(("border", r - 1))
+            outer = self._n_sphere_cache.get(("border", r))
+            if inner is not None and outer is not None:
+                previous, current, start = inner, outer, r + 1
+                break
+        for r in range(start, radius + 1):
+            inner = set(current)
+            inner.update(previous)
+            # a dict keeps the order in which the offsets were found
+            ring = dict.fromkeys(n + o for n in current for o in self.get_key_offsets() if n + o not in inner)
+            previous, current = current, tuple(ring)
+            self._cache_offsets(("border", r), current)
+        return current
+
+    def _ring_offsets(self, radius):
+        """
+        closed form of the ring with the given radius around (0, 0, 0), used by iter_ring.
+        grids without a closed form return None, iter_ring then uses get_n_sphere_border_offsets
+        :param radius: radius of the ring
+        :return: iterable of offset vectors or None
+        """
+        return None
+
+    def iter_ring(self, center, radius):
+        """
+        generates all coordinates with the given distance to the center
+        :param center: coordinates, (float, float, float) tuple, center of the ring
+        :param radius: radius of the ring
+        :return: generator of coordinates
+        """
+        ring = self._ring_offsets(radius)
+        if ring is None:
+            ring = (self._unpack_offset(offset) for offset in self.get_n_sphere_border_offsets(radius))
+        for d in ring:
+            yield center[0] + d[0], center[1] + d[1], center[2] + d[2]
+
+    def iter_ball(self, center, radius):
+        """
+        generates all coordinates within the given distance to the center, ordered by their distance.
+        the center is included
+        :param center: coordinates, (float, float, float) tuple, center of the ball
+        :param radius: radius of the ball
+        :return: generator of coordinates
+        """
+        for r in range(radius + 1):
+            yield from self.iter_ring(center, r)
 
-        for _ in range(radius-1):
-            tmp = set()
-            for n in current_ns:
-                ns = self._get_adjacent_coordinates_not_in_set(n, seen)
-                seen.update(ns)
-                tmp.update(ns)
-            current_ns = tmp
+    def _get_cached_offsets(self, cache_key):
+        offsets = self._n_sphere_cache.get(cache_key)
+        if offsets is not None:
+            self._n_sphere_cache.move_to_end(cache_key)
+        return offsets
 
-        return current_ns
+    def _cache_offsets(self, cache_key, offsets):
+        if len(offsets) > N_SPHERE_CACHE_SIZE:
+            return
+        self._n_sphere_cache[cache_key] = offsets
+        self._n_sphere_cache_entries += len(offsets)
+        while self._n_sphere_cache_entries > N_SPHERE_CACHE_SIZE:
+            _, evicted = self._n_sphere_cache.popitem(last=False)
+            self._n_sphere_cache_entries -= len(evicted)
 
     def get_nearest_direction(self, position, target):
         """
@@ -210,22 +697,72 @@ class Grid(ABC):
 
         v = (target[0] - position[0], target[1] - position[1], target[2] - position[2])
         v_length = np.sqrt((v[0]*v[0])+(v[1]*v[1])+(v[2]*v[2]))
-        s = self.get_scaling()
-        best = None
-        best_angle = 0
-        for d in self.get_directions_list():
-            sd = (d[0]*s[0], d[1]*s[1], d[2]*s[2])
-            d_length = np.sqrt((sd[0]*sd[0])+(sd[1]*sd[1])+(sd[2]*sd[2]))
-            if d_length*v_length != 0:
-                angle = np.arccos((v[0]*sd[0]+v[1]*sd[1]+v[2]*sd[2])/(d_length * v_length))
-                if best is None:
-                    best = d
-                    best_angle = angle
-                else:
-                    if angle < best_angle:
-                        best_angle = angle
-                        best = d
-        return best
+        if v_length == 0:
+            return None
+        if self._scaled_directions is None:
+            scaled = self.get_directions_matrix() * np.array(self.get_scaling(), dtype=np.float64)
+            lengths = np.sqrt((scaled[:, 0]*scaled[:, 0])+(scaled[:, 1]*scaled[:, 1])+(scaled[:, 2]*scaled[:, 2]))
+            self._scaled_directions = scaled, lengths
+        sd, d_length = self._scaled_directions
+        angles = np.arccos((v[0]*sd[:, 0]+v[1]*sd[:, 1]+v[2]*sd[:, 2])/(d_length * v_length))
+        angles[d_length == 0] = np.inf
+        return self.get_directions_list()[int(np.argmin(angles))]
+
+    def find_path(self, start, end, blocked=(), bounds=None, limit=PATH_SEARCH_LIMIT):
+        """
+        finds a shortest path from start to end with A*, using get_distance as the heuristic.
+        the end itself is never treated as blocked, so a path can lead onto an occupied target
+        :param start: coordinates, (float, float, float) tuple, start of the path
+        :param end: coordinates, (float, float, float) tuple, end of the path
+        :param blocked: containers of blocked grid keys, e.g. coordinate maps of the world
+        :param bounds: optional maximal absolute x, y and z values of the cells on the path
+        :param limit: maximal amount of expanded cells
+        :return: list of directions or None, if there is no path (within the limit)
+        """
+        start_key = self.get_key(start)
+        end_key = self.get_key(end)
+        if start_key == end_key:
+            return []
+        offsets = self.get_key_offsets()
+        directions = self.get_directions_list()
+        costs = {start_key: 0}
+        parents = {start_key: None}
+        h = self.get_distance(start, end)
+        open_heap = [(h, h, 0, start_key)]
+        counter = 1
+        expanded = 0
+        while open_heap:
+            f, h, _, key = heapq.heappop(open_heap)
+            if key == end_key:
+                path = []
+                while parents[key] is not None:
+                    key, direction = parents[key]
+                    path.append(directions[direction])
+                path.reverse()
+                return path
+            cost = costs[key]
+            if f > cost + h:
+                # outdated heap entry
+                continue
+            expanded += 1
+            if expanded > limit:
+                return None
+            for i, offset in enumerate(offsets):
+                n = key + offset
+                if costs.get(n, cost + 2) <= cost + 1:
+                    continue
+                if n != end_key and any(n in b for b in blocked):
+                    continue
+                coordinates = self.get_coordinates_from_key(n)
+                if bounds is not None and (abs(coordinates[0]) > bounds[0] or abs(coordinates[1]) > bounds[1]
+                                           or abs(coordinates[2]) > bounds[2]):
+                    continue
+                costs[n] = cost + 1
+                parents[n] = (key, i)
+                h = self.get_distance(coordinates, end)
+                heapq.heappush(open_heap, (cost + 1 + h, h, counter, n))
+                counter += 1
+        return None
 
     def get_shortest_path(self, start, end):
         current = start
@@ -1,5 +1,14 @@
+from types import MappingProxyType
+
+import numpy as np
+
 from components.grids.grid import Grid
 
+_DIRECTIONS = MappingProxyType({"LEFT": (-1, 0, 0),
+                                "RIGHT": (1, 0, 0),
+                                "UP": (0, 1, 0),
+                                "DOWN": (0, -1, 0)})
+
 
 class QuadraticGrid(Grid):
 
@@ -13,10 +22,7 @@ class QuadraticGrid(Grid):
 
     @property
     def directions(self):
-        return {"LEFT": (-1, 0, 0),
-                "RIGHT": (1, 0, 0),
-                "UP": (0, 1, 0),
-                "DOWN": (0, -1, 0)}
+        return _DIRECTIONS
 
     def get_box(self, width):
         locations = []
@@ -35,11 +41,35 @@ class QuadraticGrid(Grid):
         return (round(coordinates[0]),
                 round(coordinates[1]), 0.0)
 
+    def valid_mask(self, coordinates):
+        coordinates = np.asarray(coordinates, dtype=np.float64)
+        return (coordinates[..., 0] % 1 == 0) & (coordinates[..., 1] % 1 == 0)
+
+    def snap(self, coordinates):
+        result = np.round(np.asarray(coordinates, dtype=np.float64))
+        result[..., 2] = 0.0
+        return result
+
     def get_dimension_count(self):
         return 2
 
     def get_distance(self, start, end):
         return abs(start[0] - end[0]) + abs(start[1] - end[1])
 
+    def distance(self, start, end):
+        d = np.abs(np.asarray(start, dtype=np.float64) - np.asarray(end, dtype=np.float64))
+        return d[..., 0] + d[..., 1]
+
+    def _ring_offsets(self, radius):
+        # diamond of the L1 metric, walking one side per quadrant
+        if radius == 0:
+            yield 0, 0, 0
+            return
+        for i in range(radius):
+            yield radius - i, i, 0
+            yield -i, radius - i, 0
+            yield i - radius, -i, 0
+            yield i, i - radius, 0
+
     def get_center(self):
         return 0, 0, 0
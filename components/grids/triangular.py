@@ -1,7 +1,17 @@
 import math
+from types import MappingProxyType
+
+import numpy as np
 
 from components.grids.grid import Grid
 
+_DIRECTIONS = MappingProxyType({"NE":  (0.5,   1, 0),
+                                "E":   (1,     0, 0),
+                                "SE":  (0.5,  -1, 0),
+                                "SW":  (-0.5, -1, 0),
+                                "W":   (-1,    0, 0),
+                                "NW":  (-0.5,  1, 0)})
+
 
 class TriangularGrid(Grid):
 
@@ -15,12 +25,7 @@ class TriangularGrid(Grid):
 
     @property
     def directions(self):
-        return {"NE":  (0.5,   1, 0),
-                "E":   (1,     0, 0),
-                "SE":  (0.5,  -1, 0),
-                "SW":  (-0.5, -1, 0),
-                "W":   (-1,    0, 0),
-                "NW":  (-0.5,  1, 0)}
+        return _DIRECTIONS
 
     def get_box(self, width):
         locs = []
@@ -56,8 +61,31 @@ class TriangularGrid(Grid):
 
         return nearest_x, nearest_y, 0
 
-    def get_directions_dictionary(self):
-        return self.directions
+    def valid_mask(self, coordinates):
+        coordinates = np.asarray(coordinates, dtype=np.float64)
+        x_offset = np.where(coordinates[..., 1] % 2.0 == 0.0, 0.0, 0.5)
+        return (coordinates[..., 2] == 0.0) & (coordinates[..., 0] % 1.0 == x_offset)
+
+    def snap(self, coordinates):
+        coordinates = np.asarray(coordinates, dtype=np.float64)
+        result = np.zeros_like(coordinates)
+        result[..., 1] = np.round(coordinates[..., 1])
+        x = coordinates[..., 0]
+        result[..., 0] = np.where(result[..., 1] % 2 == 0, np.round(x),
+                                  np.trunc(x) + np.where(x < 0, -0.5, 0.5))
+        return result
+
+    def to_lattice(self, coordinates):
+        # x moves in half steps, doubling it makes it an integer
+        return round(coordinates[0] * 2), round(coordinates[1]), round(coordinates[2])
+
+    def from_lattice(self, lattice):
+        x = lattice[0]
+        return x // 2 if x % 2 == 0 else x * 0.5, lattice[1], lattice[2]
+
+    def to_lattice_array(self, coordinates):
+        coordinates = np.asarray(coordinates, dtype=np.float64)
+        return np.rint(coordinates * np.array([2.0, 1.0, 1.0])).astype(np.int64)
 
     def get_dimension_count(self):
         return 2
@@ -78,6 +106,24 @@ class TriangularGrid(Grid):
         return abs(end[1] - start[1])
 
 
+    def _ring_offsets(self, radius):
+        # hexagon: start in the south west corner and walk each of the six sides
+        if radius == 0:
+            yield 0, 0, 0
+            return
+        x, y = -0.5 * radius, -radius
+        for dx, dy in ((1, 0), (0.5, 1), (-0.5, 1), (-1, 0), (-0.5, -1), (0.5, -1)):
+            for _ in range(radius):
+                yield x, y, 0
+                x += dx
+                y += dy
+
+    def distance(self, start, end):
+        d = np.abs(np.asarray(start, dtype=np.float64) - np.asarray(end, dtype=np.float64))
+        dx = d[..., 0]
+        dy = d[..., 1]
+        return np.where(dx - dy * 0.5 > 0, dx + dy * 0.5, dy)
+
     def get_nearest_direction(self, start, end):
         best_distance = None
         best_direction  = None
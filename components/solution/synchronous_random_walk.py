@@ -0,0 +1,23 @@
+"""
+A random walk for the synchronous round mode (synchronous_rounds = True in config.ini).
+Every agent takes an item next to it, if it does not carry one yet, and moves into a random direction.
+The solution function runs the same step in a synchronous round, so it can also be used without the mode.
+"""
+from core.matter import MatterType
+from core.synchronous import move, take
+
+
+def step(snapshot, agent):
+    directions = snapshot.grid.get_directions_list()
+    intents = []
+    if agent.carried_item is None:
+        for direction in directions:
+            if snapshot.get_matter_in(agent, direction, MatterType.ITEM) is not None:
+                intents.append(take(agent.id, direction))
+                break
+    intents.append(move(agent.id, snapshot.get_random(agent.id).choice(directions)))
+    return intents
+
+
+def solution(world):
+    world.run_synchronous_round(step)
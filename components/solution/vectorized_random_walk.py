@@ -0,0 +1,6 @@
+"""Random walk of all agents with the vectorized kernel of the world, see core.vectorized.random_walk.
+The kernel is fastest with agent_store = True in config.ini, it then reads the agent columns without a loop"""
+
+
+def solution(world):
+    world.random_walk_agents()
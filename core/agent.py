@@ -8,25 +8,206 @@
 TODO: Erase Memory
 
 """
-import importlib
 import logging
-from core import matter
+from core import matter, metrics
 from core.swarm_sim_header import *
 
 
+class _StoreColumn:
+    """
+    Attribute of an agent. It is kept in a column of the agent store while the agent has a row there
+    and in the state dict of the agent otherwise
+    """
+
+    def __init__(self, column, to_python=None, array=None, to_array=None):
+        """
+        :param column: the column of the agent store
+        :param to_python: converts a numpy value of the column, e.g. int
+        :param array: numpy column that keeps the same value as numbers, e.g. positions for coordinates
+        :param to_array: converts the value for the numpy column
+        """
+        self.column = column
+        self.to_python = to_python
+        self.array = array
+        self.to_array = to_array
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, agent, owner=None):
+        if agent is None:
+            return self
+        store = agent._store
+        if store is None:
+            try:
+                return agent._row[self.name]
+            except KeyError:
+                raise AttributeError(self.name) from None
+        value = getattr(store, self.column)[agent._row]
+        return value if self.to_python is None else self.to_python(value)
+
+    def __set__(self, agent, value):
+        store = agent._store
+        if store is None:
+            agent._row[self.name] = value
+        else:
+            getattr(store, self.column)[agent._row] = value
+            if self.array is not None:
+                getattr(store, self.array)[agent._row] = value if self.to_array is None else self.to_array(value)
+
+
+def _get_id_or_zero(matter):
+    return 0 if matter is None else matter.get_id()
+
+
 class Agent(matter.Matter):
+    # an agent is a view: besides the world it only keeps its row in world.agent_store.
+    # if the agent has no row (the store is disabled or the agent was removed) _store is None
+    # and _row is a dict with the state of the agent
+    __slots__ = ("world", "_store", "_row")
+
+    type = MatterType.AGENT
+    _Matter__id = _StoreColumn("ids", int)
+    number = _StoreColumn("numbers", int)
+    coordinates = _StoreColumn("coordinates", array="positions")
+    color = _StoreColumn("color", array="colors")
+    _carried = _StoreColumn("carried", bool)
+    steps = _StoreColumn("steps", int)
+    created = _StoreColumn("created", bool)
+    carried_item = _StoreColumn("carried_items", array="carried_item_ids", to_array=_get_id_or_zero)
+    carried_agent = _StoreColumn("carried_agents", array="carried_agent_ids", to_array=_get_id_or_zero)
 
     def __init__(self, world, coordinates, color, agent_counter=0):
         """Initializing the agent"""
-        super().__init__(world, coordinates, color,
-                         matter_type=MatterType.AGENT, mm_size=world.config_data.agent_mm_size)
+        self.world = world
+        self._store = world.agent_store
+        self._row = {} if self._store is None else self._store.add(self)
+        self.coordinates = coordinates
+        self.color = color
+        self._Matter__id = world.allocate_matter_id(self)
         self.number = agent_counter
-        self.__isCarried = False
+        self._carried = False
         self.carried_item = None
         self.carried_agent = None
         self.steps = 0
-        csv_generator_module = importlib.import_module('components.generators.csv.%s' % world.config_data.csv_generator)
-        self.csv_agent_writer = csv_generator_module.CsvAgentData(self.get_id(), self.number)
+        self.created = False
+        self.csv_agent_writer = world.csv_generator_module.CsvAgentData(self.get_id(), agent_counter,
+                                                                        world.metrics)
+
+    def _attributes(self, create):
+        """
+        the dict with the attributes that are not a column of the agent store, e.g. the ones set by a solution
+        :param create: creates the dict of a store row if it has none yet
+        :return: dict or None
+        """
+        if self._store is None:
+            return self._row
+        attributes = self._store.attributes[self._row]
+        if attributes is None and create:
+            attributes = self._store.attributes[self._row] = {}
+        return attributes
+
+    def __getattr__(self, name):
+        # only called if the normal lookup fails. _store and _row are unset while an agent is unpickled
+        if name in Agent.__slots__:
+            raise AttributeError(name)
+        attributes = self._attributes(False)
+        if attributes is None or name not in attributes:
+            raise AttributeError("'%s' object has no attribute '%s'" % (type(self).__name__, name))
+        return attributes[name]
+
+    def __setattr__(self, name, value):
+        try:
+            object.__setattr__(self, name, value)
+        except AttributeError:
+            self._attributes(True)[name] = value
+
+    def __delattr__(self, name):
+        try:
+            object.__delattr__(self, name)
+        except AttributeError:
+            attributes = self._attributes(False)
+            if attributes is None or name not in attributes:
+                raise
+            del attributes[name]
+
+    @property
+    def _memory(self):
+        attributes = self._attributes(True)
+        memory = attributes.get("_memory")
+        if memory is None:
+            memory = attributes["_memory"] = {}
+        return memory
+
+    @_memory.setter
+    def _memory(self, memory):
+        self._attributes(True)["_memory"] = memory
+
+    @property
+    def csv_agent_writer(self):
+        if self._store is None:
+            return self._row["csv_agent_writer"]
+        # the store only keeps the counter row, the writer is a light wrapper around it.
+        # it is only created for the csv export, the events are counted with _count
+        return self.world.csv_generator_module.CsvAgentData(self.get_id(), self.number, self.world.metrics,
+                                                            int(self._store.metric_rows[self._row]))
+
+    @csv_agent_writer.setter
+    def csv_agent_writer(self, csv_agent_writer):
+        if self._store is None:
+            self._row["csv_agent_writer"] = csv_agent_writer
+        else:
+            self._store.metric_rows[self._row] = csv_agent_writer.row
+
+    def _count(self, metric, amount=1):
+        """
+        counts an event of the agent. in the store the counter row is used directly,
+        so no CsvAgentData is created for an event
+        """
+        if self._store is None:
+            self._row["csv_agent_writer"].count(metric, amount)
+        else:
+            self.world.metrics.agent_counters[self._store.metric_rows[self._row], metric] += amount
+
+    @property
+    def memory_limitation(self):
+        attributes = self._attributes(False)
+        if attributes is None or "memory_limitation" not in attributes:
+            return self.world.config_data.memory_limitation
+        return attributes["memory_limitation"]
+
+    @memory_limitation.setter
+    def memory_limitation(self, memory_limitation):
+        self._attributes(True)["memory_limitation"] = memory_limitation
+
+    @property
+    def mm_size(self):
+        attributes = self._attributes(False)
+        if attributes is None or "mm_size" not in attributes:
+            return self.world.config_data.agent_mm_size
+        return attributes["mm_size"]
+
+    @mm_size.setter
+    def mm_size(self, mm_size):
+        self._attributes(True)["mm_size"] = mm_size
+
+    def detach_from_store(self):
+        """
+        Copies the state of the agent out of the agent store and frees its row.
+        Called by the world when the agent is removed
+
+        :return: None
+        """
+        if self._store is not None:
+            state = dict(self._attributes(False) or ())
+            for name, value in vars(Agent).items():
+                if isinstance(value, _StoreColumn):
+                    state[name] = getattr(self, name)
+            state["csv_agent_writer"] = self.csv_agent_writer
+            self._store.remove(self._row)
+            self._store = None
+            self._row = state
 
     def carries_item(self):
         if self.carried_item is None:
@@ -45,7 +226,7 @@ class Agent(matter.Matter):
         Get the status if it is taken or not
         :return: boolean, carried status
         """
-        return self.__isCarried
+        return self._carried
 
     def is_on_item(self):
         """
@@ -80,21 +261,30 @@ class Agent(matter.Matter):
         direction_coord = self.check_within_border(direction, direction_coord)
         if self.world.grid.are_valid_coordinates(direction_coord) \
                 and direction_coord not in self.world.agent_map_coordinates \
-                and not self.__isCarried:
-            if self.coordinates in self.world.agent_map_coordinates:
-                del self.world.agent_map_coordinates[self.coordinates]
+                and not self._carried:
+            self.world.vacate_cell(self, self.coordinates)
             self.coordinates = direction_coord
-            self.world.agent_map_coordinates[self.coordinates] = self
+            self.world.occupy_cell(self, direction_coord)
             if self.world.vis is not None:
                 self.world.vis.agent_changed(self)
             logging.info("Agent %s successfully moved to %s", str(self.get_id()), direction)
-            self.world.csv_round.update_metrics(steps=1)
-            self.csv_agent_writer.write_agent(steps=1)
+            self.world.metrics.count(metrics.STEPS)
+            self._count(metrics.STEPS)
             self.check_for_carried_matter()
             return True
 
         return False
 
+    def find_path_to(self, coordinates, blocking=(MatterType.AGENT, MatterType.ITEM)):
+        """
+        Finds a shortest path from the agents position to the given coordinates around the matter of the given types
+
+        :param coordinates: the target coordinates
+        :param blocking: matter types that block the path
+        :return: list of directions or None if there is no path
+        """
+        return self.world.find_path(self.coordinates, coordinates, blocking)
+
     def check_for_carried_matter(self):
         if self.carried_item is not None:
             self.carried_item.coordinates = self.coordinates
@@ -142,76 +332,92 @@ class Agent(matter.Matter):
         if tmp_memory is not None \
                 and not (hasattr(tmp_memory, '__len__')) or len(tmp_memory) > 0:
             if target.type == MatterType.AGENT:
-                self.world.csv_round.update_metrics(agent_read=1)
-                self.csv_agent_writer.write_agent(agent_read=1)
+                self.world.metrics.count(metrics.AGENT_READ)
+                self._count(metrics.AGENT_READ)
             elif target.type == MatterType.ITEM:
-                self.world.csv_round.update_metrics(item_read=1)
-                self.csv_agent_writer.write_agent(item_read=1)
+                self.world.metrics.count(metrics.ITEM_READ)
+                self._count(metrics.ITEM_READ)
             elif target.type == MatterType.LOCATION:
-                self.world.csv_round.update_metrics(location_read=1)
-                self.csv_agent_writer.write_agent(location_read=1)
+                self.world.metrics.count(metrics.LOCATION_READ)
+                self._count(metrics.LOCATION_READ)
             return tmp_memory
         return None
 
+    def _cell_in(self, direction):
+        return self.world.get_cell(get_coordinates_in_direction(self.coordinates, direction))
+
     def matter_in(self, direction):
         """
         :param direction: the direction to check if a matter is there
         :return: True: if a matter is there, False: if not
         """
-        coords = get_coordinates_in_direction(self.coordinates, direction)
-        return (coords in self.world.get_item_map_coordinates() or
-                coords in self.world.get_agent_map_coordinates() or
-                coords in self.world.get_location_map_coordinates())
+        return self._cell_in(direction) is not None
 
     def item_in(self, direction):
         """
         :param direction: the direction to check if an item is there
         :return: True: if an item is there, False: if not
         """
-        return get_coordinates_in_direction(self.coordinates, direction) in self.world.get_item_map_coordinates()
+        cell = self._cell_in(direction)
+        return cell is not None and cell.item is not None
 
     def agent_in(self, direction):
         """
         :param direction: the direction to check if an agent is there
         :return: True: if an agent is there, False: if not
         """
-        return get_coordinates_in_direction(self.coordinates, direction) in self.world.get_agent_map_coordinates()
+        cell = self._cell_in(direction)
+        return cell is not None and cell.agent is not None
 
     def location_in(self, direction):
         """
         :param direction: the direction to check if a location is there
         :return: True: if a location is there, False: if not
         """
-        return get_coordinates_in_direction(self.coordinates, direction) in self.world.get_location_map_coordinates()
+        cell = self._cell_in(direction)
+        return cell is not None and cell.location is not None
 
     def get_matter_in(self, direction):
-        if get_coordinates_in_direction(self.coordinates, direction) in self.world.get_item_map_coordinates():
-            return self.world.get_item_map_coordinates()[get_coordinates_in_direction(self.coordinates, direction)]
-        elif get_coordinates_in_direction(self.coordinates, direction) in self.world.get_agent_map_coordinates():
-            return self.world.get_agent_map_coordinates()[get_coordinates_in_direction(self.coordinates, direction)]
-        elif get_coordinates_in_direction(self.coordinates, direction) in self.world.get_location_map_coordinates():
-            return self.world.get_location_map_coordinates()[get_coordinates_in_direction(self.coordinates, direction)]
-        else:
+        cell = self._cell_in(direction)
+        if cell is None:
             return False
+        elif cell.item is not None:
+            return cell.item
+        elif cell.agent is not None:
+            return cell.agent
+        else:
+            return cell.location
 
     def get_item_in(self, direction):
-        if get_coordinates_in_direction(self.coordinates, direction) in self.world.get_item_map_coordinates():
-            return self.world.get_item_map_coordinates()[get_coordinates_in_direction(self.coordinates, direction)]
+        cell = self._cell_in(direction)
+        if cell is not None and cell.item is not None:
+            return cell.item
         else:
             return False
 
     def get_agent_in(self, direction):
-        if get_coordinates_in_direction(self.coordinates, direction) in self.world.get_agent_map_coordinates():
-            return self.world.get_agent_map_coordinates()[get_coordinates_in_direction(self.coordinates, direction)]
+        cell = self._cell_in(direction)
+        if cell is not None and cell.agent is not None:
+            return cell.agent
         else:
             return False
 
     def get_location_in(self, direction):
-        if get_coordinates_in_direction(self.coordinates, direction) in self.world.get_location_map_coordinates():
-            return self.world.get_location_map_coordinates()[get_coordinates_in_direction(self.coordinates, direction)]
+        cell = self._cell_in(direction)
+        if cell is not None and cell.location is not None:
+            return cell.location
         else:
             return False
 
+    def get_matters_around(self):
+        """
+        Looks up the matter on all adjacent cells at once
+
+        :return: list of cell records (with the slots agent, item and location) or None for empty cells,
+                 in the order of world.grid.get_directions_list()
+        """
+        return self.world.get_cells_around(self.coordinates)
+
     def get_location(self):
         if self.coordinates in self.world.location_map_coordinates:
             return self.world.get_location_map_coordinates()[self.coordinates]
@@ -240,20 +446,41 @@ class Agent(matter.Matter):
                 wrote = target.write_memory_with(key, data)
             if wrote:
                 if target.type == MatterType.AGENT:
-                    self.world.csv_round.update_metrics(agent_write=1)
-                    self.csv_agent_writer.write_agent(agent_write=1)
+                    self.world.metrics.count(metrics.AGENT_WRITE)
+                    self._count(metrics.AGENT_WRITE)
                 elif target.type == MatterType.ITEM:
-                    self.world.csv_round.update_metrics(item_write=1)
-                    self.csv_agent_writer.write_agent(item_write=1)
+                    self.world.metrics.count(metrics.ITEM_WRITE)
+                    self._count(metrics.ITEM_WRITE)
                 elif target.type == MatterType.LOCATION:
-                    self.world.csv_round.update_metrics(location_write=1)
-                    self.csv_agent_writer.write_agent(location_write=1)
+                    self.world.metrics.count(metrics.LOCATION_WRITE)
+                    self._count(metrics.LOCATION_WRITE)
                 return True
             else:
                 return False
         else:
             return False
 
+    def _get_matter_maps(self, matter_type):
+        if matter_type == MatterType.AGENT:
+            return self.world.agent_map_coordinates,
+        elif matter_type == MatterType.ITEM:
+            return self.world.item_map_coordinates,
+        elif matter_type == MatterType.LOCATION:
+            return self.world.location_map_coordinates,
+        return self.world.agent_map_coordinates, self.world.item_map_coordinates, self.world.location_map_coordinates
+
+    def iter_matters_within(self, matter_type=MatterType.UNDEFINED, hop=1):
+        """
+        Generates the agents, items and locations within the hop distance, ordered by their hop distance.
+        Every position is visited only once, so a solution can stop at the first hit without scanning the rest
+
+        :param matter_type: For what matter this method should scan for.
+                            Can be either agents, items, locations, or all (undefined mattertype)
+        :param hop: The hop distance from the actual position of the scanning agent
+        :return: A generator of (hop distance, matter) tuples
+        """
+        return iter_within(self._get_matter_maps(matter_type), self.coordinates, hop, self.world.grid)
+
     def scan_for_matters_within(self, matter_type=MatterType.UNDEFINED, hop=1):
         """
         Scans for agents, items and locations on a given hop distance and all the matters within the hop distance
@@ -263,19 +490,56 @@ class Agent(matter.Matter):
         :param matter_type: For what matter this method should scan for.
                             Can be either agents, items, locations, or all (undefined mattertype)
         :param hop: The hop distance from the actual position of the scanning agent
-        :return: A list of the found matter
+        :return: A list of the found matter, ordered by the hop distance
         """
 
-        within_hop_list = []
-        for i in range(hop + 1):
-            in_list = self.scan_for_matters_in(matter_type, i)
-            if in_list is not None:
-                within_hop_list.extend(in_list)
+        # one traversal of the ball. the sort is stable, within a hop the matters are grouped by their type
+        # in the order of the matter maps, like the results of scan_for_matters_in
+        within_hop_list = sorted(self.iter_matters_within(matter_type, hop),
+                                 key=lambda hit: (hit[0], hit[1].type.value))
         if len(within_hop_list) != 0:
-            return within_hop_list
+            return [found for _, found in within_hop_list]
         else:
             return None
 
+    def scan_for_matters_within_by_hop(self, matter_type=MatterType.UNDEFINED, hop=1):
+        """
+        Scans for agents, items and locations within the hop distance and groups them by their hop distance
+
+        :param matter_type: For what matter this method should scan for.
+                            Can be either agents, items, locations, or all (undefined mattertype)
+        :param hop: The hop distance from the actual position of the scanning agent
+        :return: A list with hop + 1 lists, the i-th list contains the found matter on hop distance i
+        """
+        by_hop = [[] for _ in range(hop + 1)]
+        for distance, found in self.iter_matters_within(matter_type, hop):
+            by_hop[distance].append(found)
+        return by_hop
+
+    def count_matters_within(self, matter_type=MatterType.UNDEFINED, hop=1):
+        """
+        Counts the agents, items and locations within the hop distance without collecting them
+
+        :param matter_type: For what matter this method should count.
+                            Can be either agents, items, locations, or all (undefined mattertype)
+        :param hop: The hop distance from the actual position of the scanning agent
+        :return: The amount of found matter
+        """
+        return sum(count_within(matter_map, self.coordinates, hop, self.world.grid)
+                   for matter_map in self._get_matter_maps(matter_type))
+
+    def count_matters_in(self, matter_type=MatterType.UNDEFINED, hop=1):
+        """
+        Counts the agents, items and locations on a given hop distance without collecting them
+
+        :param matter_type: For what matter this method should count.
+                            Can be either agents, items, locations, or all (undefined mattertype)
+        :param hop: The hop distance from the actual position of the scanning agent
+        :return: The amount of found matter
+        """
+        return sum(count_in(matter_map, self.coordinates, hop, self.world.grid)
+                   for matter_map in self._get_matter_maps(matter_type))
+
     def scan_for_matters_in(self, matter_type=MatterType.UNDEFINED, hop=1):
         """
          Scanning for agents, items, or locations on a given hop distance
@@ -288,17 +552,9 @@ class Agent(matter.Matter):
 
         logging.info("Agent on %s is scanning for %s in %i hops", str(self.coordinates), matter_type, hop)
 
-        if matter_type == MatterType.AGENT:
-            scanned_list = scan_in(self.world.agent_map_coordinates, self.coordinates, hop, self.world.grid)
-        elif matter_type == MatterType.ITEM:
-            scanned_list = scan_in(self.world.item_map_coordinates, self.coordinates, hop, self.world.grid)
-        elif matter_type == MatterType.LOCATION:
-            scanned_list = scan_in(self.world.location_map_coordinates, self.coordinates, hop, self.world.grid)
-        else:
-            scanned_list = []
-            scanned_list.extend(scan_in(self.world.agent_map_coordinates, self.coordinates, hop, self.world.grid))
-            scanned_list.extend(scan_in(self.world.item_map_coordinates, self.coordinates, hop, self.world.grid))
-            scanned_list.extend(scan_in(self.world.location_map_coordinates, self.coordinates, hop, self.world.grid))
+        scanned_list = []
+        for matter_map in self._get_matter_maps(matter_type):
+            scanned_list.extend(scan_in(matter_map, self.coordinates, hop, self.world.grid))
         return scanned_list
 
     def scan_for_agents_within(self, hop=1):
@@ -372,10 +628,9 @@ class Agent(matter.Matter):
         :return: True: Successful taken; False: Cannot be taken or wrong Coordinates
         """
 
-        if not self.__isCarried:
-            if self.coordinates in self.world.agent_map_coordinates:
-                del self.world.agent_map_coordinates[self.coordinates]
-            self.__isCarried = True
+        if not self._carried:
+            self.world.vacate_cell(self, self.coordinates)
+            self._carried = True
             self.coordinates = coordinates
             if self.world.vis is not None:
                 self.world.vis.agent_changed(self)
@@ -391,8 +646,8 @@ class Agent(matter.Matter):
         :return: None
         """
         self.coordinates = coordinates
-        self.world.agent_map_coordinates[coordinates] = self
-        self.__isCarried = False
+        self.world.occupy_cell(self, coordinates)
+        self._carried = False
         if self.world.vis is not None:
             self.world.vis.agent_changed(self)
 
@@ -430,9 +685,9 @@ class Agent(matter.Matter):
                 if self.world.add_item(coordinates):
                     self.world.item_map_coordinates[coordinates].created = True
                     self.world.new_item_flag = True
-                    self.csv_agent_writer.write_agent(items_created=1)
+                    self._count(metrics.ITEMS_CREATED)
                     self.world.csv_round.update_items_num(len(self.world.get_items_list()))
-                    self.world.csv_round.update_metrics(items_created=1)
+                    self.world.metrics.count(metrics.ITEMS_CREATED)
                     return True
                 else:
                     logging.info("Not created item on coordinates %s" % str(coordinates))
@@ -450,7 +705,7 @@ class Agent(matter.Matter):
         logging.info("is going to delete an item on current position")
         if self.coordinates in self.world.get_item_map_coordinates():
             if self.world.remove_item_on(self.coordinates):
-                self.csv_agent_writer.write_agent(items_deleted=1)
+                self._count(metrics.ITEMS_DELETED)
                 return True
         else:
             logging.info("Could not delete item")
@@ -466,7 +721,7 @@ class Agent(matter.Matter):
         logging.info("Agent %s is" % self.get_id())
         logging.info("is going to delete an item with id %s" % str(item_id))
         if self.world.remove_item(item_id):
-            self.csv_agent_writer.write_agent(items_deleted=1)
+            self._count(metrics.ITEMS_DELETED)
             return True
         else:
             logging.info("Could not delete item with id %s" % str(item_id))
@@ -487,7 +742,7 @@ class Agent(matter.Matter):
             if coordinates is not None:
                 if self.world.remove_item_on(coordinates):
                     logging.info("Deleted item on coordinates %s" % str(coordinates))
-                    self.csv_agent_writer.write_agent(items_deleted=1)
+                    self._count(metrics.ITEMS_DELETED)
                     return True
                 else:
                     logging.info("Could not delete item on coordinates %s" % str(coordinates))
@@ -505,7 +760,7 @@ class Agent(matter.Matter):
         """
         if self.world.remove_item_on(coordinates):
             logging.info("Deleted item on coordinates %s" % str(coordinates))
-            self.csv_agent_writer.write_agent(items_deleted=1)
+            self._count(metrics.ITEMS_DELETED)
             return True
         else:
             logging.info("Could not delete item on coordinates %s" % str(coordinates))
@@ -526,8 +781,8 @@ class Agent(matter.Matter):
                     self.carried_item.coordinates = self.coordinates
                     if self.world.vis is not None:
                         self.world.vis.item_changed(self.carried_item)
-                    self.world.csv_round.update_metrics(items_taken=1)
-                    self.csv_agent_writer.write_agent(items_taken=1)
+                    self.world.metrics.count(metrics.ITEMS_TAKEN)
+                    self._count(metrics.ITEMS_TAKEN)
                     return True
                 else:
                     self.carried_item = None
@@ -607,8 +862,8 @@ class Agent(matter.Matter):
                     except AttributeError:
                         pass
                     self.carried_item = None
-                    self.world.csv_round.update_metrics(items_dropped=1)
-                    self.csv_agent_writer.write_agent(items_dropped=1)
+                    self.world.metrics.count(metrics.ITEMS_DROPPED)
+                    self._count(metrics.ITEMS_DROPPED)
                     logging.info("Dropped item on %s coordinate", str(coordinates))
                     return True
                 else:
@@ -630,10 +885,10 @@ class Agent(matter.Matter):
         logging.info("Going to create on position %s", str(self.coordinates))
         new_agent = self.world.add_agent(self.coordinates)
         if new_agent:
-            self.world.agent_map_coordinates[self.coordinates[0], self.coordinates[1]].created = True
-            self.csv_agent_writer.write_agent(agents_created=1)
+            self.world.agent_map_coordinates[self.coordinates].created = True
+            self._count(metrics.AGENTS_CREATED)
             self.world.csv_round.update_agent_num(len(self.world.get_agent_list()))
-            self.world.csv_round.update_metrics(agents_created=1)
+            self.world.metrics.count(metrics.AGENTS_CREATED)
             return new_agent
         else:
             return False
@@ -655,8 +910,8 @@ class Agent(matter.Matter):
                 self.world.agent_map_coordinates[coordinates].created = True
                 logging.info("Created an agent on coordinates %s", coordinates)
                 self.world.csv_round.update_agent_num(len(self.world.get_agent_list()))
-                self.world.csv_round.update_metrics(agents_created=1)
-                self.csv_agent_writer.write_agent(agents_created=1)
+                self.world.metrics.count(metrics.AGENTS_CREATED)
+                self._count(metrics.AGENTS_CREATED)
                 return new_agent
             else:
                 return False
@@ -681,8 +936,8 @@ class Agent(matter.Matter):
                     self.world.agent_map_coordinates[coordinates].created = True
                     logging.info("Created an agent on coordinates %s" % str(coordinates))
                     self.world.csv_round.update_agent_num(len(self.world.get_agent_list()))
-                    self.world.csv_round.update_metrics(agents_created=1)
-                    self.csv_agent_writer.write_agent(agents_created=1)
+                    self.world.metrics.count(metrics.AGENTS_CREATED)
+                    self._count(metrics.AGENTS_CREATED)
                     return new_agent
                 else:
                     return False
@@ -702,7 +957,7 @@ class Agent(matter.Matter):
         logging.info("is going to delete an Agent on current position")
         if self.coordinates in self.world.get_agent_map_coordinates():
             if self.world.remove_agent_on(self.coordinates):
-                self.csv_agent_writer.write_agent(agents_deleted=1)
+                self._count(metrics.AGENTS_DELETED)
                 return True
         else:
             logging.info("Could not delete agent")
@@ -718,7 +973,7 @@ class Agent(matter.Matter):
         logging.info("Agent %s is", self.get_id())
         logging.info("is going to delete an agent with id %s" % str(agent_id))
         if self.world.remove_agent(agent_id):
-            self.csv_agent_writer.write_agent(agents_deleted=1)
+            self._count(metrics.AGENTS_DELETED)
             return True
         else:
             logging.info("Could not delete agent with id %s" % str(agent_id))
@@ -736,7 +991,7 @@ class Agent(matter.Matter):
             logging.info("Deleting Agent in %s direction" % str(direction))
             if self.world.remove_agent_on(coordinates):
                 logging.info("Deleted Agent on coordinates %s" % str(coordinates))
-                self.csv_agent_writer.write_agent(agents_deleted=1)
+                self._count(metrics.AGENTS_DELETED)
                 return True
             else:
                 logging.info("Could not delete Agent on coordinates %s" % str(coordinates))
@@ -759,7 +1014,7 @@ class Agent(matter.Matter):
 
         if self.world.remove_agent_on(coordinates):
             logging.info("Deleted Agent on coordinates %s" % str(coordinates))
-            self.csv_agent_writer.write_agent(agents_deleted=1)
+            self._count(metrics.AGENTS_DELETED)
             return True
         else:
             logging.info("Could not delete agent on coordinates %s" % str(coordinates))
@@ -786,8 +1041,8 @@ class Agent(matter.Matter):
             self.carried_agent.coordinates = self.coordinates
             if self.world.vis is not None:
                 self.world.vis.agent_changed(self.carried_agent)
-            self.world.csv_round.update_metrics(agents_taken=1)
-            self.csv_agent_writer.write_agent(agents_taken=1)
+            self.world.metrics.count(metrics.AGENTS_TAKEN)
+            self._count(metrics.AGENTS_TAKEN)
             return True
         else:
             self.carried_agent = None
@@ -861,8 +1116,8 @@ class Agent(matter.Matter):
                         return False
                     self.carried_agent = None
                     logging.info("Dropped agnet on %s coordinate", str(coordinates))
-                    self.world.csv_round.update_metrics(agents_dropped=1)
-                    self.csv_agent_writer.write_agent(agents_dropped=1)
+                    self.world.metrics.count(metrics.AGENTS_DROPPED)
+                    self._count(metrics.AGENTS_DROPPED)
                     return True
                 else:
                     logging.info("Is not possible to drop the agent on that position because it is occupied")
@@ -884,7 +1139,7 @@ class Agent(matter.Matter):
         """
         if self.world.grid.are_valid_coordinates(new_coordinates):
             agent.coordinates = new_coordinates
-            self.world.agent_map_coordinates[new_coordinates] = agent
+            self.world.occupy_cell(agent, new_coordinates)
             if self.world.vis is not None:
                 self.world.vis.agent_changed(agent)
             return True
@@ -901,9 +1156,9 @@ class Agent(matter.Matter):
         logging.info("Going to create on position %s" % str(self.coordinates))
         new_location = self.world.add_location(self.coordinates)
         if new_location:
-            self.csv_agent_writer.write_agent(locations_created=1)
+            self._count(metrics.LOCATION_CREATED)
             self.world.csv_round.update_locations_num(len(self.world.get_location_list()))
-            self.world.csv_round.update_metrics(locations_created=1)
+            self.world.metrics.count(metrics.LOCATION_CREATED)
             return new_location
         else:
             return False
@@ -922,7 +1177,7 @@ class Agent(matter.Matter):
             if new_location:
                 logging.info("Created location on coordinates %s" % str(coordinates))
                 self.world.csv_round.update_locations_num(len(self.world.get_location_list()))
-                self.world.csv_round.update_metrics(location_created=1)
+                self.world.metrics.count(metrics.LOCATION_CREATED)
                 return new_location
             else:
                 return False
@@ -944,7 +1199,7 @@ class Agent(matter.Matter):
                 if new_location:
                     logging.info("Created location on coordinates %s", str(coordinates))
                     self.world.csv_round.update_locations_num(len(self.world.get_location_list()))
-                    self.world.csv_round.update_metrics(location_created=1)
+                    self.world.metrics.count(metrics.LOCATION_CREATED)
                     return new_location
             else:
                 return False
@@ -960,7 +1215,7 @@ class Agent(matter.Matter):
         """
         logging.info("Agent %s is going to delete location with location id %s" % (self.get_id(), location_id))
         if self.world.remove_location(location_id):
-            self.csv_agent_writer.write_agent(locations_deleted=1)
+            self._count(metrics.LOCATION_DELETED)
             return True
         else:
             logging.info("Could not delete location with location id %s", str(location_id))
@@ -975,7 +1230,7 @@ class Agent(matter.Matter):
         logging.info("Agent %s is going to delete a location on current position" % self.get_id())
         if self.coordinates in self.world.get_location_map_coordinates():
             if self.world.remove_location_on(self.coordinates):
-                self.csv_agent_writer.write_agent(locations_deleted=1)
+                self._count(metrics.LOCATION_DELETED)
                 return True
         else:
             logging.info("Could not delete location")
@@ -993,7 +1248,7 @@ class Agent(matter.Matter):
             logging.info("Deleting Location in %s direction", str(direction))
             if self.world.remove_location_on(coordinates):
                 logging.info("Deleted location with location on coordinates %s", str(coordinates))
-                self.csv_agent_writer.write_agent(locations_deleted=1)
+                self._count(metrics.LOCATION_DELETED)
                 return True
             else:
                 logging.info("Could not delete location on coordinates %s", str(coordinates))
@@ -1012,7 +1267,7 @@ class Agent(matter.Matter):
             if self.world.grid.are_valid_coordinates(coordinates):
                 if self.world.remove_location_on(coordinates):
                     logging.info("Deleted location on coordinates %s", str(coordinates))
-                    self.csv_agent_writer.write_agent(locations_deleted=1)
+                    self._count(metrics.LOCATION_DELETED)
                     return True
                 else:
                     logging.info("Could not delete location on coordinates %s", str(coordinates))
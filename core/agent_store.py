@@ -0,0 +1,125 @@
+"""The agent store keeps the state of all agents in contiguous columns (struct of arrays).
+An agent that is created while the store is enabled is only a view on one row of the store: it holds
+the world, the store and its row index, everything else is kept in the columns.
+The rows of all living agents are always packed at the front of the columns, so bulk reads
+(e.g. all agent positions) are plain numpy views without any copying."""
+import numpy as np
+
+# numpy columns: name -> (shape of one row, dtype)
+ARRAY_COLUMNS = {
+    "positions": ((3,), np.float64),
+    "colors": ((4,), np.float64),
+    "carried": ((), np.bool_),
+    "steps": ((), np.int64),
+    "ids": ((), np.int64),
+    # ids of the carried item and agent, 0 if the agent carries none
+    "carried_item_ids": ((), np.int64),
+    "carried_agent_ids": ((), np.int64),
+    "numbers": ((), np.int64),
+    # the row of the agent in the counters of the MetricsRegistry, see CsvAgentData
+    "metric_rows": ((), np.int64),
+    "created": ((), np.bool_),
+}
+# python object columns. coordinates and color keep the tuples as they were set, positions and colors
+# hold the same values as numbers. attributes is a dict with the memory and the attributes a solution sets
+# on the agent, it is created with the first access
+OBJECT_COLUMNS = ("agents", "coordinates", "color", "attributes", "carried_items", "carried_agents")
+
+
+class AgentStore:
+    def __init__(self, capacity=1024):
+        """
+        Initializing the agent store
+        :param capacity: initial amount of rows, the store grows automatically
+        """
+        self.size = 0
+        self.capacity = capacity
+        for name, (shape, dtype) in ARRAY_COLUMNS.items():
+            setattr(self, name, np.zeros((capacity,) + shape, dtype=dtype))
+        for name in OBJECT_COLUMNS:
+            setattr(self, name, [None] * capacity)
+
+    def _grow(self):
+        self.capacity *= 2
+        for name, (shape, dtype) in ARRAY_COLUMNS.items():
+            grown = np.zeros((self.capacity,) + shape, dtype=dtype)
+            grown[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, grown)
+        for name in OBJECT_COLUMNS:
+            getattr(self, name).extend([None] * (self.capacity - self.size))
+
+    def add(self, agent):
+        """
+        reserves a row for the given agent
+        :param agent: the agent which owns the row
+        :return: the row index
+        """
+        if self.size == self.capacity:
+            self._grow()
+        index = self.size
+        for name in ARRAY_COLUMNS:
+            getattr(self, name)[index] = 0
+        for name in OBJECT_COLUMNS:
+            getattr(self, name)[index] = None
+        self.agents[index] = agent
+        self.size += 1
+        return index
+
+    def remove(self, index):
+        """
+        frees the row with the given index. the last row is moved into the gap,
+        so the row index of exactly one other agent may change.
+        :param index: the row index
+        :return: None
+        """
+        last = self.size - 1
+        if index != last:
+            for name in ARRAY_COLUMNS:
+                column = getattr(self, name)
+                column[index] = column[last]
+            for name in OBJECT_COLUMNS:
+                column = getattr(self, name)
+                column[index] = column[last]
+            self.agents[index]._row = index
+        for name in OBJECT_COLUMNS:
+            getattr(self, name)[last] = None
+        self.size = last
+
+    def get_rows(self, agents):
+        """
+        returns the rows of the given agents, e.g. to read the columns in the order of world.agents
+        :param agents: iterable of agents in this store
+        :return: numpy int64 array
+        """
+        return np.fromiter((a._row for a in agents), dtype=np.int64)
+
+    def get_positions(self):
+        """
+        returns the positions of all agents in the store.
+        the result is a view and gets invalid when the store grows
+        :return: numpy array of shape (n, 3)
+        """
+        return self.positions[:self.size]
+
+    def get_colors(self):
+        """
+        returns the colors of all agents in the store.
+        the result is a view and gets invalid when the store grows
+        :return: numpy array of shape (n, 4)
+        """
+        return self.colors[:self.size]
+
+    def get_carried(self):
+        """
+        returns the carried flags of all agents in the store.
+        the result is a view and gets invalid when the store grows
+        :return: numpy array of shape (n,)
+        """
+        return self.carried[:self.size]
+
+    def get_agents(self):
+        """
+        returns the agents in the order of the store rows
+        :return: list of agents
+        """
+        return self.agents[:self.size]
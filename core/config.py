@@ -24,6 +24,12 @@ class ConfigData:
             "window_size_x": ConfigType.INTEGER,
             "window_size_y": ConfigType.INTEGER,
             "close_at_end": ConfigType.BOOLEAN,
+            "synchronous_rounds": ConfigType.BOOLEAN,
+            "workers": ConfigType.INTEGER,
+            "tile_size": ConfigType.INTEGER,
+            "tile_halo": ConfigType.INTEGER,
+            "plot_workers": ConfigType.INTEGER,
+            "plot_max_points": ConfigType.INTEGER,
         },
         "Visualization": {
             "visualization": ConfigType.BOOLEAN,
@@ -65,7 +71,8 @@ class ConfigData:
             "size_x": ConfigType.FLOAT,
             "size_y": ConfigType.FLOAT,
             "size_z": ConfigType.FLOAT,
-            "max_agents": ConfigType.INTEGER
+            "max_agents": ConfigType.INTEGER,
+            "agent_store": ConfigType.BOOLEAN
         },
         "Matter": {
             "memory_limitation": ConfigType.BOOLEAN,
@@ -114,9 +121,7 @@ class ConfigData:
             print("Warning: grid size is not configured. setting to default of 5")
             self.grid_size = 5
 
-        grid_module, grid_class = self.grid_class.rsplit(".", 1)
-        test = getattr(importlib.import_module("components.grids.%s" % grid_module), grid_class)
-        self.grid = test(self.grid_size)
+        self.create_grid()
 
         if self.scenario is None:
             self.scenario = "init_scenario.py"
@@ -126,4 +131,41 @@ class ConfigData:
 
         self.local_time = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')[:-1]
         self.multiple_sim = 0
-        self.directory_name = ""
\ No newline at end of file
+        self.directory_name = ""
+
+    def create_grid(self):
+        grid_module, grid_class = self.grid_class.rsplit(".", 1)
+        test = getattr(importlib.import_module("components.grids.%s" % grid_module), grid_class)
+        self.grid = test(self.grid_size)
+
+    def set_option(self, option, value):
+        """
+        sets a config variable from a string, e.g. from the command line, with the type of the mapping.
+        :param option: name of the variable, optionally with its section: "Simulator.max_round" or "max_round"
+        :param value: the value as it would be written in config.ini
+        :return: None
+        """
+        section = None
+        if "." in option:
+            section, option = option.split(".", 1)
+        config_type = self.ConfigType.STRING
+        for name, options in self.mapping.items():
+            if (section is None or name == section) and option in options:
+                config_type = options[option]
+                break
+        if config_type == self.ConfigType.BOOLEAN:
+            try:
+                value = configparser.ConfigParser.BOOLEAN_STATES[value.lower()]
+            except KeyError:
+                raise ValueError("Not a boolean: %s" % value)
+        elif config_type == self.ConfigType.INTEGER:
+            value = int(value)
+        elif config_type == self.ConfigType.FLOAT:
+            value = float(value)
+        elif config_type == self.ConfigType.TUPLE:
+            value = make_tuple(value)
+        setattr(self, option, value)
+        if option in ("grid_class", "grid_size"):
+            if option == "grid_size":
+                self.grid_size = int(value)
+            self.create_grid()
@@ -0,0 +1,251 @@
+"""The flow field module provides distance fields towards a set of target cells. A flow field is computed
+once with a multi source breadth first search from all targets, afterwards every agent can look up its
+distance to the nearest target and the direction towards it in constant time.
+The fields of a world are kept up to date when matter is put on or removed from a cell."""
+from collections import deque
+import heapq
+
+from core.matter import MatterType
+
+# maximal distance to the targets that a flow field covers, if not given otherwise
+FLOW_FIELD_MAX_DISTANCE = 50
+
+
+class FlowField:
+    def __init__(self, world, targets, blocking=(MatterType.ITEM,), max_distance=FLOW_FIELD_MAX_DISTANCE):
+        """
+        Initializing the flow field. Use World.create_flow_field to get a field that is kept up to date.
+
+        :param world: the world
+        :param targets: a matter type (all matter of this type are targets) or an iterable of target coordinates
+        :param blocking: matter types which block the cells they are on, except for target cells
+        :param max_distance: the maximal distance to the targets that is covered
+        """
+        self.world = world
+        self.grid = world.grid
+        self.blocking = tuple(blocking)
+        self.max_distance = max_distance
+        if isinstance(targets, MatterType):
+            self.target_type = targets
+            self.targets = set()
+        else:
+            self.target_type = None
+            self.targets = {self.grid.get_key(coordinates) for coordinates in targets}
+        self.bounds = None
+        if world.config_data.border == 1:
+            self.bounds = (world.get_x_size(), world.get_y_size(), world.get_z_size())
+        self.distances = {}
+        self.parents = {}
+        self._blocked = set()
+        self.refresh()
+
+    def _get_maps(self, matter_types):
+        maps = []
+        if MatterType.AGENT in matter_types:
+            maps.append(self.world.agent_map_coordinates)
+        if MatterType.ITEM in matter_types:
+            maps.append(self.world.item_map_coordinates)
+        if MatterType.LOCATION in matter_types:
+            maps.append(self.world.location_map_coordinates)
+        return maps
+
+    def _is_blocked(self, key):
+        return any(key in m for m in self._blocking_maps)
+
+    def _is_passable(self, key):
+        return key in self.targets or key not in self._blocked
+
+    def _is_inside(self, key):
+        if self.bounds is None:
+            return True
+        coordinates = self.grid.get_coordinates_from_key(key)
+        return abs(coordinates[0]) <= self.bounds[0] and abs(coordinates[1]) <= self.bounds[1] \
+            and abs(coordinates[2]) <= self.bounds[2]
+
+    def refresh(self):
+        """
+        Recomputes the whole field from scratch
+
+        :return: None
+        """
+        self._blocking_maps = self._get_maps(self.blocking)
+        if self.target_type is not None:
+            self.targets = set(self._get_maps((self.target_type,))[0].keys())
+        self._blocked = set()
+        for m in self._blocking_maps:
+            self._blocked.update(m.keys())
+        self.distances = {}
+        self.parents = {}
+        queue = deque()
+        for key in sorted(self.targets):
+            self.distances[key] = 0
+            self.parents[key] = None
+            queue.append(key)
+        self._expand(queue)
+
+    def _expand(self, queue):
+        # breadth first search from the queued cells, only lowers distances
+        offsets = self.grid.get_key_offsets()
+        opposites = [self.grid.get_opposite_direction_index(i) for i in range(len(offsets))]
+        distances = self.distances
+        while queue:
+            key = queue.popleft()
+            distance = distances[key] + 1
+            if distance > self.max_distance:
+                continue
+            for i, offset in enumerate(offsets):
+                n = key + offset
+                if distances.get(n, distance + 1) <= distance or not self._is_passable(n) or not self._is_inside(n):
+                    continue
+                distances[n] = distance
+                self.parents[n] = opposites[i]
+                queue.append(n)
+
+    def _parent_key(self, key):
+        direction = self.parents.get(key)
+        if direction is None:
+            return None
+        return key + self.grid.get_key_offsets()[direction]
+
+    def _best_neighbor(self, key, excluded=()):
+        best = None
+        best_direction = None
+        for i, offset in enumerate(self.grid.get_key_offsets()):
+            n = key + offset
+            if n in excluded:
+                continue
+            distance = self.distances.get(n)
+            if distance is not None and (best is None or distance < best):
+                best = distance
+                best_direction = i
+        return best, best_direction
+
+    def _lower(self, key):
+        # the cell got a target or lost its blocking matter, distances can only decrease
+        if key in self.targets:
+            self.distances[key] = 0
+            self.parents[key] = None
+        elif self._is_passable(key) and self._is_inside(key):
+            best, direction = self._best_neighbor(key)
+            if best is None or best + 1 > self.max_distance or best + 1 >= self.distances.get(key, best + 2):
+                return
+            self.distances[key] = best + 1
+            self.parents[key] = direction
+        else:
+            return
+        self._expand(deque([key]))
+
+    def _raise(self, key):
+        # the cell lost its target or got a blocking matter, all cells which reached a target through it
+        # forget their distance and are repaired from their unaffected neighbors
+        offsets = self.grid.get_key_offsets()
+        affected = {key}
+        stack = [key]
+        while stack:
+            u = stack.pop()
+            for offset in offsets:
+                n = u + offset
+                if n not in affected and self._parent_key(n) == u:
+                    affected.add(n)
+                    stack.append(n)
+        for a in affected:
+            self.distances.pop(a, None)
+            self.parents.pop(a, None)
+        heap = []
+        for a in sorted(affected):
+            if a in self.targets:
+                heapq.heappush(heap, (0, a, None))
+            elif self._is_passable(a) and self._is_inside(a):
+                best, direction = self._best_neighbor(a, affected)
+                if best is not None and best + 1 <= self.max_distance:
+                    heapq.heappush(heap, (best + 1, a, direction))
+        opposites = [self.grid.get_opposite_direction_index(i) for i in range(len(offsets))]
+        while heap:
+            distance, a, direction = heapq.heappop(heap)
+            if self.distances.get(a, distance + 1) <= distance:
+                continue
+            self.distances[a] = distance
+            self.parents[a] = direction
+            if distance + 1 > self.max_distance:
+                continue
+            for i, offset in enumerate(offsets):
+                n = a + offset
+                if self.distances.get(n, distance + 2) <= distance + 1 or not self._is_passable(n) \
+                        or not self._is_inside(n):
+                    continue
+                heapq.heappush(heap, (distance + 1, n, opposites[i]))
+
+    def cell_changed(self, key, matter_type):
+        """
+        Updates the field after matter of the given type was put on or removed from the cell
+
+        :param key: grid key of the cell
+        :param matter_type: type of the matter
+        :return: None
+        """
+        is_target_type = matter_type == self.target_type
+        if not is_target_type and matter_type not in self.blocking:
+            return
+        was_target = key in self.targets
+        was_passable = self._is_passable(key)
+        if is_target_type:
+            if key in self._get_maps((self.target_type,))[0]:
+                self.targets.add(key)
+            else:
+                self.targets.discard(key)
+        if matter_type in self.blocking:
+            if self._is_blocked(key):
+                self._blocked.add(key)
+            else:
+                self._blocked.discard(key)
+        is_target = key in self.targets
+        is_passable = self._is_passable(key)
+        if (was_target and not is_target) or (was_passable and not is_passable):
+            self._raise(key)
+        if (is_target and not was_target) or (is_passable and not was_passable):
+            self._lower(key)
+
+    def add_target(self, coordinates):
+        """
+        Adds a target cell to a field with explicit targets
+
+        :param coordinates: the coordinates of the target
+        :return: None
+        """
+        key = self.grid.get_key(coordinates)
+        if key not in self.targets:
+            self.targets.add(key)
+            self._lower(key)
+
+    def remove_target(self, coordinates):
+        """
+        Removes a target cell from a field with explicit targets
+
+        :param coordinates: the coordinates of the target
+        :return: None
+        """
+        key = self.grid.get_key(coordinates)
+        if key in self.targets:
+            self.targets.discard(key)
+            self._raise(key)
+
+    def get_distance(self, coordinates):
+        """
+        Returns the amount of steps from the coordinates to the nearest target
+
+        :param coordinates: the coordinates
+        :return: integer distance or None if no target can be reached
+        """
+        return self.distances.get(self.grid.get_key(coordinates))
+
+    def get_direction(self, coordinates):
+        """
+        Returns the direction of the next step towards the nearest target
+
+        :param coordinates: the coordinates
+        :return: direction or None if the coordinates are a target or no target can be reached
+        """
+        direction = self.parents.get(self.grid.get_key(coordinates))
+        if direction is None:
+            return None
+        return self.grid.get_directions_list()[direction]
@@ -36,8 +36,7 @@ class Item(matter.Matter):
         """
 
         if not self.__isCarried:
-            if self.coordinates in self.world.item_map_coordinates:
-                del self.world.item_map_coordinates[self.coordinates]
+            self.world.vacate_cell(self, self.coordinates)
             self.__isCarried = True
             if self.world.vis is not None:
                 self.world.vis.item_changed(self)
@@ -53,7 +52,7 @@ class Item(matter.Matter):
         :return: None
         """
         self.coordinates = coordinates
-        self.world.item_map_coordinates[self.coordinates] = self
+        self.world.occupy_cell(self, coordinates)
         self.__isCarried = False
         if self.world.vis is not None:
             self.world.vis.item_changed(self)
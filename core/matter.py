@@ -2,7 +2,8 @@ import uuid
 from datetime import datetime
 from enum import Enum
 
-from core.visualization.utils import Level, VisualizationError
+from core import metrics
+from core.visualization.errors import Level, VisualizationError
 
 
 class MatterType(Enum):
@@ -13,11 +14,15 @@ class MatterType(Enum):
 
 
 class Matter:
+    # empty slots, so that Agent can be fully slotted (a view on its row of the agent store).
+    # items and locations declare no slots and keep their attributes in __dict__
+    __slots__ = ()
+
     def __init__(self, world, coordinates, color, matter_type=None, mm_size=100):
         """Initializing the matter constructor"""
         self.coordinates = coordinates
         self.color = color
-        self.__id = str(uuid.uuid4())
+        self.__id = world.allocate_matter_id(self)
         self.world = world
         self._memory = {}
         self.type = matter_type
@@ -35,7 +40,7 @@ class Matter:
         tmp_memory = None
         if key in self._memory:
             tmp_memory = self._memory[key]
-            self.world.csv_round.update_metrics(memory_read=1)
+            self.world.metrics.count(metrics.MEMORY_READ)
         if isinstance(tmp_memory, list) and len(str(tmp_memory)) == 0:
             return None
         if isinstance(tmp_memory, str) and len(str(tmp_memory)) == 0:
@@ -60,7 +65,8 @@ class Matter:
 
         if (self.memory_limitation and len(self._memory) < self.mm_size) or not self.memory_limitation:
             self._memory[key] = data
-            self.world.csv_round.update_metrics(memory_write=1)
+            self._memory_changed()
+            self.world.metrics.count(metrics.MEMORY_WRITE)
             return True
         else:
             return False
@@ -75,7 +81,8 @@ class Matter:
 
         if (self.memory_limitation and len(self._memory) < self.mm_size) or not self.memory_limitation:
             self._memory[datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')[:-1]] = data
-            self.world.csv_round.update_metrics(memory_write=1)
+            self._memory_changed()
+            self.world.metrics.count(metrics.MEMORY_WRITE)
             return True
         else:
             return False
@@ -83,17 +90,31 @@ class Matter:
 
     def delete_memeory_with(self, key):
         del self._memory[key]
+        self._memory_changed()
 
     def delete_whole_memory(self):
         self._memory.clear()
+        self._memory_changed()
+
+    def _memory_changed(self):
+        # the parallel round mode only exports the memories again that were changed through these methods
+        if self.world.changed_memories is not None:
+            self.world.changed_memories.add(self.get_id())
 
     def get_id(self):
         """
         Gets the matter id
-        :return: matter id
+        :return: matter id, an integer that is unique within the world
         """
         return self.__id
 
+    def get_id_str(self):
+        """
+        Gets the matter id formatted as uuid string, for code that expects the former uuid ids
+        :return: matter id as string, e.g. '00000000-0000-0000-0000-00000000002a'
+        """
+        return str(uuid.UUID(int=self.__id))
+
     def set_color(self, color: tuple):
         """
         Sets the matter color
@@ -107,6 +128,8 @@ class Matter:
 
         else:
             self.color = color
+            if self.world.changed_matter is not None:
+                self.world.changed_matter.add(self)
 
     def get_color(self):
         """
@@ -0,0 +1,111 @@
+"""The matter list module provides the list type that the world uses for its agents, items and locations.
+It behaves like a normal list, but keeps track of the position of each matter, so that membership tests
+and removals take constant time."""
+import random
+
+
+class MatterList(list):
+    """
+    A list of matter with O(1) membership test and removal.
+    Removing moves the last element into the gap (swap remove). The order is therefore not the insertion order
+    after a removal anymore, but it only depends on the sequence of operations, so it is the same for the same seed.
+    """
+
+    def __init__(self, iterable=()):
+        super().__init__(iterable)
+        self._positions = {}
+        self._rebuild_positions()
+
+    def _rebuild_positions(self):
+        self._positions = {matter: i for i, matter in enumerate(self)}
+
+    def __contains__(self, matter):
+        return matter in self._positions
+
+    def index(self, matter, *args):
+        if matter in self._positions and not args:
+            return self._positions[matter]
+        return super().index(matter, *args)
+
+    def append(self, matter):
+        self._positions[matter] = len(self)
+        super().append(matter)
+
+    def extend(self, iterable):
+        for matter in iterable:
+            self.append(matter)
+
+    def remove(self, matter):
+        """
+        Removes the matter in O(1) by moving the last element into its position
+
+        :param matter: the matter to be removed
+        :return: None
+        """
+        try:
+            position = self._positions.pop(matter)
+        except KeyError:
+            raise ValueError("MatterList.remove(x): x not in list")
+        last = super().pop()
+        if position < len(self):
+            super().__setitem__(position, last)
+            self._positions[last] = position
+
+    def pop(self, position=-1):
+        if position == -1 or position == len(self) - 1:
+            matter = super().pop()
+            del self._positions[matter]
+            return matter
+        matter = super().pop(position)
+        self._rebuild_positions()
+        return matter
+
+    def __setitem__(self, position, value):
+        if isinstance(position, slice):
+            super().__setitem__(position, value)
+            self._rebuild_positions()
+            return
+        old = self[position]
+        super().__setitem__(position, value)
+        if position < 0:
+            position += len(self)
+        if self._positions.get(old) == position:
+            del self._positions[old]
+        self._positions[value] = position
+
+    def __delitem__(self, position):
+        super().__delitem__(position)
+        self._rebuild_positions()
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def insert(self, position, matter):
+        super().insert(position, matter)
+        self._rebuild_positions()
+
+    def clear(self):
+        super().clear()
+        self._positions.clear()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._rebuild_positions()
+
+    def reverse(self):
+        super().reverse()
+        self._rebuild_positions()
+
+    def shuffle(self, rng=random):
+        """
+        Shuffles the list in place. Draws the same random numbers as random.shuffle on a plain list,
+        so the resulting order is the same for the same seed
+
+        :param rng: the random generator to use (default: the random module)
+        :return: None
+        """
+        shuffled = list(self)
+        rng.shuffle(shuffled)
+        super().__setitem__(slice(None), shuffled)
+        self._rebuild_positions()
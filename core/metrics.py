@@ -0,0 +1,216 @@
+"""The metrics module provides the registry of the counted events of a simulation.
+Every metric has an integer id, the counters are kept in numpy arrays: one vector with the totals of the
+simulation and one matrix with a row per agent. Recording an event is a single indexed increment,
+the values of a round are the difference between the totals and a snapshot taken at the start of the round.
+RunningStats aggregates the rows of all rounds while they are recorded."""
+import numpy as np
+
+STEPS = 0
+AGENT_READ = 1
+ITEM_READ = 2
+LOCATION_READ = 3
+MEMORY_READ = 4
+AGENT_WRITE = 5
+ITEM_WRITE = 6
+LOCATION_WRITE = 7
+MEMORY_WRITE = 8
+AGENTS_CREATED = 9
+ITEMS_CREATED = 10
+LOCATION_CREATED = 11
+AGENTS_DELETED = 12
+ITEMS_DELETED = 13
+LOCATION_DELETED = 14
+ITEMS_TAKEN = 15
+ITEMS_DROPPED = 16
+AGENTS_TAKEN = 17
+AGENTS_DROPPED = 18
+SUCCESS = 19
+
+# names of the metrics in the order of their ids, these are also the keyword arguments
+# of CsvRoundData.update_metrics and CsvAgentData.write_agent
+METRIC_NAMES = ("steps", "agent_read", "item_read", "location_read", "memory_read",
+                "agent_write", "item_write", "location_write", "memory_write",
+                "agents_created", "items_created", "location_created",
+                "agents_deleted", "items_deleted", "location_deleted",
+                "items_taken", "items_dropped", "agents_taken", "agents_dropped", "success")
+METRIC_IDS = {name: metric for metric, name in enumerate(METRIC_NAMES)}
+METRIC_COUNT = len(METRIC_NAMES)
+
+
+def get_metric_id(name):
+    """
+    returns the id of the metric with the given name
+    :param name: the name of the metric, see METRIC_NAMES
+    :return: integer metric id
+    """
+    try:
+        return METRIC_IDS[name]
+    except KeyError:
+        raise TypeError("unknown metric '%s'" % name)
+
+
+class MetricsRegistry:
+    def __init__(self, agent_capacity=1024):
+        """
+        Initializing the registry
+        :param agent_capacity: initial amount of agent rows, the matrix grows automatically
+        """
+        self.totals = np.zeros(METRIC_COUNT, dtype=np.int64)
+        self.round_start = np.zeros(METRIC_COUNT, dtype=np.int64)
+        self.agent_counters = np.zeros((agent_capacity, METRIC_COUNT), dtype=np.int64)
+        self.agent_rows = 0
+
+    def count(self, metric, amount=1):
+        """
+        counts an event of the simulation
+        :param metric: the metric id
+        :param amount: the amount of events
+        :return: None
+        """
+        self.totals[metric] += amount
+
+    def add_agent(self):
+        """
+        reserves a counter row for a new agent
+        :return: the row index
+        """
+        if self.agent_rows == len(self.agent_counters):
+            grown = np.zeros((2 * len(self.agent_counters), METRIC_COUNT), dtype=np.int64)
+            grown[:self.agent_rows] = self.agent_counters
+            self.agent_counters = grown
+        self.agent_rows += 1
+        return self.agent_rows - 1
+
+    def count_agent(self, row, metric, amount=1):
+        """
+        counts an event of one agent
+        :param row: the row of the agent
+        :param metric: the metric id
+        :param amount: the amount of events
+        :return: None
+        """
+        self.agent_counters[row, metric] += amount
+
+    def count_agents(self, rows, metric, amount=1):
+        """
+        counts an event for many agents at once
+        :param rows: the rows of the agents, each row at most once
+        :param metric: the metric id
+        :param amount: the amount of events per agent
+        :return: None
+        """
+        self.agent_counters[rows, metric] += amount
+
+    def get_agent(self, row):
+        """
+        returns the counters of one agent
+        :param row: the row of the agent
+        :return: numpy array with one value per metric id
+        """
+        return self.agent_counters[row]
+
+    def get_round(self):
+        """
+        returns the counted events since the start of the actual round
+        :return: numpy array with one value per metric id
+        """
+        return self.totals - self.round_start
+
+    def next_round(self):
+        """
+        starts a new round
+        :return: None
+        """
+        self.round_start[:] = self.totals
+
+
+class RunningStats:
+    """
+    Running count, sum, min, max, mean and variance (Welford) of a fixed set of integer columns.
+    The statistics of a column are accessed like a pandas column: stats['Agent Steps'].sum()
+    """
+
+    def __init__(self, names):
+        """
+        Initializing the statistics
+        :param names: the names of the columns
+        """
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.count = 0
+        self.sums = np.zeros(len(self.names), dtype=np.int64)
+        self.mins = np.zeros(len(self.names), dtype=np.int64)
+        self.maxs = np.zeros(len(self.names), dtype=np.int64)
+        self.means = np.zeros(len(self.names), dtype=np.float64)
+        self.m2 = np.zeros(len(self.names), dtype=np.float64)
+
+    def add(self, values):
+        """
+        adds one row
+        :param values: one integer value per column
+        :return: None
+        """
+        values = np.asarray(values, dtype=np.int64)
+        self.count += 1
+        self.sums += values
+        if self.count == 1:
+            self.mins[:] = values
+            self.maxs[:] = values
+        else:
+            np.minimum(self.mins, values, out=self.mins)
+            np.maximum(self.maxs, values, out=self.maxs)
+        delta = values - self.means
+        self.means += delta / self.count
+        self.m2 += delta * (values - self.means)
+
+    def __getitem__(self, name):
+        return ColumnStats(self, self.index[name])
+
+    def as_dict(self):
+        """
+        returns the statistics of all columns, e.g. for a live view during the simulation
+        :return: dictionary from the column names to dictionaries with count, sum, mean, variance, min and max
+        """
+        return {name: self[name].as_dict() for name in self.names}
+
+
+class ColumnStats:
+    """
+    Statistics of one column of RunningStats. The values are numpy scalars and nan without any rows,
+    like the results of the pandas column methods
+    """
+
+    def __init__(self, stats, index):
+        self.stats = stats
+        self.i = index
+
+    def count(self):
+        return self.stats.count
+
+    def sum(self):
+        return self.stats.sums[self.i]
+
+    def mean(self):
+        if self.stats.count == 0:
+            return np.float64(np.nan)
+        return np.float64(self.stats.sums[self.i]) / self.stats.count
+
+    def var(self):
+        # sample variance, like pandas
+        if self.stats.count < 2:
+            return np.float64(np.nan)
+        return self.stats.m2[self.i] / (self.stats.count - 1)
+
+    def min(self):
+        if self.stats.count == 0:
+            return np.float64(np.nan)
+        return self.stats.mins[self.i]
+
+    def max(self):
+        if self.stats.count == 0:
+            return np.float64(np.nan)
+        return self.stats.maxs[self.i]
+
+    def as_dict(self):
+        return {"count": self.count(), "sum": self.sum().item(), "mean": self.mean().item(),
+                "variance": self.var().item(), "min": self.min().item(), "max": self.max().item()}
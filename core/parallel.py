@@ -0,0 +1,362 @@
+"""The parallel module runs the agent steps of a synchronous round in a pool of worker processes.
+The main process exports the state of the world (positions, colors, carry state and occupancy of all matter)
+into a block of shared memory, which is kept over the rounds. After the first round only the changes the world
+recorded are exported again (see SharedWorldState). Every worker builds a snapshot view on this block,
+steps a slice of the agents with the step function of the solution and returns the intents of its slice.
+The intents are merged in the order of the agents, so the result is the same as with a single process.
+They are committed by the main process, which owns all matter of the world.
+
+For very large worlds the tiles module splits the world into tiles that are owned by the workers instead,
+see core.tiles."""
+import importlib
+import math
+import multiprocessing
+import pickle
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from core.matter import MatterType
+from core.synchronous import AgentState, MatterState, Snapshot, compute_intents
+
+# amount of slices per worker, more slices balance the load better between the workers
+SLICES_PER_WORKER = 4
+
+_MATTER_PREFIXES = ((MatterType.ITEM, "item"), (MatterType.LOCATION, "location"))
+
+
+class _MatterRows:
+    """
+    Rows of the items or the locations in a SharedWorldState. A matter keeps its row while it is on the grid,
+    the rows of matter that left the grid are reused
+    """
+
+    def __init__(self, capacity=64):
+        self.size = 0
+        self.keys = np.full(capacity, -1, dtype=np.int64)
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.positions = np.zeros((capacity, 3), dtype=np.float64)
+        self.colors = np.zeros((capacity, 4), dtype=np.float64)
+        self._rows = {}
+        self._free = []
+
+    def _grow(self):
+        capacity = len(self.keys) * 2
+        self.keys = np.concatenate((self.keys, np.full(capacity - len(self.keys), -1, dtype=np.int64)))
+        self.ids = np.resize(self.ids, capacity)
+        self.positions = np.resize(self.positions, (capacity, 3))
+        self.colors = np.resize(self.colors, (capacity, 4))
+
+    def put(self, matter, key):
+        row = self._rows.get(matter)
+        if row is None:
+            if self._free:
+                row = self._free.pop()
+            else:
+                if self.size == len(self.keys):
+                    self._grow()
+                row = self.size
+                self.size += 1
+            self._rows[matter] = row
+        self.keys[row] = key
+        self.ids[row] = matter.get_id()
+        self.positions[row] = matter.coordinates
+        self.colors[row] = matter.color
+
+    def remove(self, matter):
+        row = self._rows.pop(matter, None)
+        if row is not None:
+            self.keys[row] = -1
+            self._free.append(row)
+
+    def get_arrays(self, prefix):
+        used = np.flatnonzero(self.keys[:self.size] != -1)
+        return {prefix + "_keys": self.keys[used], prefix + "_ids": self.ids[used],
+                prefix + "_positions": self.positions[used], prefix + "_colors": self.colors[used]}
+
+
+def get_agent_arrays(world):
+    """
+    gathers the state of the agents of the world into arrays, one row per agent in the order of world.agents
+    :param world: the world
+    :return: dictionary of arrays
+    """
+    agents = world.agents
+    store = world.agent_store
+    if store is not None:
+        rows = store.get_rows(agents)
+        positions = store.positions[rows]
+        return {
+            "agent_ids": store.ids[rows],
+            "agent_keys": world.grid.get_keys(positions),
+            "agent_positions": positions,
+            "agent_colors": store.colors[rows],
+            "agent_carried": store.carried[rows],
+            "agent_carried_item": store.carried_item_ids[rows],
+            "agent_carried_agent": store.carried_agent_ids[rows],
+        }
+    return {
+        "agent_ids": np.array([a.get_id() for a in agents], dtype=np.int64),
+        "agent_keys": np.array([world.grid.get_key(a.coordinates) for a in agents], dtype=np.int64),
+        "agent_positions": np.array([a.coordinates for a in agents], dtype=np.float64).reshape(-1, 3),
+        "agent_colors": np.array([a.color for a in agents], dtype=np.float64).reshape(-1, 4),
+        "agent_carried": np.array([a.is_carried() for a in agents], dtype=np.bool_),
+        "agent_carried_item": np.array([a.carried_item.get_id() if a.carried_item is not None else 0
+                                        for a in agents], dtype=np.int64),
+        "agent_carried_agent": np.array([a.carried_agent.get_id() if a.carried_agent is not None else 0
+                                         for a in agents], dtype=np.int64),
+    }
+
+
+class SharedWorldState:
+    """
+    Exports the state of a world into a block of shared memory. The block is reused while it is big enough.
+    Only the first export reads the whole world, afterwards the state is updated with the changes the world
+    recorded in changed_matter and changed_memories: the agents are copied from the columns of the agent store,
+    the items and locations keep their rows and every memory is pickled on its own and only again after it
+    was written
+    """
+
+    def __init__(self):
+        self.shm = None
+        self._world = None
+        self._rows = None
+        self._memories = None
+        self._memory_arrays = None
+
+    def export(self, world):
+        """
+        writes the current state of the world into the shared memory
+        :param world: the world
+        :return: name of the shared memory block and the layout of the arrays in it
+        """
+        return self._write(self._collect(world))
+
+    def _collect(self, world):
+        # one row per matter, the agent rows are in the order of world.agents, carried agents are not on the grid
+        if world is not self._world or world.changed_matter is None:
+            self._world = world
+            self._rows = {prefix: _MatterRows() for _, prefix in _MATTER_PREFIXES}
+            self._memories = {}
+            world.changed_matter = set(world.item_map_coordinates.values())
+            world.changed_matter.update(world.location_map_coordinates.values())
+            world.changed_memories = set(world.matter_by_id)
+        self._update_rows(world)
+        self._update_memories(world)
+        arrays = get_agent_arrays(world)
+        for _, prefix in _MATTER_PREFIXES:
+            arrays.update(self._rows[prefix].get_arrays(prefix))
+        arrays.update(self._memory_arrays)
+        return arrays
+
+    def _update_rows(self, world):
+        changed, world.changed_matter = world.changed_matter, set()
+        for matter in changed:
+            if matter.type == MatterType.ITEM:
+                rows, matter_map = self._rows["item"], world.item_map_coordinates
+            elif matter.type == MatterType.LOCATION:
+                rows, matter_map = self._rows["location"], world.location_map_coordinates
+            else:
+                continue
+            key = world.grid.get_key(matter.coordinates)
+            if matter_map.get(key) is matter:
+                rows.put(matter, key)
+            else:
+                rows.remove(matter)
+
+    def _update_memories(self, world):
+        changed, world.changed_memories = world.changed_memories, set()
+        for matter_id in changed:
+            matter = world.get_matter_by_id(matter_id)
+            memory = matter.read_whole_memory() if matter is not None else None
+            if memory:
+                self._memories[matter_id] = pickle.dumps(memory, pickle.HIGHEST_PROTOCOL)
+            else:
+                self._memories.pop(matter_id, None)
+        if changed or self._memory_arrays is None:
+            # the memories are concatenated in the order of the ids, a worker only unpickles the ones it reads
+            ids = sorted(self._memories)
+            pickled = [self._memories[matter_id] for matter_id in ids]
+            offsets = np.zeros(len(pickled) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum(np.fromiter(map(len, pickled), dtype=np.int64, count=len(pickled)))
+            self._memory_arrays = {"memory_ids": np.array(ids, dtype=np.int64), "memory_offsets": offsets,
+                                   "memory": np.frombuffer(b"".join(pickled), dtype=np.uint8)}
+
+    def _write(self, arrays):
+        layout = {}
+        size = 0
+        for name, array in arrays.items():
+            layout[name] = (size, array.dtype.str, array.shape)
+            size += (array.nbytes + 7) // 8 * 8
+        if self.shm is None or self.shm.size < size:
+            self._free_block()
+            self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1) * 2)
+        for name, array in arrays.items():
+            offset, dtype, shape = layout[name]
+            np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offset)[...] = array
+        return self.shm.name, layout
+
+    def _free_block(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def close(self):
+        self._free_block()
+        if self._world is not None:
+            # the world stops recording its changes
+            self._world.changed_matter = None
+            self._world.changed_memories = None
+            self._world = None
+
+
+class SharedSnapshot(Snapshot):
+    """
+    Snapshot on the arrays of a SharedWorldState. The states of the matter are created on demand
+    """
+
+    def __init__(self, buffer, layout, grid, round_number, seed):
+        self.round = round_number
+        self.seed = seed
+        self.grid = grid
+        self._arrays = {name: np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+                        for name, (offset, dtype, shape) in layout.items()}
+        self._memory_slices = None
+        self._agents = None
+        a = self._arrays
+        on_grid = np.flatnonzero(~a["agent_carried"]).tolist()
+        self.agent_map = _LazyStateMap(a["agent_keys"][on_grid].tolist(), on_grid, self.get_agent_state)
+        self.item_map = _LazyStateMap(a["item_keys"].tolist(), range(len(a["item_ids"])),
+                                      lambda i: self._get_matter_state("item", MatterType.ITEM, i))
+        self.location_map = _LazyStateMap(a["location_keys"].tolist(), range(len(a["location_ids"])),
+                                          lambda i: self._get_matter_state("location", MatterType.LOCATION, i))
+
+    def _get_memory(self, matter_id):
+        if self._memory_slices is None:
+            offsets = self._arrays["memory_offsets"].tolist()
+            self._memory_slices = dict(zip(self._arrays["memory_ids"].tolist(), zip(offsets, offsets[1:])))
+        memory_slice = self._memory_slices.get(matter_id)
+        if memory_slice is None:
+            return {}
+        return pickle.loads(self._arrays["memory"][memory_slice[0]:memory_slice[1]])
+
+    @property
+    def agents(self):
+        if self._agents is None:
+            self._agents = tuple(self.get_agent_state(i) for i in range(len(self._arrays["agent_ids"])))
+        return self._agents
+
+    def get_agent_state(self, index):
+        """
+        creates the state of the agent with the given index in the exported agent arrays
+        :param index: the index
+        :return: AgentState
+        """
+        a = self._arrays
+        agent_id = int(a["agent_ids"][index])
+        carried_item = int(a["agent_carried_item"][index])
+        carried_agent = int(a["agent_carried_agent"][index])
+        return AgentState(agent_id, tuple(a["agent_positions"][index].tolist()),
+                          tuple(a["agent_colors"][index].tolist()), bool(a["agent_carried"][index]),
+                          carried_item if carried_item != 0 else None,
+                          carried_agent if carried_agent != 0 else None,
+                          self._get_memory(agent_id))
+
+    def _get_matter_state(self, prefix, matter_type, index):
+        a = self._arrays
+        matter_id = int(a[prefix + "_ids"][index])
+        return MatterState(matter_id, matter_type, tuple(a[prefix + "_positions"][index].tolist()),
+                           tuple(a[prefix + "_colors"][index].tolist()), self._get_memory(matter_id))
+
+
+class _LazyStateMap:
+    """
+    Read only map from grid keys to matter states, the states are created on access
+    """
+
+    def __init__(self, keys, indices, create_state):
+        self._indices = dict(zip(keys, indices))
+        self._create_state = create_state
+
+    def get(self, key, default=None):
+        index = self._indices.get(key)
+        if index is None:
+            return default
+        return self._create_state(index)
+
+    def __contains__(self, key):
+        return key in self._indices
+
+    def __len__(self):
+        return len(self._indices)
+
+
+# state of a worker process, set by _init_worker
+_worker = {}
+
+
+def _init_worker(grid, solution_name):
+    _worker["grid"] = grid
+    _worker["step"] = importlib.import_module(solution_name).step
+    _worker["shm"] = None
+
+
+def _attach(shm_name):
+    shm = _worker["shm"]
+    if shm is None or shm.name != shm_name:
+        if shm is not None:
+            shm.close()
+        shm = _worker["shm"] = shared_memory.SharedMemory(name=shm_name)
+    return shm
+
+
+def _step_slice(task):
+    shm_name, layout, round_number, seed, start, stop = task
+    snapshot = SharedSnapshot(_attach(shm_name).buf, layout, _worker["grid"], round_number, seed)
+    intents = compute_intents(_worker["step"], snapshot, (snapshot.get_agent_state(i) for i in range(start, stop)))
+    # the numpy views on the buffer have to be gone before the block can be closed or replaced
+    del snapshot
+    return intents
+
+
+class ParallelStepper:
+    """
+    Pool of worker processes that computes the intents of synchronous rounds
+    """
+
+    def __init__(self, grid, solution_name, workers):
+        """
+        Initializing the pool
+        :param grid: the grid of the world
+        :param solution_name: module name of the solution, it has to provide step(snapshot, agent)
+        :param workers: amount of worker processes
+        """
+        self.workers = workers
+        self.solution_name = solution_name
+        self._state = SharedWorldState()
+        self._pool = multiprocessing.get_context("spawn").Pool(workers, initializer=_init_worker,
+                                                               initargs=(grid, solution_name))
+
+    def compute_intents(self, world):
+        """
+        steps all agents of the world in the worker processes
+        :param world: the world
+        :return: list of intents, in the order of the agents
+        """
+        shm_name, layout = self._state.export(world)
+        amount = len(world.agents)
+        if amount == 0:
+            return []
+        slice_size = math.ceil(amount / (self.workers * SLICES_PER_WORKER))
+        tasks = [(shm_name, layout, world.get_actual_round(), world.config_data.seed_value,
+                  start, min(amount, start + slice_size)) for start in range(0, amount, slice_size)]
+        intents = []
+        for slice_intents in self._pool.map(_step_slice, tasks):
+            intents.extend(slice_intents)
+        return intents
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+        self._state.close()
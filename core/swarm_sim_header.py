@@ -25,22 +25,63 @@ def get_multiple_steps_in_direction(start, direction, steps):
 
 def scan_in(matter_map: dict, center, hop, grid):
     result = []
-    n_sphere_border = grid.get_n_sphere_border(center, hop)
-    for coords in n_sphere_border:
-        if coords in matter_map:
-            result.append(matter_map[coords])
+    center_key = grid.get_key(center)
+    for offset in grid.get_n_sphere_border_offsets(hop):
+        matter = matter_map.get(center_key + offset)
+        if matter is not None:
+            result.append(matter)
     return result
 
 
 def scan_within(matter_map, center, hop, grid):
     result = []
-    n_sphere_border = grid.get_n_sphere(center, hop)
-    for coords in n_sphere_border:
-        if coords in matter_map:
-            result.append(matter_map[coords])
+    center_key = grid.get_key(center)
+    for offset in grid.get_n_sphere_offsets(hop):
+        matter = matter_map.get(center_key + offset)
+        if matter is not None:
+            result.append(matter)
     return result
 
 
+def iter_within(matter_maps, center, hop, grid):
+    """
+    traverses the n-sphere around the center once, ring by ring, and generates the found matters
+
+    :param matter_maps: the matter maps to probe, on each position in the given order
+    :param center: the center of the scan
+    :param hop: the maximal hop distance
+    :param grid: the grid of the world
+    :return: generator of (hop distance, matter) tuples, ordered by the hop distance
+    """
+    center_key = grid.get_key(center)
+    for distance in range(hop + 1):
+        for offset in grid.get_n_sphere_border_offsets(distance):
+            key = center_key + offset
+            for matter_map in matter_maps:
+                matter = matter_map.get(key)
+                if matter is not None:
+                    yield distance, matter
+
+
+def count_in(matter_map, center, hop, grid):
+    center_key = grid.get_key(center)
+    count = 0
+    for offset in grid.get_n_sphere_border_offsets(hop):
+        if center_key + offset in matter_map:
+            count += 1
+    return count
+
+
+def count_within(matter_map, center, hop, grid):
+    center_key = grid.get_key(center)
+    count = 0
+    for distance in range(hop + 1):
+        for offset in grid.get_n_sphere_border_offsets(distance):
+            if center_key + offset in matter_map:
+                count += 1
+    return count
+
+
 def create_matter_in_line(world, start, direction, amount, matter_type=MatterType.AGENT):
     current_position = start
     for _ in range(amount):
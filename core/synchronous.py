@@ -0,0 +1,236 @@
+"""The synchronous module provides the "compute then commit" round mode. In this mode the agents of a round
+do not change the world directly. Each agent reads a frozen snapshot of the world from the beginning of the round
+and returns intents (move, take, drop, create, delete, write), which are committed by the world after all agents
+have been stepped. The step of an agent is therefore a pure function of the snapshot and can run anywhere,
+e.g. in a worker process.
+
+A solution for this mode defines a function
+
+    def step(snapshot, agent):
+        return [move(agent.id, direction)]
+
+which gets the snapshot and the AgentState of one agent and returns an intent, a list of intents or None."""
+import random
+from collections import namedtuple
+
+from core.matter import MatterType
+from core.swarm_sim_header import get_coordinates_in_direction, iter_within
+
+AgentState = namedtuple("AgentState", ["id", "coordinates", "color", "is_carried", "carried_item",
+                                       "carried_agent", "memory"])
+MatterState = namedtuple("MatterState", ["id", "type", "coordinates", "color", "memory"])
+Intent = namedtuple("Intent", ["agent_id", "action", "direction", "matter_type", "key", "data"])
+
+MOVE = "move"
+TAKE = "take"
+DROP = "drop"
+CREATE = "create"
+DELETE = "delete"
+WRITE = "write"
+
+# order in which the intents of a round are committed. all directions refer to the positions in the snapshot,
+# so the agents move last
+COMMIT_ORDER = (WRITE, TAKE, DROP, DELETE, CREATE, MOVE)
+
+# agent methods that commit the intents
+_AGENT_METHODS = {
+    (TAKE, MatterType.ITEM): "take_item_in",
+    (TAKE, MatterType.AGENT): "take_agent_in",
+    (DROP, MatterType.ITEM): "drop_item_in",
+    (DROP, MatterType.AGENT): "drop_agent_in",
+    (DELETE, MatterType.ITEM): "delete_item_in",
+    (DELETE, MatterType.AGENT): "delete_agent_in",
+    (DELETE, MatterType.LOCATION): "delete_location_in",
+    (CREATE, MatterType.ITEM): "create_item_in",
+    (CREATE, MatterType.AGENT): "create_agent_in",
+    (CREATE, MatterType.LOCATION): "create_location_in",
+}
+
+
+def move(agent_id, direction):
+    return Intent(agent_id, MOVE, direction, MatterType.AGENT, None, None)
+
+
+def take(agent_id, direction, matter_type=MatterType.ITEM):
+    return Intent(agent_id, TAKE, direction, matter_type, None, None)
+
+
+def drop(agent_id, direction, matter_type=MatterType.ITEM):
+    return Intent(agent_id, DROP, direction, matter_type, None, None)
+
+
+def create(agent_id, direction, matter_type=MatterType.ITEM):
+    return Intent(agent_id, CREATE, direction, matter_type, None, None)
+
+
+def delete(agent_id, direction, matter_type=MatterType.ITEM):
+    return Intent(agent_id, DELETE, direction, matter_type, None, None)
+
+
+def write(agent_id, data, key=None, direction=None, matter_type=MatterType.AGENT):
+    """
+    intent to write into the memory of the matter of the given type in the given direction.
+    without a direction the agent writes into its own memory
+    """
+    return Intent(agent_id, WRITE, direction, matter_type, key, data)
+
+
+def _as_floats(values):
+    return tuple(float(v) for v in values)
+
+
+def _agent_state(agent):
+    return AgentState(agent.get_id(), _as_floats(agent.coordinates), _as_floats(agent.color), agent.is_carried(),
+                      agent.carried_item.get_id() if agent.carried_item is not None else None,
+                      agent.carried_agent.get_id() if agent.carried_agent is not None else None,
+                      dict(agent.read_whole_memory()))
+
+
+def _matter_state(matter):
+    return MatterState(matter.get_id(), matter.type, _as_floats(matter.coordinates), _as_floats(matter.color),
+                       dict(matter.read_whole_memory()))
+
+
+class Snapshot:
+    """
+    Frozen state of the world at the beginning of a round. It only holds plain data, so it can be pickled.
+    All coordinates and colors are tuples of floats
+    """
+
+    def __init__(self, world):
+        self.round = world.get_actual_round()
+        self.seed = world.config_data.seed_value
+        self.grid = world.grid
+        self.agents = tuple(_agent_state(a) for a in world.agents)
+        self.agent_map = {world.grid.get_key(a.coordinates): a for a in self.agents if not a.is_carried}
+        self.item_map = {key: _matter_state(i) for key, i in world.item_map_coordinates.items()}
+        self.location_map = {key: _matter_state(loc) for key, loc in world.location_map_coordinates.items()}
+
+    def _get_map(self, matter_type):
+        if matter_type == MatterType.AGENT:
+            return self.agent_map
+        elif matter_type == MatterType.ITEM:
+            return self.item_map
+        return self.location_map
+
+    def get_matter_on(self, coordinates, matter_type):
+        """
+        returns the state of the matter of the given type on the coordinates
+        :param coordinates: the coordinates
+        :param matter_type: the matter type
+        :return: AgentState, MatterState or None
+        """
+        return self._get_map(matter_type).get(self.grid.get_key(coordinates))
+
+    def get_agent_on(self, coordinates):
+        return self.agent_map.get(self.grid.get_key(coordinates))
+
+    def get_item_on(self, coordinates):
+        return self.item_map.get(self.grid.get_key(coordinates))
+
+    def get_location_on(self, coordinates):
+        return self.location_map.get(self.grid.get_key(coordinates))
+
+    def get_matter_in(self, agent, direction, matter_type):
+        """
+        returns the state of the matter of the given type next to the agent
+        :param agent: AgentState
+        :param direction: the direction
+        :param matter_type: the matter type
+        :return: AgentState, MatterState or None
+        """
+        return self.get_matter_on(get_coordinates_in_direction(agent.coordinates, direction), matter_type)
+
+    def scan_within(self, coordinates, hop, matter_type=MatterType.UNDEFINED):
+        """
+        returns the states of the matter within the hop distance, ordered by the hop distance
+        :param coordinates: center of the scan
+        :param hop: the hop distance
+        :param matter_type: the matter type, all types if undefined
+        :return: list of (hop distance, state) tuples
+        """
+        if matter_type == MatterType.UNDEFINED:
+            maps = (self.agent_map, self.item_map, self.location_map)
+        else:
+            maps = (self._get_map(matter_type),)
+        return list(iter_within(maps, coordinates, hop, self.grid))
+
+    def get_random(self, agent_id):
+        """
+        returns a random generator for the agent in this round. it only depends on the seed,
+        the round and the agent id, so the step of the agent stays a pure function
+        :param agent_id: the id of the agent
+        :return: random.Random
+        """
+        return random.Random("%d:%d:%d" % (self.seed, self.round, agent_id))
+
+
+def compute_intents(step, snapshot, agents):
+    """
+    runs the step function of a solution for the given agents
+    :param step: the step function, step(snapshot, agent) -> intent, list of intents or None
+    :param snapshot: the Snapshot of the round
+    :param agents: iterable of AgentState
+    :return: list of intents
+    """
+    intents = []
+    for agent in agents:
+        result = step(snapshot, agent)
+        if result is None:
+            continue
+        if isinstance(result, Intent):
+            intents.append(result)
+        else:
+            intents.extend(result)
+    return intents
+
+
+def commit_intents(world, intents):
+    """
+    applies the intents of a round to the world in the order of COMMIT_ORDER.
+    intents of the same kind are applied in the given order, an intent that is not possible anymore is dropped
+    :param world: the world
+    :param intents: list of intents
+    :return: None
+    """
+    by_action = {action: [] for action in COMMIT_ORDER}
+    for intent in intents:
+        by_action[intent.action].append(intent)
+    for action in COMMIT_ORDER:
+        if action == MOVE:
+            movers = []
+            directions = []
+            for intent in by_action[MOVE]:
+                agent = world.get_matter_by_id(intent.agent_id)
+                if agent is not None:
+                    movers.append(agent)
+                    directions.append(intent.direction)
+            if movers:
+                world.move_agents(movers, directions)
+            continue
+        for intent in by_action[action]:
+            agent = world.get_matter_by_id(intent.agent_id)
+            if agent is None:
+                continue
+            if action == WRITE:
+                if intent.direction is None and intent.matter_type == MatterType.AGENT:
+                    target = agent
+                else:
+                    coordinates = agent.coordinates
+                    if intent.direction is not None:
+                        coordinates = get_coordinates_in_direction(coordinates, intent.direction)
+                    cell = world.get_cell(coordinates)
+                    target = None
+                    if cell is not None:
+                        if intent.matter_type == MatterType.AGENT:
+                            target = cell.agent
+                        elif intent.matter_type == MatterType.ITEM:
+                            target = cell.item
+                        elif intent.matter_type == MatterType.LOCATION:
+                            target = cell.location
+                if target is not None:
+                    agent.write_to_with(target, intent.key, intent.data)
+            else:
+                method = _AGENT_METHODS.get((action, intent.matter_type))
+                if method is not None:
+                    getattr(agent, method)(intent.direction)
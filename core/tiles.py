@@ -0,0 +1,515 @@
+"""The tiles module runs the parallel round mode of very large worlds as a spatial domain decomposition.
+The grid is split into tiles, squares (cubes on a cubic grid) with an edge length of tile_size. Every tile is owned
+by one worker process, which keeps the state of the tile over the rounds: CoordinateMaps with the states of the
+agents, items and locations on the cells of the tile and on the cells of its halo, a band of tile_halo hops around
+the tile, and the states of the agents that stand on the tile.
+
+A round runs in these steps:
+1. The main process sends every change of the last round only to the tile that owns the changed matter,
+   see TiledWorldState.
+2. The owner passes the change on as an event to every tile whose cells or halo the matter left or entered.
+   The events for the tiles of other workers are exchanged between the workers once per round, this is the halo
+   exchange. An agent that crossed the edge of its tile migrates with its whole state to the new owner this way.
+3. Every worker steps the agents of its tiles against the maps of their tiles and returns the intents.
+4. The main process merges the intents in the order of the agents of the world and commits them in one pass,
+   see core.synchronous.commit_intents. Conflicts between the agents of different tiles, e.g. two agents that move
+   onto the same cell, are resolved there with the seeded generator of the world, so the result is the same as
+   with a single process.
+
+The halo has to cover the largest hop distance the step function of the solution looks at.
+Looking outside of it raises a ValueError instead of silently missing matter."""
+import importlib
+import itertools
+import math
+import multiprocessing
+
+import numpy as np
+
+from components.grids.grid import CoordinateMap
+from core.matter import MatterType
+from core.parallel import get_agent_arrays
+from core.synchronous import AgentState, MatterState, Snapshot, compute_intents
+
+# kinds of the messages in the inbox of a worker
+_ROUND = "round"
+_EXCHANGE = "exchange"
+
+# agent columns that are compared with the last round to find the changed agents
+_AGENT_COLUMNS = ("agent_positions", "agent_colors", "agent_carried", "agent_carried_item", "agent_carried_agent")
+
+
+def _as_floats(values):
+    return tuple(float(v) for v in values)
+
+
+def _is_on_grid(matter_type, state):
+    return matter_type != MatterType.AGENT or not state.is_carried
+
+
+class TileLayout:
+    """
+    Geometry of the tiles. A tile is named by the tuple of its coordinates divided by the tile size and floored
+    """
+
+    def __init__(self, grid, size, halo):
+        """
+        Initializing the layout
+        :param grid: the grid of the world
+        :param size: edge length of a tile
+        :param halo: width of the halo around a tile in hops
+        """
+        self.grid = grid
+        self.size = size
+        self.halo = halo
+        directions = grid.get_directions_list()
+        # a hop changes each coordinate at most by this width
+        self.hop_width = tuple(max(abs(d[axis]) for d in directions) for axis in range(3))
+        self.reach = tuple(halo * width for width in self.hop_width)
+
+    def get_tile(self, coordinates):
+        """
+        returns the tile that owns the coordinates
+        :param coordinates: the coordinates
+        :return: tuple of three ints
+        """
+        return tuple(math.floor(c / self.size) for c in coordinates)
+
+    def get_tiles_around(self, coordinates):
+        """
+        returns all tiles that see the coordinates on their cells or in their halo
+        :param coordinates: the coordinates
+        :return: iterator of tiles
+        """
+        return itertools.product(*(range(math.floor((c - r) / self.size), math.floor((c + r) / self.size) + 1)
+                                   for c, r in zip(coordinates, self.reach)))
+
+    def get_bounds(self, tile):
+        """
+        returns the bounds of the cells and the halo of the tile
+        :param tile: the tile
+        :return: lower bounds and upper bounds (exclusive) of the coordinates
+        """
+        return (tuple(i * self.size - r for i, r in zip(tile, self.reach)),
+                tuple((i + 1) * self.size + r for i, r in zip(tile, self.reach)))
+
+    @staticmethod
+    def get_worker(tile, workers):
+        """
+        returns the number of the worker that owns the tile
+        :param tile: the tile
+        :param workers: amount of workers
+        :return: int
+        """
+        # the hash of a tuple of ints is the same in every process
+        return hash(tile) % workers
+
+    def get_targets(self, event):
+        """
+        returns the tiles that have to apply an event: the tiles that saw the matter before and after the event
+        and the tile that owns the agent afterwards
+        :param event: the event, see Tile.change
+        :return: set of tiles
+        """
+        matter_type, _, old_coordinates, state = event
+        targets = set()
+        if old_coordinates is not None:
+            targets.update(self.get_tiles_around(old_coordinates))
+        if state is not None:
+            if _is_on_grid(matter_type, state):
+                targets.update(self.get_tiles_around(state.coordinates))
+            if matter_type == MatterType.AGENT:
+                targets.add(self.get_tile(state.coordinates))
+        return targets
+
+
+class Tile:
+    """
+    State of one tile in a worker: the states of the matter on the cells and in the halo of the tile
+    and the states of the agents that the tile owns, carried agents included
+    """
+
+    def __init__(self, layout, index):
+        """
+        Initializing the tile
+        :param layout: the TileLayout
+        :param index: the tile
+        """
+        self.layout = layout
+        self.index = index
+        self.low, self.high = layout.get_bounds(index)
+        self.agent_map = CoordinateMap(layout.grid)
+        self.item_map = CoordinateMap(layout.grid)
+        self.location_map = CoordinateMap(layout.grid)
+        self._maps = {MatterType.AGENT: self.agent_map, MatterType.ITEM: self.item_map,
+                      MatterType.LOCATION: self.location_map}
+        # matter id -> grid key of the matter in the maps
+        self.keys = {}
+        # agent id -> AgentState of the agents on the cells of the tile
+        self.agents = {}
+
+    def sees(self, coordinates, hop=0):
+        """
+        checks whether all cells within the hop distance around the coordinates are cells of the tile or its halo
+        :param coordinates: the coordinates
+        :param hop: the hop distance
+        :return: True or False
+        """
+        for c, low, high, width in zip(coordinates, self.low, self.high, self.layout.hop_width):
+            if c - hop * width < low or c + hop * width >= high:
+                return False
+        return True
+
+    def is_empty(self):
+        return not self.keys and not self.agents
+
+    def change(self, matter_type, matter_id, state):
+        """
+        turns a change of matter that the tile owns into an event
+        :param matter_type: the matter type
+        :param matter_id: the matter id
+        :param state: the new state, None if the matter left the grid.
+                      the memory of an agent state is None if it was not written
+        :return: event (matter type, matter id, coordinates before the change or None, state)
+        """
+        old_coordinates = None
+        key = self.keys.get(matter_id)
+        if key is not None:
+            old_coordinates = self._maps[matter_type][key].coordinates
+        elif matter_id in self.agents:
+            # a carried agent
+            old_coordinates = self.agents[matter_id].coordinates
+        if state is not None and state.memory is None:
+            state = state._replace(memory=self.agents[matter_id].memory)
+        return matter_type, matter_id, old_coordinates, state
+
+    def apply(self, event):
+        """
+        applies an event, the events of a round can be applied in any order
+        :param event: the event, see change
+        :return: None
+        """
+        matter_type, matter_id, _, state = event
+        matter_map = self._maps[matter_type]
+        key = self.keys.pop(matter_id, None)
+        # another matter may already have moved onto the cell
+        if key is not None and matter_map[key].id == matter_id:
+            del matter_map[key]
+        if matter_type == MatterType.AGENT:
+            self.agents.pop(matter_id, None)
+        if state is None:
+            return
+        if _is_on_grid(matter_type, state) and self.sees(state.coordinates):
+            key = self.layout.grid.get_key(state.coordinates)
+            matter_map[key] = state
+            self.keys[matter_id] = key
+        if matter_type == MatterType.AGENT and self.layout.get_tile(state.coordinates) == self.index:
+            self.agents[matter_id] = state
+
+
+class TileSnapshot(Snapshot):
+    """
+    Snapshot on the maps of a tile. It only contains the matter on the cells and in the halo of the tile,
+    looking outside of them raises a ValueError instead of silently missing matter
+    """
+
+    def __init__(self, tile, round_number, seed):
+        self.round = round_number
+        self.seed = seed
+        self.grid = tile.layout.grid
+        self.tile = tile
+        self.agent_map = tile.agent_map
+        self.item_map = tile.item_map
+        self.location_map = tile.location_map
+
+    @property
+    def agents(self):
+        raise ValueError("a tile does not know all agents of the world, "
+                         "the step function can only look at the agents within the halo")
+
+    def _check_visible(self, coordinates, hop=0):
+        if not self.tile.sees(coordinates, hop):
+            raise ValueError("%s with hop %d is outside of the halo of tile %s, increase tile_halo"
+                             % (str(coordinates), hop, str(self.tile.index)))
+
+    def get_matter_on(self, coordinates, matter_type):
+        self._check_visible(coordinates)
+        return super().get_matter_on(coordinates, matter_type)
+
+    def get_agent_on(self, coordinates):
+        self._check_visible(coordinates)
+        return super().get_agent_on(coordinates)
+
+    def get_item_on(self, coordinates):
+        self._check_visible(coordinates)
+        return super().get_item_on(coordinates)
+
+    def get_location_on(self, coordinates):
+        self._check_visible(coordinates)
+        return super().get_location_on(coordinates)
+
+    def scan_within(self, coordinates, hop, matter_type=MatterType.UNDEFINED):
+        self._check_visible(coordinates, hop)
+        return super().scan_within(coordinates, hop, matter_type)
+
+
+class TiledWorldState:
+    """
+    Bookkeeping of the main process. It knows the owner tile of every matter and finds the changes of a round:
+    the agents are compared with the last round column by column, the items and locations and the memories
+    are taken from the changes the world recorded in changed_matter and changed_memories
+    """
+
+    def __init__(self, layout):
+        self.layout = layout
+        self._world = None
+        # matter id -> tile that owns the matter
+        self._owners = None
+        # agent columns of the last round, sorted by the ids
+        self._agents = None
+
+    def collect(self, world):
+        """
+        collects the changes since the last round, in the first round every matter is new
+        :param world: the world
+        :return: ids of the agents in the order of world.agents and the changes per owner tile,
+                 {tile: [(matter type, matter id, state or None)]}
+        """
+        if world is not self._world or world.changed_matter is None:
+            self._world = world
+            self._owners = {}
+            self._agents = None
+            world.changed_matter = set(world.item_map_coordinates.values())
+            world.changed_matter.update(world.location_map_coordinates.values())
+            world.changed_memories = set()
+        changes = {}
+        changed_memories, world.changed_memories = world.changed_memories, set()
+        agent_ids = self._collect_agents(world, changed_memories, changes)
+        self._collect_matter(world, changed_memories, changes)
+        return agent_ids, changes
+
+    def _put(self, changes, matter_type, matter_id, state):
+        owner = self.layout.get_tile(state.coordinates)
+        # the change goes to the old owner, which migrates the matter to the new one
+        changes.setdefault(self._owners.get(matter_id, owner), []).append((matter_type, matter_id, state))
+        self._owners[matter_id] = owner
+
+    def _remove(self, changes, matter_type, matter_id):
+        owner = self._owners.pop(matter_id, None)
+        if owner is not None:
+            changes.setdefault(owner, []).append((matter_type, matter_id, None))
+
+    def _collect_agents(self, world, changed_memories, changes):
+        arrays = get_agent_arrays(world)
+        order = np.argsort(arrays["agent_ids"], kind="stable")
+        current = {name: arrays[name][order] for name in ("agent_ids",) + _AGENT_COLUMNS}
+        previous = self._agents
+        if previous is None:
+            previous = {name: column[:0] for name, column in current.items()}
+        self._agents = current
+
+        ids = current["agent_ids"]
+        common, old_rows, new_rows = np.intersect1d(previous["agent_ids"], ids, assume_unique=True,
+                                                    return_indices=True)
+        removed = np.ones(len(previous["agent_ids"]), dtype=np.bool_)
+        removed[old_rows] = False
+        for agent_id in previous["agent_ids"][removed].tolist():
+            self._remove(changes, MatterType.AGENT, agent_id)
+
+        changed = np.zeros(len(common), dtype=np.bool_)
+        for name in _AGENT_COLUMNS:
+            difference = previous[name][old_rows] != current[name][new_rows]
+            changed |= difference.any(axis=1) if difference.ndim > 1 else difference
+        # new agents and agents with a written memory are sent with their memory
+        with_memory = np.ones(len(ids), dtype=np.bool_)
+        with_memory[new_rows] = False
+        with_memory |= np.isin(ids, np.fromiter(changed_memories, dtype=np.int64, count=len(changed_memories)))
+        send = with_memory.copy()
+        send[new_rows[changed]] = True
+
+        for row in np.flatnonzero(send).tolist():
+            agent_id = int(ids[row])
+            carried_item = int(current["agent_carried_item"][row])
+            carried_agent = int(current["agent_carried_agent"][row])
+            memory = None
+            if with_memory[row]:
+                memory = dict(world.get_matter_by_id(agent_id).read_whole_memory())
+            self._put(changes, MatterType.AGENT, agent_id,
+                      AgentState(agent_id, tuple(current["agent_positions"][row].tolist()),
+                                 tuple(current["agent_colors"][row].tolist()), bool(current["agent_carried"][row]),
+                                 carried_item if carried_item != 0 else None,
+                                 carried_agent if carried_agent != 0 else None, memory))
+        return arrays["agent_ids"]
+
+    def _collect_matter(self, world, changed_memories, changes):
+        changed, world.changed_matter = world.changed_matter, set()
+        for matter_id in changed_memories:
+            matter = world.get_matter_by_id(matter_id)
+            if matter is not None and matter.type != MatterType.AGENT:
+                changed.add(matter)
+        for matter in changed:
+            if matter.type == MatterType.ITEM:
+                matter_map = world.item_map_coordinates
+            elif matter.type == MatterType.LOCATION:
+                matter_map = world.location_map_coordinates
+            else:
+                continue
+            if matter_map.get(world.grid.get_key(matter.coordinates)) is matter:
+                self._put(changes, matter.type, matter.get_id(),
+                          MatterState(matter.get_id(), matter.type, _as_floats(matter.coordinates),
+                                      _as_floats(matter.color), dict(matter.read_whole_memory())))
+            else:
+                self._remove(changes, matter.type, matter.get_id())
+
+    def close(self):
+        if self._world is not None:
+            # the world stops recording its changes
+            self._world.changed_matter = None
+            self._world.changed_memories = None
+            self._world = None
+
+
+def _get_tile(tiles, layout, index):
+    tile = tiles.get(index)
+    if tile is None:
+        tile = tiles[index] = Tile(layout, index)
+    return tile
+
+
+def _route_changes(tiles, layout, changes, workers):
+    # turns the changes into events, sorted by the workers of the tiles that have to apply them
+    outboxes = [[] for _ in range(workers)]
+    for index, tile_changes in changes:
+        tile = _get_tile(tiles, layout, index)
+        for matter_type, matter_id, state in tile_changes:
+            event = tile.change(matter_type, matter_id, state)
+            for target in layout.get_targets(event):
+                outboxes[layout.get_worker(target, workers)].append((target, event))
+    return outboxes
+
+
+def _apply_events(tiles, layout, events):
+    for index, event in events:
+        _get_tile(tiles, layout, index).apply(event)
+    for index in [index for index, tile in tiles.items() if tile.is_empty()]:
+        del tiles[index]
+
+
+def _step_tiles(step, tiles, round_number, seed):
+    stepped = {}
+    for tile in tiles.values():
+        if tile.agents:
+            snapshot = TileSnapshot(tile, round_number, seed)
+            for agent in tile.agents.values():
+                stepped[agent.id] = compute_intents(step, snapshot, (agent,))
+    return stepped
+
+
+def _run_worker(number, layout, solution_name, inboxes, results):
+    step = importlib.import_module(solution_name).step
+    workers = len(inboxes)
+    inbox = inboxes[number]
+    tiles = {}
+    # events of the other workers, they can arrive before the round of the main process
+    received = []
+    while True:
+        message = inbox.get()
+        if message is None:
+            return
+        if message[0] == _EXCHANGE:
+            received.append(message[1])
+            continue
+        _, round_number, seed, changes = message
+        error = None
+        try:
+            outboxes = _route_changes(tiles, layout, changes, workers)
+        except Exception as e:
+            # the other workers wait for the events of this worker anyway
+            error = e
+            outboxes = [[] for _ in range(workers)]
+
+        # halo exchange
+        for peer, peer_inbox in enumerate(inboxes):
+            if peer != number:
+                peer_inbox.put((_EXCHANGE, outboxes[peer]))
+        received.append(outboxes[number])
+        while len(received) < workers:
+            message = inbox.get()
+            if message is None:
+                return
+            received.append(message[1])
+        events, received = received, []
+
+        if error is None:
+            try:
+                _apply_events(tiles, layout, itertools.chain.from_iterable(events))
+                results.put((number, _step_tiles(step, tiles, round_number, seed)))
+                continue
+            except Exception as e:
+                error = e
+        results.put((number, error))
+
+
+class TiledStepper:
+    """
+    Worker processes that own the tiles of the world and compute the intents of synchronous rounds
+    """
+
+    def __init__(self, grid, solution_name, workers, tile_size, halo):
+        """
+        Initializing the workers
+        :param grid: the grid of the world
+        :param solution_name: module name of the solution, it has to provide step(snapshot, agent)
+        :param workers: amount of worker processes
+        :param tile_size: edge length of a tile
+        :param halo: width of the halo around a tile in hops
+        """
+        self.workers = workers
+        self.layout = TileLayout(grid, tile_size, halo)
+        self._state = TiledWorldState(self.layout)
+        context = multiprocessing.get_context("spawn")
+        self._inboxes = [context.Queue() for _ in range(workers)]
+        self._results = context.Queue()
+        self._processes = [context.Process(target=_run_worker, daemon=True,
+                                           args=(number, self.layout, solution_name, self._inboxes, self._results))
+                           for number in range(workers)]
+        for process in self._processes:
+            process.start()
+
+    def compute_intents(self, world):
+        """
+        sends the changes of the last round to the tiles and steps all agents in the worker processes
+        :param world: the world
+        :return: list of intents, in the order of the agents
+        """
+        agent_ids, changes = self._state.collect(world)
+        per_worker = [[] for _ in range(self.workers)]
+        for tile, tile_changes in changes.items():
+            per_worker[self.layout.get_worker(tile, self.workers)].append((tile, tile_changes))
+        for inbox, worker_changes in zip(self._inboxes, per_worker):
+            inbox.put((_ROUND, world.get_actual_round(), world.config_data.seed_value, worker_changes))
+        stepped = {}
+        error = None
+        for _ in range(self.workers):
+            _, result = self._results.get()
+            if isinstance(result, Exception):
+                error = result
+            elif error is None:
+                stepped.update(result)
+        if error is not None:
+            # the tiles of the failed worker are lost
+            self.close()
+            raise error
+        intents = []
+        for agent_id in agent_ids.tolist():
+            intents.extend(stepped.get(agent_id, ()))
+        return intents
+
+    def close(self):
+        if self._processes is None:
+            return
+        for inbox in self._inboxes:
+            inbox.put(None)
+        for process in self._processes:
+            process.join()
+        self._processes = None
+        self._state.close()
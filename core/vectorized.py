@@ -0,0 +1,60 @@
+"""The vectorized module provides NumPy kernels that act on the whole swarm at once.
+A kernel reads the positions of all agents into arrays, decides with vectorized masks and commits
+the result in bulk with World.commit_moves, instead of calling the agent methods one by one."""
+from itertools import compress
+
+import numpy as np
+
+
+def random_walk(world, rng):
+    """
+    Moves every agent that is not carried one step in a random direction.
+    All moves are checked against the positions at the beginning of the call: a move is rejected if the target
+    is not a valid coordinate or if an agent is on it. If several agents draw the same free target, the first one
+    in a random order moves. The border of the world is handled like in Agent.move_to
+
+    :param world: the world
+    :param rng: numpy random Generator
+    :return: list of the agents that have moved
+    """
+    grid = world.grid
+    store = world.agent_store
+    if store is not None:
+        # the rows of the store are not in the order of world.agents after agents were removed
+        rows = store.get_rows(world.agents)
+        free = ~store.carried[rows]
+        agents = list(compress(world.agents, free.tolist()))
+        positions = store.positions[rows[free]]
+    else:
+        agents = [a for a in world.agents if not a.is_carried()]
+        positions = np.array([a.coordinates for a in agents], dtype=np.float64).reshape(-1, 3)
+    if not agents:
+        return []
+    directions = grid.get_directions_matrix()
+    chosen = directions[rng.integers(len(directions), size=len(agents))]
+    targets = positions + chosen
+    if world.config_data.border == 1:
+        size = np.array([world.get_x_size(), world.get_y_size(), world.get_z_size()], dtype=np.float64)
+        if world.config_data.type == 1:
+            # mirrored like in Agent.check_within_border
+            replacement = chosen - positions
+        else:
+            replacement = positions
+        targets = np.where(np.abs(targets) > size, replacement, targets)
+
+    keys = grid.get_keys(targets)
+    occupied = np.fromiter(world.agent_map_coordinates.keys(), dtype=np.int64,
+                           count=len(world.agent_map_coordinates))
+    free = grid.valid_mask(targets) & ~np.isin(keys, occupied)
+
+    # one mover per target cell
+    order = rng.permutation(len(agents))
+    candidates = order[free[order]]
+    _, first = np.unique(keys[candidates], return_index=True)
+    winners = np.sort(candidates[first])
+
+    movers = [agents[i] for i in winners.tolist()]
+    target_keys = keys[winners].tolist()
+    world.commit_moves(movers, [grid.get_coordinates_from_key(key) for key in target_keys], target_keys,
+                       grid.get_keys(positions[winners]).tolist())
+    return movers
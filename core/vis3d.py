@@ -11,12 +11,8 @@ from core.visualization.OGLWidget import OGLWidget
 import time
 from core.visualization.camera import Camera
 from core.visualization.toms_svg_generator import create_svg
-from core.visualization.utils import LoadingWindow, show_msg, TopQFileDialog, VisualizationError, Level
-
-
-class ResetException(Exception):
-    def __init__(self):
-        super(ResetException, self).__init__()
+from core.visualization.utils import LoadingWindow, show_msg, TopQFileDialog
+from core.visualization.errors import VisualizationError, Level, ResetException
 
 
 def close(_):
@@ -337,6 +333,20 @@ class Visualization:
         self._viewer.agent_offset_data[agent] = (agent.coordinates, agent.color, prev_pos,
                                                  1.0 if agent.is_carried() else 0.0)
 
+    def agents_changed(self, agents):
+        """
+        same as agent_changed, but for many agents at once
+        :param agents: iterable of the agents that have changed (the instances)
+        :return:
+        """
+        self._viewer.agent_update_flag = True
+        offset_data = self._viewer.agent_offset_data
+        for agent in agents:
+            prev_pos = agent.coordinates
+            if agent in offset_data:
+                prev_pos = offset_data[agent][0]
+            offset_data[agent] = (agent.coordinates, agent.color, prev_pos, 1.0 if agent.is_carried() else 0.0)
+
     def remove_item(self, item):
         """
         removes an item from the visualization.
@@ -0,0 +1,21 @@
+"""The error types of the visualization. This module does not import Qt or OpenGL, so the simulation core can use
+them without loading the visualization in runs without visualization."""
+from enum import Enum
+
+
+class Level(Enum):
+    INFO = 0
+    WARNING = 1
+    CRITICAL = 2
+
+
+class VisualizationError(Exception):
+    def __init__(self, msg, level: Level):
+        super(VisualizationError, self).__init__(msg)
+        self.level = level
+        self.msg = msg
+
+
+class ResetException(Exception):
+    def __init__(self):
+        super(ResetException, self).__init__()
@@ -27,14 +27,28 @@ class Recorder:
 
     def record_round(self):
         r = [[[], [], [], []], [[], [], [], []], [[], []]]
-        for agent in self._world.agents:
-            r[0][0].append(copy.deepcopy(agent.coordinates))
-            r[0][1].append(copy.deepcopy(agent.color))
+        if self._world.agent_store is not None:
+            # the same records as below, read from the store columns in the order of world.agents
+            store = self._world.agent_store
+            rows = store.get_rows(self._world.agents)
+            row_list = rows.tolist()
+            coordinates = [store.coordinates[row] for row in row_list]
+            r[0][0] = copy.deepcopy(coordinates)
+            r[0][1] = copy.deepcopy([store.color[row] for row in row_list])
             if len(self.records) > 0:
-                r[0][2].append(copy.deepcopy(self.records[-1][0][0]))
+                r[0][2] = [copy.deepcopy(self.records[-1][0][0]) for _ in range(len(rows))]
             else:
-                r[0][2].append(copy.deepcopy(agent.coordinates))
-            r[0][3].append(copy.deepcopy(agent.is_carried()))
+                r[0][2] = copy.deepcopy(coordinates)
+            r[0][3] = store.get_carried()[rows].tolist()
+        else:
+            for agent in self._world.agents:
+                r[0][0].append(copy.deepcopy(agent.coordinates))
+                r[0][1].append(copy.deepcopy(agent.color))
+                if len(self.records) > 0:
+                    r[0][2].append(copy.deepcopy(self.records[-1][0][0]))
+                else:
+                    r[0][2].append(copy.deepcopy(agent.coordinates))
+                r[0][3].append(copy.deepcopy(agent.is_carried()))
 
         for item in self._world.items:
             r[1][0].append(copy.deepcopy(item.coordinates))
@@ -153,9 +153,9 @@ def draw_world(
 
 
 def create_svg(world, filename):
-    item_coordinates = world.item_map_coordinates.keys()
-    location_coordinates = world.location_map_coordinates.keys()
-    agent_coordinates = world.agent_map_coordinates.keys()
+    item_coordinates = world.item_map_coordinates.coordinates()
+    location_coordinates = world.location_map_coordinates.coordinates()
+    agent_coordinates = world.agent_map_coordinates.coordinates()
 
     minimum_x_coordinate, maximum_x_coordinate, minimum_y_coordinate, maximum_y_coordinate \
         = calculate_bounds(item_coordinates, agent_coordinates, location_coordinates)
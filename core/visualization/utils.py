@@ -1,11 +1,12 @@
-from enum import Enum
-
 import numpy as np
 from PyQt5.QtGui import QCloseEvent
 from PyQt5.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QLabel, QProgressBar, QMessageBox, QFrame, QFileDialog
 from PyQt5.QtCore import Qt
 from PyQt5 import QtCore
 
+# the error types are defined without Qt, they are imported here for the modules of the visualization
+from core.visualization.errors import Level, VisualizationError
+
 
 def normalize(v):
     length = np.sqrt(v[0]*v[0]+v[1]*v[1]+v[2]*v[2])
@@ -231,19 +232,6 @@ class MatterInfoFrame(QFrame):
         self.adjustSize()
 
 
-class Level(Enum):
-    INFO = 0
-    WARNING = 1
-    CRITICAL = 2
-
-
-class VisualizationError(Exception):
-    def __init__(self, msg, level: Level):
-        super(VisualizationError, self).__init__(msg)
-        self.level = level
-        self.msg = msg
-
-
 class TopQFileDialog(QFileDialog):
     def __init__(self, parent):
         super(TopQFileDialog, self).__init__(parent=parent)
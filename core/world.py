@@ -6,13 +6,36 @@ It also have the the coordination system and stated the maximum of the x and y c
 """
 import importlib
 import logging
-import random
 import threading
 import os
 import datetime
+import uuid
 
-from core import agent, item, location, vis3d
-from core.visualization.utils import show_msg, TopQFileDialog, VisualizationError, Level
+import numpy as np
+
+from core import agent, item, location
+from core.agent_store import AgentStore
+from core.flow_field import FlowField, FLOW_FIELD_MAX_DISTANCE
+from core import metrics, synchronous, vectorized
+from core.matter import MatterType
+from core.matter_list import MatterList
+from components.grids.grid import CoordinateMap, PathCache
+from core.visualization.errors import VisualizationError, Level
+
+
+class Cell:
+    """
+    Record of the matter on one cell of the grid. Each slot holds the matter of its type or None
+    """
+    __slots__ = ("agent", "item", "location")
+
+    def __init__(self):
+        self.agent = None
+        self.item = None
+        self.location = None
+
+    def is_empty(self):
+        return self.agent is None and self.item is None and self.location is None
 
 
 def load_scenario(mod, world):
@@ -31,18 +54,27 @@ class World:
         self.__round_counter = 1
         self.__end = False
 
+        self.config_data = config_data
+        self.grid = config_data.grid
+
+        # matter ids are allocated sequentially, matter_by_id maps the ids of the living matter to the matter
+        self.matter_id_counter = 0
+        self.matter_by_id = {}
+
+        # the parallel round mode exports the agent columns of the store, so it always uses one
+        self.agent_store = AgentStore() if config_data.agent_store or config_data.workers > 1 else None
         self.init_agents = []
         self.agent_id_counter = 0
-        self.agents = []
-        self.agent_map_coordinates = {}
+        self.agents = MatterList()
+        self.agent_map_coordinates = CoordinateMap(self.grid)
         self.agent_map_id = {}
         self.agents_created = []
         self.agent_rm = []
         self.__agent_deleted = False
         self.new_agent = None
 
-        self.items = []
-        self.item_map_coordinates = {}
+        self.items = MatterList()
+        self.item_map_coordinates = CoordinateMap(self.grid)
         self.item_map_id = {}
         self.items_created = []
         self.item_rm = []
@@ -50,69 +82,132 @@ class World:
         self.__item_deleted = False
         self.new_item = None
 
-        self.locations = []
-        self.location_map_coordinates = {}
+        self.locations = MatterList()
+        self.location_map_coordinates = CoordinateMap(self.grid)
         self.location_map_id = {}
         self.locations_created = []
         self.locations_rm = []
         self.__location_deleted = False
         self.new_location = None
 
-        self.config_data = config_data
-        self.grid = config_data.grid
-
+        # grid key -> Cell, one entry for every cell on which any matter is
+        self.cells = {}
+        self.path_cache = PathCache()
+        self.flow_fields = []
+        self.parallel_stepper = None
+        # the changes since the last export of the parallel round mode, None while the mode is not used.
+        # changed_matter holds the items and locations put on or removed from a cell or recolored,
+        # changed_memories the ids of the matter whose memory was written
+        self.changed_matter = None
+        self.changed_memories = None
+        # seeded generator for the vectorized kernels
+        self.rng = np.random.default_rng(config_data.seed_value)
+
+        self.metrics = metrics.MetricsRegistry()
         self.csv_generator_module = importlib.import_module('components.generators.csv.%s' % config_data.csv_generator)
         self.csv_round = self.csv_generator_module.CsvRoundData(scenario=config_data.scenario,
                                                                 solution=config_data.solution,
                                                                 seed=config_data.seed_value,
-                                                                directory=config_data.directory_csv)
+                                                                directory=config_data.directory_csv,
+                                                                metrics=self.metrics)
 
         if config_data.visualization:
+            # the visualization loads Qt and OpenGL, runs without visualization never import it
+            from core import vis3d
             self.vis = vis3d.Visualization(self)
         else:
             self.vis = None
 
         self._scenario_load_error = None
 
-    def reset(self):
+    def reset(self, config_data=None):
         """
         resets everything (agents, items, locations) except for the logging in system.log and in the csv file...
         reloads the scenario.
+        :param config_data: configuration of a new simulation in the same world, e.g. the next job of a sweep worker.
+                            the metrics and the csv files are created again in its directory
         :return:
         """
+        if config_data is not None:
+            self.config_data = config_data
+            self.grid = config_data.grid
+            self.metrics = metrics.MetricsRegistry()
+            self.csv_generator_module = importlib.import_module('components.generators.csv.%s'
+                                                                % config_data.csv_generator)
+            self.csv_round = self.csv_generator_module.CsvRoundData(scenario=config_data.scenario,
+                                                                    solution=config_data.solution,
+                                                                    seed=config_data.seed_value,
+                                                                    directory=config_data.directory_csv,
+                                                                    metrics=self.metrics)
         self.__round_counter = 1
         self.__end = False
 
+        self.matter_id_counter = 0
+        self.matter_by_id = {}
+
+        self.agent_store = AgentStore() if self.config_data.agent_store or self.config_data.workers > 1 else None
         self.init_agents = []
         self.agent_id_counter = 0
-        self.agents = []
+        self.agents = MatterList()
         self.agents_created = []
         self.agent_rm = []
-        self.agent_map_coordinates = {}
+        self.agent_map_coordinates = CoordinateMap(self.grid)
         self.agent_map_id = {}
         self.__agent_deleted = False
         self.new_agent = None
 
-        self.items = []
+        self.items = MatterList()
         self.items_created = []
         self.item_rm = []
-        self.item_map_coordinates = {}
+        self.item_map_coordinates = CoordinateMap(self.grid)
         self.item_map_id = {}
         self.__item_deleted = False
         self.new_item = None
 
-        self.locations = []
+        self.locations = MatterList()
         self.locations_created = []
-        self.location_map_coordinates = {}
+        self.location_map_coordinates = CoordinateMap(self.grid)
         self.location_map_id = {}
         self.locations_rm = []
         self.__location_deleted = False
         self.new_location = None
+        self.cells = {}
+        self.path_cache.clear()
+        self.flow_fields = []
+        self.close_workers()
+        self.changed_matter = None
+        self.changed_memories = None
+        self.rng = np.random.default_rng(self.config_data.seed_value)
         self._scenario_load_error = None
 
         if self.vis is not None:
             self.vis.reset()
 
+    def allocate_matter_id(self, matter):
+        """
+        Allocates the next matter id and registers the matter under it
+
+        :param matter: the new matter
+        :return: the new id
+        """
+        self.matter_id_counter += 1
+        self.matter_by_id[self.matter_id_counter] = matter
+        return self.matter_id_counter
+
+    def get_matter_by_id(self, matter_id):
+        """
+        Returns the matter with the given id
+
+        :param matter_id: the integer id or its string view (see Matter.get_id_str)
+        :return: the matter or None if there is no matter with this id in the world
+        """
+        if isinstance(matter_id, str):
+            try:
+                matter_id = uuid.UUID(matter_id).int
+            except ValueError:
+                return None
+        return self.matter_by_id.get(matter_id)
+
     def init_scenario(self, scenario_module):
         if self.config_data.visualization:
             # if visualization is on, run the scenario in a separate thread and show that the program runs..
@@ -123,27 +218,33 @@ class World:
             load_scenario(scenario_module, self)
 
         if self._scenario_load_error is not None:
-            show_msg("Error while loading Scenario:\n%s" % self._scenario_load_error.msg, Level.CRITICAL,
-                     self.vis.get_main_window())
+            if self.vis is not None:
+                from core.visualization.utils import show_msg
+                show_msg("Error while loading Scenario:\n%s" % self._scenario_load_error.msg, Level.CRITICAL,
+                         self.vis.get_main_window())
+            else:
+                print("Error while loading Scenario:\n%s" % self._scenario_load_error.msg)
             exit(1)
 
         if self.vis is not None:
             self.vis.update_visualization_data()
 
         if self.config_data.agent_random_order:
-            random.shuffle(self.agents)
+            self.agents.shuffle()
 
     def save_scenario(self, quick):
+        from core.visualization.utils import show_msg, TopQFileDialog
 
         def save_scenario(fn):
             try:
                 f = open(fn, "w+")
                 f.write("def scenario(world):\n")
-                for prtc in self.agent_map_coordinates.values():
+                # sorted by id, so that saving and loading a scenario keeps ids and order of creation
+                for prtc in sorted(self.agent_map_coordinates.values(), key=lambda m: m.get_id()):
                     f.write("\tworld.add_agent(%s, color=%s)\n" % (str(prtc.coordinates), str(prtc.get_color())))
-                for tl in self.item_map_coordinates.values():
+                for tl in sorted(self.item_map_coordinates.values(), key=lambda m: m.get_id()):
                     f.write("\tworld.add_item(%s, color=%s)\n" % (str(tl.coordinates), str(tl.get_color())))
-                for lctn in self.location_map_coordinates.values():
+                for lctn in sorted(self.location_map_coordinates.values(), key=lambda m: m.get_id()):
                     f.write("\tworld.add_location(%s, color=%s)\n" % (str(lctn.coordinates), str(lctn.get_color())))
                 f.flush()
                 f.close()
@@ -188,7 +289,7 @@ class World:
         agent_csv = self.csv_generator_module.CsvAgentFile(self.config_data.directory_csv)
         for a in self.agents:
             agent_csv.write_agent(a)
-        agent_csv.csv_file.close()
+        agent_csv.close()
 
     def set_successful_end(self):
         self.csv_round.success()
@@ -258,9 +359,162 @@ class World:
         """
         return self.agents
 
+    def get_cell(self, coordinates):
+        """
+        Returns the cell record on the given coordinates, that holds the agent, item and location on it
+
+        :param coordinates: coordinates tuple or grid key
+        :return: Cell or None if there is no matter on the coordinates
+        """
+        if type(coordinates) is not int:
+            coordinates = self.grid.get_key(coordinates)
+        return self.cells.get(coordinates)
+
+    def get_cells_around(self, coordinates):
+        """
+        Returns the cell records of all adjacent cells with a single batched lookup
+
+        :param coordinates: coordinates tuple or grid key
+        :return: list of Cell or None, in the order of grid.get_directions_list()
+        """
+        if type(coordinates) is not int:
+            coordinates = self.grid.get_key(coordinates)
+        cells = self.cells
+        return [cells.get(coordinates + offset) for offset in self.grid.get_key_offsets()]
+
+    def occupy_cell(self, matter, coordinates):
+        """
+        Puts the matter on the given coordinates into the coordinate map of its type and into the cell table
+
+        :param matter: the matter
+        :param coordinates: coordinates tuple or grid key
+        :return: None
+        """
+        key = coordinates if type(coordinates) is int else self.grid.get_key(coordinates)
+        cell = self.cells.get(key)
+        if cell is None:
+            cell = self.cells[key] = Cell()
+        if matter.type == MatterType.AGENT:
+            self.agent_map_coordinates[key] = matter
+            cell.agent = matter
+        elif matter.type == MatterType.ITEM:
+            self.item_map_coordinates[key] = matter
+            cell.item = matter
+        elif matter.type == MatterType.LOCATION:
+            self.location_map_coordinates[key] = matter
+            cell.location = matter
+        self.path_cache.invalidate(key, matter.type)
+        for flow_field in self.flow_fields:
+            flow_field.cell_changed(key, matter.type)
+        if self.changed_matter is not None and matter.type != MatterType.AGENT:
+            self.changed_matter.add(matter)
+
+    def vacate_cell(self, matter, coordinates):
+        """
+        Removes the matter from the given coordinates in the coordinate map of its type and in the cell table.
+        Nothing happens if the matter is not on these coordinates
+
+        :param matter: the matter
+        :param coordinates: coordinates tuple or grid key
+        :return: None
+        """
+        key = coordinates if type(coordinates) is int else self.grid.get_key(coordinates)
+        cell = self.cells.get(key)
+        if cell is None:
+            return
+        if matter.type == MatterType.AGENT and cell.agent is matter:
+            del self.agent_map_coordinates[key]
+            cell.agent = None
+        elif matter.type == MatterType.ITEM and cell.item is matter:
+            del self.item_map_coordinates[key]
+            cell.item = None
+        elif matter.type == MatterType.LOCATION and cell.location is matter:
+            del self.location_map_coordinates[key]
+            cell.location = None
+        else:
+            return
+        if cell.is_empty():
+            del self.cells[key]
+        for flow_field in self.flow_fields:
+            flow_field.cell_changed(key, matter.type)
+        if self.changed_matter is not None and matter.type != MatterType.AGENT:
+            self.changed_matter.add(matter)
+
+    def find_path(self, start, end, blocking=(MatterType.AGENT, MatterType.ITEM)):
+        """
+        Finds a shortest path around the matter of the given types. Found paths are cached
+        until a blocking matter is put on one of their cells.
+
+        :param start: coordinates of the start
+        :param end: coordinates of the end, it may be occupied
+        :param blocking: matter types that block the path
+        :return: list of directions or None if there is no path
+        """
+        blocking = tuple(blocking)
+        cache_key = (self.grid.get_key(start), self.grid.get_key(end), blocking)
+        path = self.path_cache.get(cache_key)
+        if path is not None:
+            return list(path)
+        blocked = []
+        if MatterType.AGENT in blocking:
+            blocked.append(self.agent_map_coordinates)
+        if MatterType.ITEM in blocking:
+            blocked.append(self.item_map_coordinates)
+        if MatterType.LOCATION in blocking:
+            blocked.append(self.location_map_coordinates)
+        bounds = None
+        if self.config_data.border == 1:
+            bounds = (self.get_x_size(), self.get_y_size(), self.get_z_size())
+        path = self.grid.find_path(start, end, blocked, bounds)
+        if path is None:
+            return None
+        path_keys = []
+        key = cache_key[0]
+        for direction in path:
+            key = self.grid.get_key_in_direction(key, direction)
+            path_keys.append(key)
+        self.path_cache.put(cache_key, tuple(path), path_keys)
+        return path
+
+    def create_flow_field(self, targets, blocking=(MatterType.ITEM,), max_distance=FLOW_FIELD_MAX_DISTANCE):
+        """
+        Creates a flow field towards the given targets, that is kept up to date while matter is added,
+        removed or moved. Agents can look up their distance and the direction to the nearest target in O(1).
+
+        :param targets: a matter type (all matter of this type are targets) or an iterable of target coordinates
+        :param blocking: matter types which block the cells they are on
+        :param max_distance: the maximal distance to the targets that is covered
+        :return: the FlowField
+        """
+        flow_field = FlowField(self, targets, blocking, max_distance)
+        self.flow_fields.append(flow_field)
+        return flow_field
+
+    def remove_flow_field(self, flow_field):
+        """
+        Stops updating the given flow field
+
+        :param flow_field: the FlowField
+        :return: None
+        """
+        self.flow_fields.remove(flow_field)
+
+    def get_agent_positions(self):
+        """
+        Returns the coordinates of all agents as a numpy array.
+        If the agent store is enabled, this is a view on the store without any copying
+        and the rows are in the order of the store, not of the agent list.
+
+        :return: numpy array of shape (n, 3)
+        """
+        if self.agent_store is not None:
+            return self.agent_store.get_positions()
+        return np.array([a.coordinates for a in self.agents], dtype=np.float64).reshape(-1, 3)
+
     def get_agent_map_coordinates(self):
         """
-        Get a dictionary with all agents mapped with their actual coordinates
+        Get a dictionary with all agents mapped with their actual coordinates.
+        The dictionary is keyed by the grids integer keys, but also accepts coordinate tuples
 
         :return: a dictionary with agents and their coordinates
         """
@@ -292,7 +546,8 @@ class World:
 
     def get_item_map_coordinates(self):
         """
-        Get a dictionary with all items mapped with their actual coordinates
+        Get a dictionary with all items mapped with their actual coordinates.
+        The dictionary is keyed by the grids integer keys, but also accepts coordinate tuples
 
         :return: a dictionary with agents and their coordinates
         """
@@ -324,7 +579,8 @@ class World:
 
     def get_location_map_coordinates(self):
         """
-        Get a dictionary with all locations mapped with their actual coordinates
+        Get a dictionary with all locations mapped with their actual coordinates.
+        The dictionary is keyed by the grids integer keys, but also accepts coordinate tuples
 
         :return: a dictionary with locations and their coordinates
         """
@@ -408,7 +664,7 @@ class World:
                     if self.vis is not None:
                         self.vis.agent_changed(self.new_agent)
                     self.agents_created.append(self.new_agent)
-                    self.agent_map_coordinates[self.new_agent.coordinates] = self.new_agent
+                    self.occupy_cell(self.new_agent, coordinates)
                     self.agent_map_id[self.new_agent.get_id()] = self.new_agent
                     self.agents.append(self.new_agent)
                     self.csv_round.update_agent_num(len(self.agents))
@@ -437,18 +693,227 @@ class World:
         rm_agent = self.agent_map_id[agent_id]
         if rm_agent:
             self.agents.remove(rm_agent)
-            del self.agent_map_coordinates[rm_agent.coordinates]
+            self.vacate_cell(rm_agent, rm_agent.coordinates)
             del self.agent_map_id[agent_id]
+            self.matter_by_id.pop(agent_id, None)
             self.agent_rm.append(rm_agent)
+            rm_agent.detach_from_store()
             if self.vis is not None:
                 self.vis.remove_agent(rm_agent)
             self.csv_round.update_agent_num(len(self.agents))
-            self.csv_round.update_metrics(agents_deleted=1)
+            self.metrics.count(metrics.AGENTS_DELETED)
             self.__agent_deleted = True
             return True
         else:
             return False
 
+    def move_agents(self, agents, directions, priorities=None, rng=None):
+        """
+        Moves many agents synchronously in one pass.
+        All moves are checked against the positions at the beginning of the call. If several agents want to move
+        on the same cell, the one with the highest priority wins (the first one in the list on equal priorities).
+        Without priorities the winner is drawn with the seeded generator of the world (or the given one), so the
+        draws of the solutions with the random module do not change the winners.
+        An agent can move on a cell that is left by another agent in the same call, cycles of agents do not move.
+        The metrics and the visualization are updated once for all moves.
+
+        :param agents: list of agents
+        :param directions: list of directions, one for each agent. A direction can be a direction vector,
+                           an index in grid.get_directions_list() or None for not moving
+        :param priorities: optional list of numbers, one for each agent
+        :param rng: numpy random Generator, the seeded generator of the world if not given
+        :return: list of booleans, True for each agent that has moved
+        """
+        directions_list = self.grid.get_directions_list()
+        target_keys = [None] * len(agents)
+        target_coordinates = [None] * len(agents)
+        contenders = {}
+        for i, (moving_agent, direction) in enumerate(zip(agents, directions)):
+            if direction is None or moving_agent.is_carried():
+                continue
+            if isinstance(direction, (int, np.integer)):
+                direction = directions_list[direction]
+            coordinates = self.grid.get_coordinates_in_direction(moving_agent.coordinates, direction)
+            coordinates = moving_agent.check_within_border(direction, coordinates)
+            if not self.grid.are_valid_coordinates(coordinates):
+                continue
+            key = self.grid.get_key(coordinates)
+            target_keys[i] = key
+            target_coordinates[i] = coordinates
+            contenders.setdefault(key, []).append(i)
+
+        if rng is None:
+            rng = self.rng
+        winners = set()
+        for key in sorted(contenders):
+            on_key = contenders[key]
+            if len(on_key) == 1:
+                winners.add(on_key[0])
+            elif priorities is None:
+                winners.add(on_key[int(rng.integers(len(on_key)))])
+            else:
+                winners.add(max(on_key, key=lambda j: priorities[j]))
+
+        # a winner moves if its target is free or if the agent on it moves away.
+        # follow these chains and resolve every agent on them at once
+        index_of = {moving_agent: i for i, moving_agent in enumerate(agents)}
+        unknown, visiting, moves, stays = 0, 1, 2, 3
+        state = [unknown] * len(agents)
+        for i in sorted(winners):
+            chain = []
+            j = i
+            while True:
+                if state[j] == moves or state[j] == stays:
+                    result = state[j]
+                    break
+                if state[j] == visiting:
+                    result = stays
+                    break
+                state[j] = visiting
+                chain.append(j)
+                occupant = self.agent_map_coordinates.get(target_keys[j])
+                if occupant is None:
+                    result = moves
+                    break
+                k = index_of.get(occupant)
+                if k is None or k not in winners:
+                    result = stays
+                    break
+                j = k
+            for j in chain:
+                state[j] = result
+
+        moved = [s == moves for s in state]
+        movers = [i for i in range(len(agents)) if moved[i]]
+        self.commit_moves([agents[i] for i in movers], [target_coordinates[i] for i in movers],
+                          [target_keys[i] for i in movers])
+        logging.info("%d of %d agents moved", len(movers), len(agents))
+        return moved
+
+    def commit_moves(self, movers, coordinates, keys, old_keys=None):
+        """
+        Moves the agents to their new coordinates without any checks, the targets have to be free
+        after all movers left their cells. The metrics and the visualization are updated once for all moves.
+
+        :param movers: list of agents
+        :param coordinates: list of the new coordinates, one for each agent
+        :param keys: list of the grid keys (int) of the new coordinates
+        :param old_keys: optional list of the grid keys (int) of the current coordinates
+        :return: None
+        """
+        if not movers:
+            return
+        if old_keys is None:
+            old_keys = [self.grid.get_key(moving_agent.coordinates) for moving_agent in movers]
+        # the same as vacate_cell and occupy_cell for each mover, but the maps are updated in one pass
+        cells = self.cells
+        agent_map = self.agent_map_coordinates
+        for moving_agent, old_key in zip(movers, old_keys):
+            cell = cells.get(old_key)
+            if cell is not None and cell.agent is moving_agent:
+                cell.agent = None
+                dict.__delitem__(agent_map, old_key)
+                if cell.item is None and cell.location is None:
+                    del cells[old_key]
+        for moving_agent, key in zip(movers, keys):
+            cell = cells.get(key)
+            if cell is None:
+                cell = cells[key] = Cell()
+            cell.agent = moving_agent
+            dict.__setitem__(agent_map, key, moving_agent)
+        if len(self.path_cache):
+            for key in keys:
+                self.path_cache.invalidate(key, MatterType.AGENT)
+        for flow_field in self.flow_fields:
+            for key in old_keys:
+                flow_field.cell_changed(key, MatterType.AGENT)
+            for key in keys:
+                flow_field.cell_changed(key, MatterType.AGENT)
+
+        store = self.agent_store
+        if store is not None:
+            rows = store.get_rows(movers)
+            store.positions[rows] = coordinates
+            store_coordinates = store.coordinates
+            for row, new_coordinates in zip(rows.tolist(), coordinates):
+                store_coordinates[row] = new_coordinates
+            carriers = [movers[i] for i in np.flatnonzero(store.carried_item_ids[rows] | store.carried_agent_ids[rows])]
+            metric_rows = store.metric_rows[rows]
+        else:
+            for moving_agent, new_coordinates in zip(movers, coordinates):
+                moving_agent.coordinates = new_coordinates
+            carriers = movers
+            metric_rows = [moving_agent.csv_agent_writer.row for moving_agent in movers]
+        for moving_agent in carriers:
+            moving_agent.check_for_carried_matter()
+        if self.vis is not None:
+            self.vis.agents_changed(movers)
+        self.metrics.count_agents(metric_rows, metrics.STEPS)
+        self.metrics.count(metrics.STEPS, len(movers))
+
+    def random_walk_agents(self, rng=None):
+        """
+        Moves every agent one step in a random direction, see core.vectorized.random_walk
+
+        :param rng: numpy random Generator, the seeded generator of the world if not given
+        :return: list of the agents that have moved
+        """
+        return vectorized.random_walk(self, self.rng if rng is None else rng)
+
+    def take_snapshot(self):
+        """
+        Freezes the current state of the world for the synchronous round mode
+
+        :return: core.synchronous.Snapshot
+        """
+        return synchronous.Snapshot(self)
+
+    def commit_intents(self, intents):
+        """
+        Applies the intents of a synchronous round, see core.synchronous.commit_intents
+
+        :param intents: list of core.synchronous.Intent
+        :return: None
+        """
+        synchronous.commit_intents(self, intents)
+
+    def run_synchronous_round(self, step):
+        """
+        Runs one round in the "compute then commit" mode: every agent is stepped against a snapshot of the world
+        and all resulting intents are committed afterwards
+
+        With more than one configured worker the agents are stepped in worker processes, see core.parallel.
+        With a tile_size greater than 0 the workers own the tiles of the world, see core.tiles
+
+        :param step: the step function of the solution, step(snapshot, agent) -> intents
+        :return: None
+        """
+        if self.config_data.workers > 1:
+            if self.parallel_stepper is None:
+                # multiprocessing and shared memory are only imported when they are used
+                if self.config_data.tile_size > 0:
+                    from core import tiles
+                    self.parallel_stepper = tiles.TiledStepper(self.grid, step.__module__, self.config_data.workers,
+                                                               self.config_data.tile_size, self.config_data.tile_halo)
+                else:
+                    from core import parallel
+                    self.parallel_stepper = parallel.ParallelStepper(self.grid, step.__module__,
+                                                                     self.config_data.workers)
+            self.commit_intents(self.parallel_stepper.compute_intents(self))
+            return
+        snapshot = self.take_snapshot()
+        self.commit_intents(synchronous.compute_intents(step, snapshot, snapshot.agents))
+
+    def close_workers(self):
+        """
+        Stops the worker processes of the synchronous round mode, if there are any
+
+        :return: None
+        """
+        if self.parallel_stepper is not None:
+            self.parallel_stepper.close()
+            self.parallel_stepper = None
+
     def remove_agent_on(self, coordinates):
         """
         Removes an agent on a give coordinate from to the world database
@@ -484,7 +949,7 @@ class World:
                 if self.vis is not None:
                     self.vis.item_changed(self.new_item)
                 self.csv_round.update_items_num(len(self.items))
-                self.item_map_coordinates[self.new_item.coordinates] = self.new_item
+                self.occupy_cell(self.new_item, coordinates)
                 self.item_map_id[self.new_item.get_id()] = self.new_item
                 logging.info("Created item with id %s on coordinates %s",
                              str(self.new_item.get_id()), str(coordinates))
@@ -515,12 +980,10 @@ class World:
                 del self.item_map_id[rm_item.get_id()]
             except KeyError:
                 pass
-            try:  # cher: added so the program does not crashed if it does not find any entries in the map
-                del self.item_map_coordinates[rm_item.coordinates]
-            except KeyError:
-                pass
+            self.matter_by_id.pop(rm_item.get_id(), None)
+            self.vacate_cell(rm_item, rm_item.coordinates)
             self.csv_round.update_items_num(len(self.items))
-            self.csv_round.update_metrics(items_deleted=1)
+            self.metrics.count(metrics.ITEMS_DELETED)
             self.__item_deleted = True
             return True
         else:
@@ -563,7 +1026,7 @@ class World:
                 self.locations.append(self.new_location)
                 if self.vis is not None:
                     self.vis.location_changed(self.new_location)
-                self.location_map_coordinates[self.new_location.coordinates] = self.new_location
+                self.occupy_cell(self.new_location, coordinates)
                 self.location_map_id[self.new_location.get_id()] = self.new_location
                 self.csv_round.update_locations_num(len(self.locations))
                 logging.info("Created location with id %s on coordinates %s",
@@ -592,16 +1055,14 @@ class World:
                 self.vis.remove_location(rm_location)
             self.locations_rm.append(rm_location)
             logging.info("Deleted location with location id %s on %s", str(location_id), str(rm_location.coordinates))
-            try:
-                del self.location_map_coordinates[rm_location.coordinates]
-            except KeyError:
-                pass
+            self.vacate_cell(rm_location, rm_location.coordinates)
             try:
                 del self.location_map_id[location_id]
             except KeyError:
                 pass
+            self.matter_by_id.pop(location_id, None)
             self.csv_round.update_locations_num(len(self.locations))
-            self.csv_round.update_metrics(location_deleted=1)
+            self.metrics.count(metrics.LOCATION_DELETED)
             self.__location_deleted = True
             return True
         else:
@@ -1,18 +1,45 @@
-import sys, getopt, subprocess
-from datetime import datetime
-import os
+"""Runs a sweep of simulations: every combination of seed, scenario, solution and config overrides is one job.
+The jobs run as swarm-sim.py processes in a bounded pool, the next job starts as soon as any job finishes.
+A job that runs longer than the timeout is killed, a job that crashes is started again up to retries times.
+
+    python multiple.py -r 1-20 -w lonely_agent,test_interfaces -s random_walk -n 100 -c workers=1 -c workers=4
+
+runs 2 * 1 * 2 * 20 = 80 jobs. Repeating -c with the same option adds values to the matrix.
+With -i the jobs run in persistent worker processes instead, which import the simulator once and run
+many jobs in sequence, so short simulations do not pay the start up of python and its imports every time."""
 import configparser
+import getopt
+import importlib
+import itertools
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+import traceback
+from collections import deque, namedtuple
+from datetime import datetime
+
+Job = namedtuple("Job", ["index", "scenario", "solution", "seed", "overrides", "tag"])
+
+USAGE = 'multiple.py -r <seed_start>-<seed_end> -w <scenario>[,<scenario>...] -s <solution>[,<solution>...] ' \
+        '-n <maxRounds> -c <option>=<value> -j <workers> -t <timeout seconds> --retries <retries> -i'
 
 
 def main(argv):
     max_round = 10
     seed_start = 1
     seed_end = 2
+    workers = os.cpu_count() or 1
+    timeout = 0
+    retries = 1
+    in_process = False
+    overrides = {}
     config = configparser.ConfigParser(allow_no_value=True)
     config.read("config.ini")
 
     try:
-        scenario_file = config.get ("File", "scenario")
+        scenario_file = config.get("File", "scenario")
     except (configparser.NoOptionError) as noe:
         scenario_file = "init_scenario.py"
 
@@ -23,54 +50,315 @@ def main(argv):
 
     n_time = datetime.now().strftime('%Y-%m-%d_%H_%M_%S')[:-1]
     try:
-        opts, args = getopt.getopt(argv, "hs:w:r:n:v:", ["scenaro=", "solution="])
+        opts, args = getopt.getopt(argv, "hs:w:r:n:c:j:t:i",
+                                   ["scenario=", "solution=", "seed_start=", "seed_end=", "maxrounds=",
+                                    "config=", "workers=", "timeout=", "retries=", "in_process"])
     except getopt.GetoptError:
-        print('Error: multiple.py -r <randomeSeed> -w <scenario> -s <solution> -n <maxRounds>')
+        print('Error: ' + USAGE)
         sys.exit(2)
 
     for opt, arg in opts:
         if opt == '-h':
-            print('multiple.py -ss <seed_start> -se <seed_end> -w <scenario> -s <solution>  -n <maxRounds>')
+            print(USAGE)
             sys.exit()
         elif opt in ("-s", "--solution"):
             solution_file = arg
         elif opt in ("-w", "--scenario"):
             scenario_file = arg
-        elif opt in ("-ss", "--seed_start"):
+        elif opt == "-r":
+            start, _, end = arg.partition("-")
+            seed_start = int(start)
+            seed_end = int(end or start)
+        elif opt == "--seed_start":
             seed_start = int(arg)
-        elif opt in ("-se", "--seed_end"):
+        elif opt == "--seed_end":
             seed_end = int(arg)
         elif opt in ("-n", "--maxrounds"):
             max_round = int(arg)
+        elif opt in ("-c", "--config"):
+            option, _, value = arg.partition("=")
+            overrides.setdefault(option.strip(), []).append(value.strip())
+        elif opt in ("-j", "--workers"):
+            workers = max(1, int(arg))
+        elif opt in ("-t", "--timeout"):
+            timeout = float(arg)
+        elif opt == "--retries":
+            retries = int(arg)
+        elif opt in ("-i", "--in_process"):
+            in_process = True
+
+    scenarios = [name.strip() for name in scenario_file.split(",")]
+    solutions = [name.strip() for name in solution_file.split(",")]
+    if len(scenarios) == 1 and len(solutions) == 1:
+        direction = "./outputs/mulitple/" + str(n_time) + "_" + scenarios[0].rsplit('.', 1)[0] + "_" + \
+                    solutions[0].rsplit('.', 1)[0]
+    else:
+        direction = "./outputs/mulitple/" + str(n_time) + "_sweep"
+    if not os.path.exists(direction + "/logs"):
+        os.makedirs(direction + "/logs")
+
+    jobs = create_jobs(n_time, range(seed_start, seed_end + 1), scenarios, solutions, overrides)
+    if in_process:
+        slots = [WorkerSlot(max_round) for _ in range(workers)]
+    else:
+        slots = [ProcessSlot(max_round) for _ in range(workers)]
+    results = run_jobs(jobs, slots, timeout, retries, direction + "/logs")
+    write_results(direction, jobs, results)
+
+
+def create_jobs(n_time, seeds, scenarios, solutions, overrides):
+    """
+    creates the job matrix
+    :param n_time: the time stamp of the sweep
+    :param seeds: the seeds
+    :param scenarios: the scenario names
+    :param solutions: the solution names
+    :param overrides: dictionary from the config options to lists of their values
+    :return: list of jobs
+    """
+    options = list(overrides)
+    variants = [tuple(zip(options, values)) for values in itertools.product(*(overrides[o] for o in options))]
+    jobs = []
+    for variant_index, variant in enumerate(variants):
+        # the tag is the -d argument of swarm-sim.py, every variant needs its own output directories
+        tag = str(n_time) if len(variants) == 1 else "%s_c%d" % (n_time, variant_index)
+        for scenario, solution, seed in itertools.product(scenarios, solutions, seeds):
+            jobs.append(Job(len(jobs), scenario, solution, seed, variant, tag))
+    return jobs
+
+
+def get_command(job, max_round):
+    command = [sys.executable, "swarm-sim.py", "-n", str(max_round), "-m", "1", "-d", job.tag,
+               "-r", str(job.seed), "-v", "0", "-w", job.scenario, "-s", job.solution]
+    if "plot_workers" not in dict(job.overrides):
+        # the sweep already uses all cpus, the plots of one job are rendered in its own process
+        command += ["-c", "plot_workers=1"]
+    for option, value in job.overrides:
+        command += ["-c", "%s=%s" % (option, value)]
+    return command
+
+
+def get_output_directory(job):
+    """
+    :return: the csv directory of the job, like create_directory_for_data in swarm-sim.py
+    """
+    return "./outputs/csv/mulitple/%s_%s_%s/%s" % (job.tag, job.scenario.rsplit('.', 1)[0],
+                                                   job.solution.rsplit('.', 1)[0], job.seed)
+
+
+class ProcessSlot:
+    """
+    Runs every job in a new swarm-sim.py process
+    """
+
+    def __init__(self, max_round):
+        self.max_round = max_round
+        self.process = None
+        self.log = None
+
+    def start(self, job, log_name):
+        self.log = open(log_name, "a")
+        self.process = subprocess.Popen(get_command(job, self.max_round), stdout=self.log, stderr=subprocess.STDOUT)
+
+    def poll(self):
+        """
+        :return: None while the job runs, otherwise its exit code
+        """
+        exit_code = self.process.poll()
+        if exit_code is not None:
+            self.log.close()
+        return exit_code
+
+    def kill(self):
+        self.process.kill()
+        self.process.wait()
+        self.log.close()
+
+    def close(self):
+        pass
+
+
+class WorkerSlot:
+    """
+    Runs the jobs one after another in a persistent worker process, which imports the simulator only once
+    and resets its world for every job. A worker that is killed or dies is replaced by a new one for the next job
+    """
+
+    def __init__(self, max_round):
+        self.max_round = max_round
+        self.process = None
+        self.connection = None
+
+    def start(self, job, log_name):
+        if self.process is None:
+            context = multiprocessing.get_context("spawn")
+            self.connection, child_connection = context.Pipe()
+            # not a daemon, the simulation of a job may start its own worker processes
+            self.process = context.Process(target=run_worker, args=(child_connection,), name="sweep worker")
+            self.process.start()
+            child_connection.close()
+        self.connection.send((get_command(job, self.max_round)[2:], log_name))
+
+    def poll(self):
+        """
+        :return: None while the job runs, otherwise its exit code
+        """
+        if self.connection.poll():
+            try:
+                return self.connection.recv()
+            except EOFError:
+                pass
+        elif self.process.is_alive():
+            return None
+        # the worker died during the job
+        self.process.join()
+        exit_code = self.process.exitcode or -1
+        self.process = None
+        return exit_code
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.process = None
+
+    def close(self):
+        if self.process is not None:
+            self.connection.send(None)
+            self.process.join()
+            self.process = None
+
+
+def run_worker(connection):
+    """
+    main function of a persistent worker, runs the jobs it receives until it receives None
+    :param connection: the pipe to the scheduler, jobs are (swarm-sim.py arguments, log file name)
+    :return: None
+    """
+    swarm_sim_module = importlib.import_module("swarm-sim")
+    base_config = swarm_sim_module.config.ConfigData()
+    swarm_sim_world = None
+    while True:
+        message = connection.recv()
+        if message is None:
+            return
+        argv, log_name = message
+        with open(log_name, "a") as log:
+            sys.stdout = sys.stderr = log
+            try:
+                swarm_sim_world = swarm_sim_module.swarm_sim(argv, swarm_sim_world, base_config)
+                exit_code = 0
+            except SystemExit as e:
+                exit_code = e.code if isinstance(e.code, int) else int(e.code is not None)
+            except Exception:
+                traceback.print_exc()
+                exit_code = 1
+            finally:
+                sys.stdout = sys.__stdout__
+                sys.stderr = sys.__stderr__
+        if exit_code != 0:
+            # the world of a failed simulation is not reused
+            swarm_sim_world = None
+        connection.send(exit_code)
+
+
+def run_jobs(jobs, slots, timeout, retries, log_dir):
+    """
+    runs the jobs in the slots, a free slot is filled with the next job immediately
+    :param jobs: the jobs
+    :param slots: one ProcessSlot or WorkerSlot per simultaneously running job
+    :param timeout: seconds after which a job is killed, 0 for no timeout
+    :param retries: how often a crashed job is started again
+    :param log_dir: directory of the stdout and stderr logs of the jobs
+    :return: dictionary from the job index to (status, attempts, seconds), status is ok, failed or timeout
+    """
+    pending = deque((job, 1) for job in jobs)
+    free = list(slots)
+    running = {}
+    results = {}
+    sweep_start = time.perf_counter()
+    progress = ""
+    try:
+        while pending or running:
+            while pending and free:
+                job, attempt = pending.popleft()
+                slot = free.pop()
+                slot.start(job, "%s/job_%d.txt" % (log_dir, job.index))
+                running[slot] = (job, attempt, time.perf_counter())
+
+            time.sleep(0.05)
+            for slot, (job, attempt, start) in list(running.items()):
+                seconds = time.perf_counter() - start
+                status = None
+                exit_code = slot.poll()
+                if exit_code is not None:
+                    status = "ok" if exit_code == 0 else "failed"
+                elif timeout and seconds > timeout:
+                    slot.kill()
+                    status = "timeout"
+                if status is None:
+                    continue
+                del running[slot]
+                free.append(slot)
+                if status == "failed" and attempt <= retries:
+                    print("\nJob %d (seed %d, %s, %s) crashed with exit code %d, retrying"
+                          % (job.index, job.seed, job.scenario, job.solution, exit_code))
+                    pending.append((job, attempt + 1))
+                    continue
+                results[job.index] = (status, attempt, seconds)
+                if status != "ok":
+                    print("\nJob %d (seed %d, %s, %s) %s, see %s/job_%d.txt"
+                          % (job.index, job.seed, job.scenario, job.solution, status, log_dir, job.index))
+            progress = print_progress(progress, len(jobs), results, len(running),
+                                      time.perf_counter() - sweep_start)
+    finally:
+        for slot in running:
+            slot.kill()
+        for slot in slots:
+            slot.close()
+    print()
+    return results
+
+
+def print_progress(last, total, results, running, seconds):
+    """
+    prints the progress line of the sweep again if it has changed
+    :return: the printed line
+    """
+    done = len(results)
+    failed = sum(1 for status, _, _ in results.values() if status != "ok")
+    eta = ""
+    if 0 < done < total:
+        eta = ", about %ds left" % (seconds / done * (total - done))
+    line = "[%d/%d] %d running, %d failed, %ds%s" % (done, total, running, failed, seconds, eta)
+    if line != last:
+        sys.stdout.write("\r" + line.ljust(len(last)))
+        sys.stdout.flush()
+    return line
+
+
+def write_results(direction, jobs, results):
+    """
+    writes the status of every job to jobs.csv and collects the aggregate_rounds.csv of the finished jobs
+    into all_aggregates.csv
+    """
+    with open(direction + "/jobs.csv", "w") as jobs_file:
+        jobs_file.write("Job,Scenario,Solution,Seed,Config,Status,Attempts,Seconds,Directory\n")
+        for job in jobs:
+            status, attempts, seconds = results[job.index]
+            jobs_file.write("%d,%s,%s,%d,%s,%s,%d,%.2f,%s\n"
+                            % (job.index, job.scenario, job.solution, job.seed,
+                               " ".join("%s=%s" % override for override in job.overrides),
+                               status, attempts, seconds, get_output_directory(job)))
 
-    direction = "./outputs/mulitple/" + str(n_time) + "_" + scenario_file.rsplit('.', 1)[0] + "_" + \
-          solution_file.rsplit('.', 1)[0]
-    if not os.path.exists(direction):
-        os.makedirs(direction)
-    out = open(direction + "/multiprocess.txt", "w")
-    child_processes = []
-    process_cnt=0
-    for seed in range(seed_start, seed_end+1):
-        process ="python3.6", "swarm-sim.py", "-n"+ str(max_round), "-m 1", "-d"+str(n_time),\
-                              "-r"+ str(seed), "-v" + str(0)
-        p = subprocess.Popen(process, stdout=out, stderr=out)
-        child_processes.append(p)
-        process_cnt += 1
-        print("Process Nr. ", process_cnt, "started")
-        if len(child_processes) == os.cpu_count():
-            for cp in child_processes:
-                cp.wait()
-            child_processes.clear()
-
-    for cp in child_processes:
-        cp.wait()
-    fout = open(direction+"/all_aggregates.csv","w+")
-    for seed in range(seed_start, seed_end+1):
-        f = open(direction+"/"+str(seed)+"/aggregate_rounds.csv")
-        f.__next__() # skip the header
+    fout = open(direction + "/all_aggregates.csv", "w+")
+    for job in jobs:
+        if results[job.index][0] != "ok":
+            continue
+        f = open(get_output_directory(job) + "/aggregate_rounds.csv")
+        f.__next__()  # skip the header
         for line in f:
             fout.write(line)
-        f.close() # not really needed
+        f.close()
     fout.close()
 
 
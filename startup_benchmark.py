@@ -0,0 +1,73 @@
+"""Measures the start up of swarm-sim.py -v 0: the imports and the parsing of config.ini until the world is created.
+Every measurement runs in a new python process. The benchmark fails if the median start up is over the budget or if
+a module of the visualization is loaded, which a run without visualization never needs.
+
+    python startup_benchmark.py -n 10 -b 0.5"""
+import getopt
+import json
+import statistics
+import subprocess
+import sys
+
+# top level packages that only the visualization and the plots may import
+VISUALIZATION_MODULES = ("PyQt5", "OpenGL", "cv2", "PIL", "matplotlib", "pandas")
+
+STARTUP = """
+import importlib, json, sys, time
+start = time.perf_counter()
+swarm_sim = importlib.import_module("swarm-sim")
+config_data = swarm_sim.config.ConfigData()
+swarm_sim.read_cmd_args(["-v", "0"], config_data)
+seconds = time.perf_counter() - start
+print(json.dumps({"seconds": seconds, "modules": sorted({name.split(".")[0] for name in sys.modules})}))
+"""
+
+
+def measure():
+    """
+    starts swarm-sim.py in a new python process
+    :return: start up seconds and the names of the loaded top level modules
+    """
+    output = subprocess.run([sys.executable, "-c", STARTUP], stdout=subprocess.PIPE, check=True).stdout
+    result = json.loads(output.decode().strip().splitlines()[-1])
+    return result["seconds"], result["modules"]
+
+
+def main(argv):
+    runs = 5
+    budget = 0.5
+    try:
+        opts, args = getopt.getopt(argv, "hn:b:", ["runs=", "budget="])
+    except getopt.GetoptError:
+        print('Error: startup_benchmark.py -n <runs> -b <budget seconds>')
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == '-h':
+            print('startup_benchmark.py -n <runs> -b <budget seconds>')
+            sys.exit()
+        elif opt in ("-n", "--runs"):
+            runs = int(arg)
+        elif opt in ("-b", "--budget"):
+            budget = float(arg)
+
+    times = []
+    loaded = set()
+    for _ in range(runs):
+        seconds, modules = measure()
+        times.append(seconds)
+        loaded.update(name for name in modules if name in VISUALIZATION_MODULES)
+    median = statistics.median(times)
+    print("start up of swarm-sim.py -v 0: median %.3fs, min %.3fs, max %.3fs (%d runs, budget %.3fs)"
+          % (median, min(times), max(times), runs, budget))
+    failed = False
+    if loaded:
+        print("Error: modules of the visualization are loaded: %s" % ", ".join(sorted(loaded)))
+        failed = True
+    if median > budget:
+        print("Error: the start up is over the budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,4 +1,5 @@
 """This is the main module of the Opportunistic Robotics Network Simulator"""
+import copy
 import importlib
 import getopt
 import logging
@@ -7,55 +8,67 @@ import sys
 import time
 import random
 from core import world, config
-from core.vis3d import ResetException
+from core.visualization.errors import ResetException
 
 
-def swarm_sim(argv):
+def swarm_sim(argv, swarm_sim_world=None, base_config=None):
     """In the main function first the config is getting parsed and than
     the swarm_sim_world and the swarm_sim_world item is created. Afterwards the run method of the swarm_sim_world
-    is called in which the simlator is going to start to run"""
-    config_data = config.ConfigData()
+    is called in which the simlator is going to start to run.
+    A sweep worker runs many simulations in one process: it passes the world of its last simulation, which is reset
+    for the new one, and the parsed config.ini, which is copied instead of being parsed again"""
+    config_data = copy.copy(base_config) if base_config is not None else config.ConfigData()
+    read_cmd_args(argv, config_data)
 
     unique_descriptor = "%s_%s_%s" % (config_data.local_time,
                                       config_data.scenario.rsplit('.', 1)[0],
                                       config_data.solution.rsplit('.', 1)[0])
 
-    logging.basicConfig(filename="outputs/logs/system_%s.log" % unique_descriptor, filemode='w',
+    # a worker logs every simulation into its own file
+    for handler in logging.root.handlers[:]:
+        logging.root.removeHandler(handler)
+        handler.close()
+    logging.basicConfig(filename="outputs/logs/system_%s_%s.log" % (unique_descriptor, config_data.seed_value),
+                        filemode='w',
                         level=logging.INFO, format='%(message)s')
     logging.info('Started')
 
-    read_cmd_args(argv, config_data)
     create_directory_for_data(config_data, unique_descriptor)
     random.seed(config_data.seed_value)
-    swarm_sim_world = world.World(config_data)
-    swarm_sim_world.init_scenario(get_scenario(swarm_sim_world.config_data))
+    if swarm_sim_world is None:
+        swarm_sim_world = world.World(config_data)
+    else:
+        swarm_sim_world.reset(config_data)
+    # the modules of the last simulation of a worker are executed again, so their globals start fresh
+    load_module('components.solution.' + config_data.solution)
+    swarm_sim_world.init_scenario(load_module('components.scenario.' + config_data.scenario))
 
     reset = True
     while reset:
         reset = main_loop(config_data, swarm_sim_world)
 
+    swarm_sim_world.close_workers()
     logging.info('Finished')
     generate_data(config_data, swarm_sim_world)
+    return swarm_sim_world
 
 
 def main_loop(config_data, swarm_sim_world):
-    round_start_timestamp = time.perf_counter()
+    round_pipeline = RoundPipeline(swarm_sim_world)
     while (config_data.max_round == 0 or swarm_sim_world.get_actual_round() <= config_data.max_round) \
             and swarm_sim_world.get_end() is False:
         try:
-            if config_data.visualization:
-                swarm_sim_world.vis.run(round_start_timestamp)
-                round_start_timestamp = time.perf_counter()
-
-            run_solution(swarm_sim_world)
+            round_pipeline.run()
         except ResetException:
             do_reset(swarm_sim_world)
+            # the reset has reloaded the solution
+            round_pipeline.compile()
 
     if config_data.visualization:
         try:
-            swarm_sim_world.vis.run(round_start_timestamp)
+            swarm_sim_world.vis.run(round_pipeline.round_start_timestamp)
             while not config_data.close_at_end:
-                swarm_sim_world.vis.run(round_start_timestamp)
+                swarm_sim_world.vis.run(round_pipeline.round_start_timestamp)
         except ResetException:
             do_reset(swarm_sim_world)
             return True
@@ -64,22 +77,21 @@ def main_loop(config_data, swarm_sim_world):
 
 def do_reset(swarm_sim_world):
     swarm_sim_world.reset()
-    solution = get_solution(swarm_sim_world.config_data)
-    scenario = get_scenario(swarm_sim_world.config_data)
-    importlib.reload(solution)
-    importlib.reload(scenario)
-    swarm_sim_world.init_scenario(scenario)
+    load_module('components.solution.' + swarm_sim_world.config_data.solution)
+    swarm_sim_world.init_scenario(load_module('components.scenario.' + swarm_sim_world.config_data.scenario))
 
 
 def read_cmd_args(argv, config_data):
     try:
-        opts, args = getopt.getopt(argv, "hs:w:r:n:m:d:v:", ["solution=", "scenario="])
+        opts, args = getopt.getopt(argv, "hs:w:r:n:m:d:v:c:", ["solution=", "scenario=", "config="])
     except getopt.GetoptError:
-        print('Error: swarm-swarm_sim_world.py -r <seed> -w <scenario> -s <solution> -n <maxRounds>')
+        print('Error: swarm-swarm_sim_world.py -r <seed> -w <scenario> -s <solution> -n <maxRounds>'
+              ' -c <option>=<value>')
         sys.exit(2)
     for opt, arg in opts:
         if opt == '-h':
-            print('swarm-swarm_sim_world.py -r <seed> -w <scenario> -s <solution> -n <maxRounds>')
+            print('swarm-swarm_sim_world.py -r <seed> -w <scenario> -s <solution> -n <maxRounds>'
+                  ' -c <option>=<value>')
             sys.exit()
         elif opt in ("-s", "--solution"):
             config_data.solution = arg
@@ -95,16 +107,19 @@ def read_cmd_args(argv, config_data):
             config_data.visualization = int(arg)
         elif opt in "-d":
             config_data.local_time = str(arg)
+        elif opt in ("-c", "--config"):
+            # overrides a variable of config.ini, e.g. -c workers=4 or -c Simulator.max_round=100
+            option, _, value = arg.partition("=")
+            config_data.set_option(option.strip(), value.strip())
 
 
 def create_directory_for_data(config_data, unique_descriptor):
     if config_data.multiple_sim == 1:
         config_data.directory_name = "%s/%s" % (unique_descriptor, str(config_data.seed_value))
 
-        config_data.directory_name = "./outputs/csv/mulitple/" + config_data.directory_name
+        config_data.directory_csv = "./outputs/csv/mulitple/" + config_data.directory_name
         config_data.directory_plot = "./outputs/plot/mulitple/" + config_data.directory_name
 
-
     else:
         config_data.directory_name = "%s_%s" % (unique_descriptor, str(config_data.seed_value))
 
@@ -115,14 +130,76 @@ def create_directory_for_data(config_data, unique_descriptor):
     if not os.path.exists(config_data.directory_plot):
         os.makedirs(config_data.directory_plot)
 
-def run_solution(swarm_sim_world):
-    if swarm_sim_world.config_data.agent_random_order_always:
-        random.shuffle(swarm_sim_world.agents)
-    get_solution(swarm_sim_world.config_data).solution(swarm_sim_world)
+class RoundPipeline:
+    """
+    The stages of a round (visualization, shuffle, solution, metrics, round increment) as a list of functions
+    of the world. The solution is resolved and the stages are selected once from the config, stages that
+    are disabled by the config are not in the list at all
+    """
+
+    def __init__(self, swarm_sim_world):
+        self.world = swarm_sim_world
+        self.round_start_timestamp = time.perf_counter()
+        self.stages = ()
+        self.compile()
+
+    def compile(self):
+        """
+        resolves the solution and selects the stages, again after the solution module has been reloaded
+        :return: None
+        """
+        config_data = self.world.config_data
+        solution = get_solution(config_data)
+        stages = []
+        if config_data.visualization:
+            stages.append(self.visualize)
+        if config_data.agent_random_order_always:
+            stages.append(shuffle_agents)
+        if config_data.synchronous_rounds:
+            step = solution.step
+            stages.append(lambda swarm_sim_world: swarm_sim_world.run_synchronous_round(step))
+        else:
+            stages.append(solution.solution)
+        stages.append(record_round)
+        stages.append(next_round)
+        self.stages = tuple(stages)
+
+    def run(self):
+        """
+        runs one round
+        :return: None
+        """
+        for stage in self.stages:
+            stage(self.world)
+
+    def visualize(self, swarm_sim_world):
+        swarm_sim_world.vis.run(self.round_start_timestamp)
+        self.round_start_timestamp = time.perf_counter()
+
+
+def shuffle_agents(swarm_sim_world):
+    swarm_sim_world.agents.shuffle()
+
+
+def record_round(swarm_sim_world):
     swarm_sim_world.csv_round.next_line(swarm_sim_world.get_actual_round())
+
+
+def next_round(swarm_sim_world):
     swarm_sim_world.inc_round_counter_by(number=1)
 
 
+def load_module(name):
+    """
+    imports a module, or executes it again if it has already been imported
+    :param name: the module name
+    :return: the module
+    """
+    if name in sys.modules:
+        return importlib.reload(sys.modules[name])
+    return importlib.import_module(name)
+
+
 def get_solution(config_data):
     return importlib.import_module('components.solution.' + config_data.solution)
 
@@ -134,7 +211,8 @@ def get_scenario(config_data):
 def generate_data(config_data, swarm_sim_world):
     swarm_sim_world.csv_aggregator()
     plt_gnrtr = importlib.import_module('components.generators.plot.%s' % config_data.plot_generator)
-    plt_gnrtr.plot_generator(config_data.directory_csv, config_data.directory_plot )
+    plt_gnrtr.plot_generator(config_data.directory_csv, config_data.directory_plot,
+                             workers=config_data.plot_workers, max_points=config_data.plot_max_points)
 
 
 if __name__ == "__main__":
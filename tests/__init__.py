@@ -0,0 +1,34 @@
+"""Tests of the simulator core. They read config.ini, so run them from the root of the repository:
+
+    python -m unittest discover tests"""
+import tempfile
+
+from core import config, world
+from components.grids.quadratic import QuadraticGrid
+
+
+def create_world(test_case, border=False, size=5, agent_store=False, workers=0):
+    """
+    creates an empty world on a quadratic grid without visualization, its csv files are written into a
+    temporary directory that is removed after the test
+    :param test_case: the unittest.TestCase
+    :param border: True = the world has a border of the given size
+    :param size: size of the grid and of the border
+    :param agent_store: True = the agents are kept in the agent store
+    :param workers: amount of worker processes of the synchronous round mode
+    :return: the world
+    """
+    directory = tempfile.TemporaryDirectory()
+    test_case.addCleanup(directory.cleanup)
+    config_data = config.ConfigData()
+    config_data.visualization = 0
+    config_data.directory_csv = directory.name
+    config_data.grid = QuadraticGrid(size)
+    config_data.border = 1 if border else 0
+    config_data.type = 0
+    config_data.size_x = config_data.size_y = size
+    config_data.size_z = 0
+    config_data.agent_store = agent_store
+    config_data.workers = workers
+    config_data.tile_size = 0
+    return world.World(config_data)
@@ -0,0 +1,89 @@
+import random
+import unittest
+
+from core.flow_field import FlowField
+from core.matter import MatterType
+from tests import create_world
+
+
+class FlowFieldTest(unittest.TestCase):
+    """
+    The incremental repair of a flow field (FlowField._lower and FlowField._raise) has to give the same distances
+    as a field that is computed from scratch
+    """
+
+    def assert_same_as_refresh(self, field, targets):
+        fresh = FlowField(field.world, targets, field.blocking, field.max_distance)
+        self.assertEqual(field.distances, fresh.distances)
+        # the parents may differ on ties, but each one has to lead one step closer to a target
+        offsets = field.grid.get_key_offsets()
+        for key, direction in field.parents.items():
+            if direction is None:
+                self.assertIn(key, field.targets)
+            else:
+                self.assertEqual(field.distances[key + offsets[direction]], field.distances[key] - 1)
+
+    def random_trace(self, border, max_distance, seed):
+        w = create_world(self, border=border, size=4)
+        rng = random.Random(seed)
+        field = w.create_flow_field(MatterType.LOCATION, blocking=(MatterType.ITEM,), max_distance=max_distance)
+        # the cells reach beyond the border, matter outside of it must not be reachable through it
+        cells = [(x, y, 0) for x in range(-6, 7) for y in range(-6, 7)]
+        for _ in range(300):
+            coordinates = rng.choice(cells)
+            if rng.random() < 0.4:
+                location = w.location_map_coordinates.get(coordinates)
+                if location is None:
+                    w.add_location(coordinates)
+                else:
+                    w.remove_location(location.get_id())
+            else:
+                item = w.item_map_coordinates.get(coordinates)
+                if item is None:
+                    w.add_item(coordinates)
+                else:
+                    w.remove_item(item.get_id())
+            self.assert_same_as_refresh(field, MatterType.LOCATION)
+
+    def test_random_trace(self):
+        for seed in range(3):
+            self.random_trace(False, 8, seed)
+
+    def test_random_trace_with_border(self):
+        for seed in range(3):
+            self.random_trace(True, 50, seed)
+
+    def test_random_trace_with_max_distance(self):
+        for seed in range(3):
+            self.random_trace(True, 3, seed)
+
+    def test_explicit_targets(self):
+        w = create_world(self, border=True, size=4)
+        rng = random.Random(5)
+        for x in range(-4, 5):
+            for y in range(-4, 5):
+                if rng.random() < 0.2:
+                    w.add_item((x, y, 0))
+        field = w.create_flow_field([(0, 0, 0)])
+        targets = {(0, 0, 0)}
+        for _ in range(100):
+            coordinates = (rng.randint(-6, 6), rng.randint(-6, 6), 0)
+            if coordinates in targets:
+                targets.discard(coordinates)
+                field.remove_target(coordinates)
+            else:
+                targets.add(coordinates)
+                field.add_target(coordinates)
+            self.assert_same_as_refresh(field, targets)
+
+    def test_removed_target_outside_of_the_border(self):
+        # a raise must not seed the cells outside of the border again
+        w = create_world(self, border=True, size=5)
+        field = w.create_flow_field([(6, -2, 0), (4, -2, 0)])
+        field.remove_target((6, -2, 0))
+        self.assertIsNone(field.get_distance((6, -2, 0)))
+        self.assert_same_as_refresh(field, [(4, -2, 0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import random
+import unittest
+
+import numpy as np
+
+from core import metrics
+from tests import create_world
+
+EAST = (1, 0, 0)
+WEST = (-1, 0, 0)
+NORTH = (0, 1, 0)
+SOUTH = (0, -1, 0)
+
+
+class MoveAgentsTest(unittest.TestCase):
+    def setUp(self):
+        self.world = create_world(self)
+
+    def assert_consistent(self):
+        w = self.world
+        self.assertEqual(len(w.agent_map_coordinates), len(w.agents))
+        for a in w.agents:
+            key = w.grid.get_key(a.coordinates)
+            self.assertIs(w.agent_map_coordinates[key], a)
+            self.assertIs(w.cells[key].agent, a)
+
+    def steps(self, a):
+        return int(self.world.metrics.get_agent(a.csv_agent_writer.row)[metrics.STEPS])
+
+    def test_single_move(self):
+        a = self.world.add_agent((0, 0, 0))
+        self.assertEqual(self.world.move_agents([a], [EAST]), [True])
+        self.assertEqual(a.coordinates, (1, 0, 0))
+        self.assertEqual(self.steps(a), 1)
+        self.assert_consistent()
+
+    def test_direction_index_and_none(self):
+        a = self.world.add_agent((0, 0, 0))
+        b = self.world.add_agent((3, 0, 0))
+        east = self.world.grid.get_directions_list().index(EAST)
+        self.assertEqual(self.world.move_agents([a, b], [east, None]), [True, False])
+        self.assertEqual(a.coordinates, (1, 0, 0))
+        self.assertEqual(b.coordinates, (3, 0, 0))
+
+    def test_blocked_by_standing_agent(self):
+        a = self.world.add_agent((0, 0, 0))
+        self.world.add_agent((1, 0, 0))
+        self.assertEqual(self.world.move_agents([a], [EAST]), [False])
+        self.assertEqual(a.coordinates, (0, 0, 0))
+        self.assertEqual(self.steps(a), 0)
+
+    def test_swap_does_not_move(self):
+        a = self.world.add_agent((0, 0, 0))
+        b = self.world.add_agent((1, 0, 0))
+        self.assertEqual(self.world.move_agents([a, b], [EAST, WEST]), [False, False])
+        self.assertEqual((a.coordinates, b.coordinates), ((0, 0, 0), (1, 0, 0)))
+        self.assert_consistent()
+
+    def test_cycle_does_not_move(self):
+        square = [(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)]
+        agents = [self.world.add_agent(c) for c in square]
+        self.assertEqual(self.world.move_agents(agents, [EAST, NORTH, WEST, SOUTH]), [False] * 4)
+        self.assertEqual([a.coordinates for a in agents], square)
+        self.assert_consistent()
+
+    def test_follow_the_leader(self):
+        # the agents follow each other onto the cells that are left in the same call, in any list order
+        line = [self.world.add_agent((x, 0, 0)) for x in range(4)]
+        agents = [line[1], line[3], line[0], line[2]]
+        self.assertEqual(self.world.move_agents(agents, [EAST] * 4), [True] * 4)
+        self.assertEqual([a.coordinates for a in line], [(x, 0, 0) for x in range(1, 5)])
+        self.assert_consistent()
+
+    def test_blocked_leader_stops_the_line(self):
+        line = [self.world.add_agent((x, 0, 0)) for x in range(3)]
+        self.world.add_agent((3, 0, 0))
+        self.assertEqual(self.world.move_agents(line, [EAST] * 3), [False] * 3)
+        self.assertEqual([a.coordinates for a in line], [(x, 0, 0) for x in range(3)])
+
+    def test_contested_cell_with_priorities(self):
+        a = self.world.add_agent((0, 0, 0))
+        b = self.world.add_agent((2, 0, 0))
+        self.assertEqual(self.world.move_agents([a, b], [EAST, WEST], priorities=[1, 2]), [False, True])
+        self.assertEqual(b.coordinates, (1, 0, 0))
+        # on equal priorities the first one in the list wins
+        c = self.world.add_agent((1, 2, 0))
+        d = self.world.add_agent((1, 4, 0))
+        self.assertEqual(self.world.move_agents([d, c], [SOUTH, NORTH], priorities=[0, 0]), [True, False])
+
+    def test_loser_blocks_its_follower(self):
+        a = self.world.add_agent((0, 0, 0))
+        b = self.world.add_agent((2, 0, 0))
+        follower = self.world.add_agent((-1, 0, 0))
+        moved = self.world.move_agents([a, b, follower], [EAST, WEST, EAST], priorities=[0, 1, 0])
+        self.assertEqual(moved, [False, True, False])
+        self.assertEqual(follower.coordinates, (-1, 0, 0))
+        self.assert_consistent()
+
+    def test_contested_cell_is_seeded(self):
+        def contest(seed):
+            w = create_world(self)
+            agents = [w.add_agent(c) for c in ((0, 0, 0), (2, 0, 0), (1, 1, 0), (1, -1, 0))]
+            # draws of a solution with the random module must not change the winner
+            random.random()
+            return w.move_agents(agents, [EAST, WEST, SOUTH, NORTH], rng=np.random.default_rng(seed))
+
+        for seed in range(5):
+            moved = contest(seed)
+            self.assertEqual(sum(moved), 1)
+            self.assertEqual(contest(seed), moved)
+        self.assertGreater(len({tuple(contest(seed)) for seed in range(20)}), 1)
+
+    def test_random_moves_stay_consistent(self):
+        rng = random.Random(3)
+        for x in range(-4, 5):
+            for y in range(-4, 5):
+                if rng.random() < 0.5:
+                    self.world.add_agent((x, y, 0))
+        directions = self.world.grid.get_directions_list()
+        for _ in range(20):
+            agents = list(self.world.agents)
+            before = [a.coordinates for a in agents]
+            chosen = [rng.choice(directions) for _ in agents]
+            moved = self.world.move_agents(agents, chosen)
+            for a, start, direction, has_moved in zip(agents, before, chosen, moved):
+                expected = self.world.grid.get_coordinates_in_direction(start, direction) if has_moved else start
+                self.assertEqual(a.coordinates, expected)
+            self.assert_consistent()
+
+
+class MoveAgentsStoreTest(MoveAgentsTest):
+    def setUp(self):
+        self.world = create_world(self, agent_store=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import itertools
+import random
+import unittest
+
+from core import synchronous, tiles
+from core.matter import MatterType
+from tests import create_world
+
+
+def step(snapshot, agent):
+    # looks two hops around, writes, takes, drops and moves, so matter enters and leaves the tiles and their halos
+    directions = snapshot.grid.get_directions_list()
+    rng = snapshot.get_random(agent.id)
+    intents = [synchronous.write(agent.id, len(snapshot.scan_within(agent.coordinates, 2)), key="seen")]
+    if agent.carried_item is None:
+        if snapshot.get_matter_in(agent, directions[0], MatterType.ITEM) is not None:
+            intents.append(synchronous.take(agent.id, directions[0]))
+    elif rng.random() < 0.3:
+        intents.append(synchronous.drop(agent.id, directions[1]))
+    intents.append(synchronous.move(agent.id, rng.choice(directions)))
+    return intents
+
+
+def fill(world, seed):
+    rng = random.Random(seed)
+    for x, y in itertools.product(range(-8, 9), range(-5, 6)):
+        r = rng.random()
+        if r < 0.3:
+            world.add_agent((x, y, 0))
+        elif r < 0.5:
+            world.add_item((x, y, 0))
+        elif r < 0.6:
+            world.add_location((x, y, 0))
+
+
+def get_result(world):
+    return sorted((a.get_id(), a.coordinates, a.read_memory_with("seen"),
+                   a.carried_item.get_id() if a.carried_item is not None else None) for a in world.agents)
+
+
+class TileStateTest(unittest.TestCase):
+    """
+    After every round each tile has to hold the same states as a snapshot of the whole world,
+    for the matter on its cells and in its halo, and own exactly the agents on its cells
+    """
+
+    def assert_tiles(self, world, layout, tile_states):
+        snapshot = world.take_snapshot()
+        expected = {}
+        for matter_type, matter_map in ((MatterType.AGENT, snapshot.agent_map), (MatterType.ITEM, snapshot.item_map),
+                                        (MatterType.LOCATION, snapshot.location_map)):
+            for key, state in matter_map.items():
+                for index in layout.get_tiles_around(state.coordinates):
+                    maps = expected.setdefault(index, ({}, {MatterType.AGENT: {}, MatterType.ITEM: {},
+                                                           MatterType.LOCATION: {}}))[1]
+                    maps[matter_type][key] = state
+        for state in snapshot.agents:
+            expected.setdefault(layout.get_tile(state.coordinates), ({}, {MatterType.AGENT: {}, MatterType.ITEM: {},
+                                                                         MatterType.LOCATION: {}}))[0][state.id] = state
+        self.assertEqual(set(tile_states), set(expected))
+        for index, tile in tile_states.items():
+            agents, maps = expected[index]
+            self.assertEqual(tile.agents, agents)
+            self.assertEqual(dict(tile.agent_map), maps[MatterType.AGENT])
+            self.assertEqual(dict(tile.item_map), maps[MatterType.ITEM])
+            self.assertEqual(dict(tile.location_map), maps[MatterType.LOCATION])
+
+    def test_tiles_follow_the_world(self):
+        world = create_world(self)
+        fill(world, 3)
+        layout = tiles.TileLayout(world.grid, 3, 2)
+        state = tiles.TiledWorldState(layout)
+        tile_states = {}
+        for _ in range(12):
+            _, changes = state.collect(world)
+            events = tiles._route_changes(tile_states, layout, changes.items(), 1)[0]
+            tiles._apply_events(tile_states, layout, events)
+            self.assert_tiles(world, layout, tile_states)
+            world.run_synchronous_round(step)
+            world.inc_round_counter_by(1)
+        state.close()
+        self.assertIsNone(world.changed_matter)
+
+
+class TiledStepperTest(unittest.TestCase):
+    def run_rounds(self, world, rounds):
+        self.addCleanup(world.close_workers)
+        for _ in range(rounds):
+            world.run_synchronous_round(step)
+            world.inc_round_counter_by(1)
+        return get_result(world)
+
+    def test_same_as_single_process(self):
+        single = create_world(self)
+        fill(single, 4)
+        tiled = create_world(self, workers=2)
+        tiled.config_data.tile_size = 3
+        tiled.config_data.tile_halo = 2
+        fill(tiled, 4)
+        self.assertEqual(self.run_rounds(tiled, 10), self.run_rounds(single, 10))
+
+    def test_look_outside_of_the_halo(self):
+        world = create_world(self, workers=2)
+        world.config_data.tile_size = 3
+        world.config_data.tile_halo = 1
+        fill(world, 4)
+        with self.assertRaises(ValueError):
+            self.run_rounds(world, 1)